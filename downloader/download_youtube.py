@@ -1,104 +1,339 @@
 import os
 import sys
 import json
+import atexit
+import shutil
 import argparse
-from typing import Dict, Any
-from yt_dlp import YoutubeDL
+import functools
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
 
 # Ensure imports work when run as a script
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
-from utils.paths import ensure_workdirs, safe_filename, DEFAULT_OUTPUTS_ROOT
+from utils.paths import ensure_workdirs, safe_filename, downloads_dir, get_outputs_root
 from utils.logging_utils import get_logger
+from utils.io_utils import dumps_json
+from utils.ffmpeg_utils import audio_codec
+from utils.yt_cache import is_youtube_url, parse_video_id, load_metadata, save_metadata
+
+if TYPE_CHECKING:
+    from yt_dlp import YoutubeDL
 
 logger = get_logger(__name__)
 
+# Options for metadata-only lookups. These go through extract_info(process=False),
+# which skips format selection and signature decryption; id and title are
+# already present in the unprocessed extractor result.
+INFO_OPTS = {
+    "quiet": True,
+    "no_warnings": True,
+}
+
+
+# Long-lived metadata instances, one set per thread: the pipeline's download
+# workers look up ids and titles concurrently, and YoutubeDL is not thread-safe
+_thread_ydls = threading.local()
+
+
+def get_ydl(opts: Dict[str, Any]) -> "YoutubeDL":
+    """
+    Get this thread's long-lived YoutubeDL for a (JSON-serializable) options dict.
+
+    Reusing it keeps its connections open between lookups. Only for
+    extract_info(process=False) metadata lookups; downloads and format
+    resolution change the instance's state, so they use new_ydl.
+    """
+    instances = getattr(_thread_ydls, "instances", None)
+    if instances is None:
+        instances = _thread_ydls.instances = {}
+    key = json.dumps(opts, sort_keys=True)
+    ydl = instances.get(key)
+    if ydl is None:
+        ydl = instances[key] = new_ydl(opts)
+        atexit.register(ydl.close)
+    return ydl
+
+
+def new_ydl(opts: Dict[str, Any]) -> "YoutubeDL":
+    """A fresh YoutubeDL for one call; use it as a context manager so it is closed."""
+    # yt_dlp is slow to import; only pay for it when the network is actually needed
+    from yt_dlp import YoutubeDL
+
+    return YoutubeDL(opts)
+
 
 def extract_video_id_from_url(url: str) -> str:
-    """Extract video ID from YouTube URL without downloading."""
-    ydl_opts = {
-        "quiet": True,
-        "no_warnings": True,
-    }
-    with YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url, download=False)
-        return info.get("id")
+    """Extract video ID from YouTube URL, only hitting the network if the URL can't be parsed."""
+    video_id = parse_video_id(url)
+    if video_id:
+        return video_id
+    info = get_ydl(INFO_OPTS).extract_info(url, download=False, process=False)
+    return info.get("id")
 
 
-def check_video_exists(video_id: str) -> bool:
-    """Check if video already exists in outputs folder."""
-    video_dir = os.path.join(DEFAULT_OUTPUTS_ROOT, video_id)
-    if not os.path.exists(video_dir):
-        return False
-    
-    # Check if the video file exists in the video subdirectory
-    video_subdir = os.path.join(video_dir, "video")
-    if not os.path.exists(video_subdir):
-        return False
-    
-    # Look for the video file (should be named with video_id.mp4)
-    video_file = os.path.join(video_subdir, f"{video_id}.mp4")
-    return os.path.exists(video_file)
+# Bumped whenever the outputs folder changes, invalidating _video_index
+_index_generation = 0
 
 
-def get_existing_video_info(video_id: str, url: str) -> Dict[str, Any]:
-    """Get video info for already downloaded video."""
-    video_dir = os.path.join(DEFAULT_OUTPUTS_ROOT, video_id)
-    video_subdir = os.path.join(video_dir, "video")
-    video_file = os.path.join(video_subdir, f"{video_id}.mp4")
-    
-    # Try to read metadata if it exists
-    metadata_file = os.path.join(video_dir, "metadata.json")
+@functools.lru_cache(maxsize=1)
+def _video_index(generation: int) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Map video_id -> {"video_path", "metadata_path"} for every downloaded video.
+
+    Built with os.scandir in a single pass over outputs/<video_id>/ and its
+    video/ subfolder, so neither the existence check nor the metadata lookup
+    needs its own stat calls. metadata_path is None when no metadata.json exists.
+    """
+    index: Dict[str, Dict[str, Optional[str]]] = {}
+    try:
+        root_entries = list(os.scandir(get_outputs_root()))
+    except FileNotFoundError:
+        return index
+
+    for entry in root_entries:
+        if not entry.is_dir():
+            continue
+        video_path = None
+        metadata_file = None
+        try:
+            with os.scandir(entry.path) as video_dir_entries:
+                for child in video_dir_entries:
+                    if child.name == "metadata.json" and child.is_file():
+                        metadata_file = child.path
+                    elif child.name == "video" and child.is_dir():
+                        video_path = _find_video_file(child.path, entry.name)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        if video_path:
+            index[entry.name] = {"video_path": video_path, "metadata_path": metadata_file}
+    return index
+
+
+def _find_video_file(video_subdir: str, video_id: str) -> Optional[str]:
+    """Return the path of <video_id>.mp4 inside video_subdir, if present."""
+    expected_name = f"{video_id}.mp4"
+    with os.scandir(video_subdir) as entries:
+        for entry in entries:
+            if entry.name == expected_name and entry.is_file():
+                return entry.path
+    return None
+
+
+def invalidate_video_index() -> None:
+    """Force the next existence check to rescan the outputs folder."""
+    global _index_generation
+    _index_generation += 1
+
+
+def probe_existing(video_id: str, url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Look up an already downloaded video.
+
+    Args:
+        video_id: YouTube video ID
+        url: Video URL, used to fetch the title if no cached metadata has it
+
+    Returns:
+        {"video_id", "title", "video_path"} or None if the video isn't downloaded
+    """
+    entry = _video_index(_index_generation).get(video_id)
+    if entry is None:
+        return None
+
+    # Prefer the metadata cached by a previous download
     title = None
-    if os.path.exists(metadata_file):
+    if entry["metadata_path"]:
         try:
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-                title = metadata.get("title")
-        except:
-            pass
-    
+            with open(entry["metadata_path"], "r", encoding="utf-8") as f:
+                title = json.load(f).get("title")
+        except (OSError, ValueError, AttributeError):
+            title = None
+
     # If no title in metadata, extract it from URL
-    if not title:
-        ydl_opts = {
-            "quiet": True,
-            "no_warnings": True,
-        }
-        with YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            title = info.get("title")
-    
-    return {"video_id": video_id, "title": title, "video_path": video_file}
+    if not title and url:
+        info = get_ydl(INFO_OPTS).extract_info(url, download=False, process=False)
+        title = info.get("title")
+        save_metadata(info)
+        invalidate_video_index()
+
+    return {"video_id": video_id, "title": title, "video_path": entry["video_path"]}
+
+
+# Concurrent metadata lookups in batch_probe
+PROBE_WORKERS = 16
 
 
-def download_youtube(url: str, outputs_root: str) -> Dict[str, Any]:
+def _probe_url(url: str) -> Optional[Dict[str, Any]]:
+    from yt_dlp import YoutubeDL
+
+    try:
+        # One instance per lookup: YoutubeDL objects are not safe to share between threads
+        with YoutubeDL(INFO_OPTS) as ydl:
+            return ydl.extract_info(url, download=False, process=False)
+    except Exception as e:
+        logger.warning(f"Could not fetch metadata for {url}: {e}")
+        return None
+
+
+def batch_probe(urls: List[str], max_workers: int = PROBE_WORKERS) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch metadata for several URLs concurrently and cache it in metadata.json.
+
+    URLs whose metadata is already cached are answered from disk. Afterwards
+    probe_existing and the pipeline find every title locally, so they issue
+    no further extract_info calls for these videos.
+
+    Args:
+        urls: YouTube URLs to look up
+        max_workers: Maximum number of lookups in flight
+
+    Returns:
+        Mapping of video_id -> cached metadata; URLs that failed or aren't
+        YouTube URLs are left out (the caller reports those per URL)
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    to_fetch: Dict[str, str] = {}
+    for url in urls:
+        if not is_youtube_url(url):
+            logger.warning(f"Not a YouTube URL, skipping metadata lookup: {url}")
+            continue
+        video_id = parse_video_id(url)
+        cached = load_metadata(video_id) if video_id else None
+        if cached and cached.get("title"):
+            results[video_id] = cached
+        else:
+            to_fetch.setdefault(video_id or url, url)
+
+    if to_fetch:
+        logger.info(f"Fetching metadata for {len(to_fetch)} videos")
+        workers = max(1, min(max_workers, len(to_fetch)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="probe") as executor:
+            for info in executor.map(_probe_url, to_fetch.values()):
+                if info and info.get("id"):
+                    metadata = save_metadata(info)
+                    results[metadata["video_id"]] = metadata
+        invalidate_video_index()
+    return results
+
+
+# DASH/HLS fragments fetched in parallel per download
+CONCURRENT_FRAGMENTS = 8
+# Arguments for external downloaders yt-dlp can hand the transfer to
+EXTERNAL_DOWNLOADER_ARGS = {
+    "aria2c": ["-x", "16", "-s", "16", "-k", "1M"],
+}
+
+
+def download_opts(
+    outputs_root: str,
+    concurrent_fragments: int = CONCURRENT_FRAGMENTS,
+    external_downloader: str = "",
+) -> Dict[str, Any]:
+    """
+    yt-dlp options for downloading a merged mp4 into outputs_root.
+
+    Args:
+        outputs_root: Directory to download into
+        concurrent_fragments: Fragments of a DASH/HLS stream fetched at once
+        external_downloader: Program to hand downloads to (e.g. "aria2c");
+            ignored with a warning when it isn't installed
+    """
+    opts = {
+        "format": "bestvideo+bestaudio/best",
+        "merge_output_format": "mp4",
+        "outtmpl": os.path.join(outputs_root, "%(id)s.%(ext)s"),
+        "noplaylist": True,
+        "quiet": True,
+        "concurrent_fragment_downloads": max(concurrent_fragments, 1),
+    }
+    if external_downloader:
+        if shutil.which(external_downloader):
+            opts["external_downloader"] = {"default": external_downloader}
+            if external_downloader in EXTERNAL_DOWNLOADER_ARGS:
+                opts["external_downloader_args"] = {
+                    external_downloader: EXTERNAL_DOWNLOADER_ARGS[external_downloader]
+                }
+        else:
+            logger.warning(f"{external_downloader} not found, using yt-dlp's own downloader")
+    return opts
+
+
+def require_youtube_url(url: str) -> None:
+    """Reject malformed URLs before yt-dlp (and its extractor registry) gets involved."""
+    if not is_youtube_url(url):
+        raise ValueError(f"Not a YouTube URL: {url}")
+
+
+# Audio-only format streamed by download_audio_wav
+AUDIO_FORMAT = "bestaudio[ext=m4a]/bestaudio"
+
+
+def download_audio_wav(
+    url: str, wav_path: str, sample_rate_hz: int = 16000, mono: bool = True, codec: str = "wav"
+) -> str:
+    """
+    Stream a video's audio-only format straight into a WAV file
+    (or FLAC/Opus, see utils.ffmpeg_utils.AUDIO_CODECS).
+
+    yt-dlp only resolves the stream URL; ffmpeg fetches and decodes it in one
+    pass, so the WAV can be produced while the full video is still
+    downloading instead of being demuxed from it afterwards.
+    """
+    require_youtube_url(url)
+    # Format selection runs the full extractor, so this gets its own instance
+    with new_ydl({**INFO_OPTS, "format": AUDIO_FORMAT}) as ydl:
+        info = ydl.extract_info(url, download=False)
+    headers = "".join(f"{k}: {v}\r\n" for k, v in (info.get("http_headers") or {}).items())
+    cmd = ["ffmpeg", "-nostdin", "-y", "-v", "error"]
+    if headers:
+        cmd += ["-headers", headers]
+    cmd += ["-i", info["url"], "-vn", *audio_codec(codec)[0], "-ar", str(sample_rate_hz)]
+    if mono:
+        cmd += ["-ac", "1"]
+    cmd.append(wav_path)
+    process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if process.returncode != 0:
+        logger.error(process.stderr.decode("utf-8", errors="ignore"))
+        raise RuntimeError(f"Audio download failed for {url}")
+    return wav_path
+
+
+def download_youtube(
+    url: str,
+    outputs_root: str,
+    concurrent_fragments: int = CONCURRENT_FRAGMENTS,
+    external_downloader: str = "",
+) -> Dict[str, Any]:
+    require_youtube_url(url)
     # First, extract video ID to check if it already exists
     video_id = extract_video_id_from_url(url)
     
     # Check if video already exists in outputs folder
-    if check_video_exists(video_id):
+    existing = probe_existing(video_id, url)
+    if existing:
         logger.info(f"Video {video_id} already downloaded, skipping download")
-        return get_existing_video_info(video_id, url)
+        return existing
     
     # If video doesn't exist, proceed with download
     logger.info(f"Downloading video {video_id}")
-    ydl_opts = {
-        "format": "bestvideo+bestaudio/best",
-        "merge_output_format": "mp4",
-        "outtmpl": os.path.join(outputs_root, "%(id)s.%(ext)s"),
-        "noplaylist": True,
-        "quiet": True,
-    }
-    with YoutubeDL(ydl_opts) as ydl:
+    # One instance per download: batches call this from several threads, and a
+    # download updates the instance's hooks, counters and filename state
+    with new_ydl(download_opts(outputs_root, concurrent_fragments, external_downloader)) as ydl:
         info = ydl.extract_info(url, download=True)
-        video_id = info.get("id")
-        title = info.get("title")
         filename = ydl.prepare_filename(info)
-        # ensure mp4 extension when merged
-        base, _ = os.path.splitext(filename)
-        video_path = base + ".mp4"
+    video_id = info.get("id")
+    title = info.get("title")
+    # ensure mp4 extension when merged
+    base, _ = os.path.splitext(filename)
+    video_path = base + ".mp4"
+    # cache metadata so repeat runs don't need another extract_info
+    save_metadata(info)
+    invalidate_video_index()
     return {"video_id": video_id, "title": title, "video_path": video_path}
 
 
@@ -108,11 +343,10 @@ def main() -> None:
     args = parser.parse_args()
 
     # Temporary root; pipeline will relocate into per-video folders
-    out_root = os.path.abspath(os.path.join(BASE_DIR, "tmp_downloads"))
-    os.makedirs(out_root, exist_ok=True)
+    out_root = downloads_dir()
 
     data = download_youtube(args.url, out_root)
-    logger.info(json.dumps(data, ensure_ascii=False, indent=2))
+    logger.info(dumps_json(data, indent=True))
 
 
 if __name__ == "__main__":
@@ -1,8 +1,10 @@
 import os
 import sys
 import json
+import asyncio
+import hashlib
 import argparse
-from typing import Dict, Any, List, TYPE_CHECKING
+from typing import Dict, Any, Callable, List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from utils.config import Config
@@ -17,12 +19,19 @@ if BASE_DIR not in sys.path:
 
 from utils.paths import ensure_workdirs
 from utils.logging_utils import get_logger
-from utils.io_utils import read_json, write_json, write_srt
+from utils.io_utils import SrtStreamWriter, read_json, write_json, dumps_json, loads_json
+from utils.aio import gather_limited, write_json_async, write_srt_async
+from utils.json_stream import SegmentStreamParser
+from utils.groq_client import make_async_groq_client
+from utils.llm_cache import apply_with_cache
 
 logger = get_logger(__name__)
 
+# On-disk cache of enhancer results, keyed by a hash of everything that feeds the request
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "subgen", "enhancer")
+
 SYSTEM_PROMPT = (
-    "You will receive a JSON array of segments with fields: start, end, text. "
+    "You will receive a JSON array of segments, each a [start, end, text] array. "
     "Your task is to improve the transcript by considering the full context across all segments.\n\n"
     "ENHANCEMENT GUIDELINES:\n"
     "1. CONTEXT AWARENESS: Read through all segments first to understand the overall topic, speaker style, and content flow before making changes\n"
@@ -56,96 +65,382 @@ SYSTEM_PROMPT = (
     "- Ensure proper Urdu diacritics and character forms\n"
     "- Maintain consistency in Urdu script throughout\n"
     "- Fix grammatically incorrect Urdu constructions\n\n"
-    "Return a JSON object with a single key 'segments' mapping to the improved array. "
+    "Return a JSON object with a single key 'segments' mapping to the improved array, "
+    "using the same [start, end, text] form. "
     "Do not include any prose, explanation, or markdown—return JSON only.\n\n"
     "Example input:\n"
     "[\n"
-    '  {"start": 0.0, "end": 1.2, "text": "hello everbody welcome 2 the show"},\n'
-    '  {"start": 1.2, "end": 2.6, "text": "im your host john and today"},\n'
-    '  {"start": 2.6, "end": 4.0, "text": "where talking about machine learning"},\n'
-    '  {"start": 4.0, "end": 5.5, "text": "its a facinating feel that has many applications"}\n'
+    '  [0.0, 1.2, "hello everbody welcome 2 the show"],\n'
+    '  [1.2, 2.6, "im your host john and today"],\n'
+    '  [2.6, 4.0, "where talking about machine learning"],\n'
+    '  [4.0, 5.5, "its a facinating feel that has many applications"]\n'
     "]\n\n"
     "Example output:\n"
     "{\n"
     '  "segments": [\n'
-    '    {"start": 0.0, "end": 1.2, "text": "Hello everybody, welcome to the show."},\n'
-    '    {"start": 1.2, "end": 2.6, "text": "I\'m your host John, and today"},\n'
-    '    {"start": 2.6, "end": 4.0, "text": "we\'re talking about machine learning."},\n'
-    '    {"start": 4.0, "end": 5.5, "text": "It\'s a fascinating field that has many applications."}\n'
+    '    [0.0, 1.2, "Hello everybody, welcome to the show."],\n'
+    '    [1.2, 2.6, "I\'m your host John, and today"],\n'
+    '    [2.6, 4.0, "we\'re talking about machine learning."],\n'
+    '    [4.0, 5.5, "It\'s a fascinating field that has many applications."]\n'
     "  ]\n"
     "}"
 )
 
+# Stable identifier for SYSTEM_PROMPT so the provider can reuse its cached prefill
+SYSTEM_PROMPT_CACHE_KEY = hashlib.md5(SYSTEM_PROMPT.encode("utf-8")).hexdigest()
 
-def enhance_with_groq(
-    segments: List[Dict[str, Any]], config: "Config"
+
+def _parse_segments_response(content: str) -> List[Dict[str, Any]]:
+    """Extract the segments list from an LLM JSON response."""
+    try:
+        data = loads_json(content)
+    except Exception:
+        # fallback: wrap if assistant returned array directly
+        if content.strip().startswith("["):
+            data = loads_json(content)
+        else:
+            # try to coerce into the expected object if it's a bare array
+            raise
+    # allow either direct list or object with segments
+    if isinstance(data, dict) and "segments" in data:
+        return data["segments"]
+    if isinstance(data, list):
+        return data
+    raise ValueError("Unexpected LLM response format")
+
+
+def _compact_segments(segments: List[Dict[str, Any]]) -> List[List[Any]]:
+    """Encode segments as [start, end, text] rows with times rounded to 10 ms."""
+    return [
+        [
+            round(float(seg.get("start", 0)), 2),
+            round(float(seg.get("end", seg.get("start", 0))), 2),
+            seg.get("text", ""),
+        ]
+        for seg in segments
+    ]
+
+
+def _hydrate_segment(
+    row: Any, original: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Turn an LLM [start, end, text] row back into a segment dict.
+
+    When the original segment is known its exact timing is kept, since the
+    rows only carry rounded times. Plain dict segments are accepted too.
+    """
+    if isinstance(row, dict):
+        text = row.get("text", "")
+        start, end = row.get("start", 0.0), row.get("end", 0.0)
+    elif isinstance(row, (list, tuple)) and len(row) >= 3:
+        start, end, text = row[0], row[1], row[2]
+    else:
+        raise ValueError(f"Unexpected segment in LLM response: {row!r}")
+    if original is not None:
+        return {**original, "text": text}
+    return {"start": float(start), "end": float(end), "text": text}
+
+
+def _hydrate_segments(
+    rows: List[Any], originals: List[Dict[str, Any]]
 ) -> List[Dict[str, Any]]:
-    """Enhanced transcript segments using Groq API."""
-    from openai import OpenAI
-
-    # Use the config for API key and model
-    api_key = config.api.groq_api_key or os.environ.get("GROQ_API_KEY")
-    if not api_key:
-        raise ValueError(
-            "Groq API key is required. Set it in config or GROQ_API_KEY environment variable."
+    """Hydrate a whole response, mapping rows to originals by position when counts match."""
+    if len(rows) != len(originals):
+        logger.warning(
+            f"LLM returned {len(rows)} segments for {len(originals)}; using returned timings"
         )
+        return [_hydrate_segment(row) for row in rows]
+    return [_hydrate_segment(row, orig) for row, orig in zip(rows, originals)]
+
+
+def _chunk_segments(
+    segments: List[Dict[str, Any]], chunk_size: int, overlap: int
+) -> List[List[Dict[str, Any]]]:
+    """
+    Split segments into consecutive chunks, each prefixed with `overlap`
+    segments from the previous chunk for context.
+
+    A chunk_size of 0 or less keeps the whole transcript in a single chunk.
+    """
+    if chunk_size <= 0 or len(segments) <= chunk_size:
+        return [segments]
+    chunks = []
+    for start in range(0, len(segments), chunk_size):
+        chunks.append(segments[max(0, start - overlap) : start + chunk_size])
+    return chunks
+
+
+async def _stream_completion(
+    client: Any,
+    request_kwargs: Dict[str, Any],
+    on_segment: Optional[Callable[[Any], None]],
+    **extra: Any,
+) -> str:
+    """Stream a chat completion, reporting segment rows to on_segment as they complete."""
+    stream = await client.chat.completions.create(**request_kwargs, **extra, stream=True)
+    parser = SegmentStreamParser() if on_segment else None
+    parts: List[str] = []
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        parts.append(delta)
+        if parser:
+            for seg in parser.feed(delta):
+                on_segment(seg)
+
+    content = "".join(parts)
+    if not content:
+        raise RuntimeError("LLM completion returned no content")
+    return content
+
+
+def _row_callback(
+    chunk: List[Dict[str, Any]], on_segment: Optional[Callable[[Dict[str, Any]], None]]
+) -> Optional[Callable[[Any], None]]:
+    """
+    Callback for one streamed completion that maps its rows onto the chunk's segments
+    in arrival order, or None without on_segment.
+    """
+    if not on_segment:
+        return None
+    streamed = iter(range(len(chunk)))
 
-    client = OpenAI(base_url="https://api.groq.com/openai/v1", api_key=api_key)
+    def on_row(row: Any) -> None:
+        index = next(streamed, None)
+        on_segment(_hydrate_segment(row, chunk[index] if index is not None else None))
+
+    return on_row
+
+
+async def _enhance_chunk(
+    client: Any,
+    chunk: List[Dict[str, Any]],
+    config: "Config",
+    on_segment: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """Enhance one chunk of segments with a single streamed chat completion."""
     messages = [
         {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": json.dumps(segments, ensure_ascii=False)},
+        {"role": "user", "content": dumps_json(_compact_segments(chunk))},
     ]
 
     request_kwargs = {
         "model": config.llm.model,
         "messages": messages,
         "temperature": config.llm.enhancer.temperature,
+        # Fixed seed so identical input gives identical (cacheable) output
+        "seed": 0,
     }
 
+    # Drop the prompt cache key first, and JSON mode only if the provider rejects that too
+    attempts = [
+        {
+            "response_format": {"type": "json_object"},
+            "extra_body": {"prompt_cache_key": SYSTEM_PROMPT_CACHE_KEY},
+        },
+        {"response_format": {"type": "json_object"}},
+        {},
+    ]
+    for attempt, extra in enumerate(attempts):
+        try:
+            # A fresh callback per attempt, so each one's rows are matched from the chunk's first segment
+            content = await _stream_completion(
+                client, request_kwargs, _row_callback(chunk, on_segment), **extra
+            )
+            break
+        except Exception as e:
+            if attempt == len(attempts) - 1:
+                raise
+            dropped = "prompt cache key" if "extra_body" in extra else "response_format"
+            logger.warning(f"LLM request failed, retrying without {dropped}: {e}")
+
+    # The full response stays authoritative; streamed segments are only a preview
+    return _hydrate_segments(_parse_segments_response(content), chunk)
+
+
+def _stitch_chunks(
+    results: List[List[Dict[str, Any]]], offsets: List[int], total: int
+) -> List[Dict[str, Any]]:
+    """
+    Place each chunk's segments at its offset into the transcript; where chunks
+    overlap, the later chunk wins.
+
+    A chunk the model answered with too few rows leaves its remaining slots
+    empty and they are dropped; rows past the end of the transcript are kept.
+    """
+    slots: List[Optional[Dict[str, Any]]] = [None] * total
+    extra: List[Dict[str, Any]] = []
+    for offset, chunk_result in zip(offsets, results):
+        for index, seg in enumerate(chunk_result, start=offset):
+            if index < total:
+                slots[index] = seg
+            else:
+                extra.append(seg)
+    return [seg for seg in slots if seg is not None] + extra
+
+
+def _chunk_callback(
+    on_chunk: Optional[Callable[[List[Dict[str, Any]]], None]],
+    num_segments: int,
+    num_chunks: int,
+    chunk_size: int,
+    overlap: int,
+) -> Optional[Callable[[List[Dict[str, Any]]], None]]:
+    """
+    Wrap on_chunk to drop each chunk's leading context segments, which were
+    already reported with the previous chunk; None without on_chunk.
+    """
+    if not on_chunk:
+        return None
+    starts = range(0, num_segments, chunk_size) if num_chunks > 1 else [0]
+    skips = iter([min(overlap, start) for start in starts])
+
+    def on_result(chunk_result: List[Dict[str, Any]]) -> None:
+        on_chunk(chunk_result[next(skips, 0):])
+
+    return on_result
+
+
+async def enhance_with_groq_async(
+    segments: List[Dict[str, Any]],
+    config: "Config",
+    on_segment: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_chunk: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Enhance transcript segments using Groq API, sending chunks concurrently.
+
+    Segments are split into chunks of `llm.enhancer.chunk_size` with
+    `llm.enhancer.chunk_overlap` segments of shared context, with at most
+    `llm.max_concurrency` requests in flight. Responses are
+    stitched back by position; where chunks overlap, the later chunk wins.
+
+    Responses are streamed. If on_segment is given it is called with each
+    enhanced segment as soon as it has been received, in arrival order
+    (chunks interleave, and overlapping segments may be reported twice).
+    If on_chunk is given it is called with each finished chunk in transcript
+    order, without the context segments it shares with the previous chunk.
+    """
+    chunk_size = config.llm.enhancer.chunk_size
+    overlap = config.llm.enhancer.chunk_overlap
+    chunks = _chunk_segments(segments, chunk_size, overlap)
+    if len(chunks) > 1:
+        logger.info(f"Enhancing {len(segments)} segments in {len(chunks)} chunks")
+
+    client = make_async_groq_client(config)
     try:
-        completion = client.chat.completions.create(
-            **request_kwargs,
-            response_format={"type": "json_object"},
-        )
-    except Exception as e:
-        logger.warning(f"JSON mode failed, retrying without response_format: {e}")
-        completion = client.chat.completions.create(
-            **request_kwargs,
+        results = await gather_limited(
+            [_enhance_chunk(client, chunk, config, on_segment) for chunk in chunks],
+            config.llm.max_concurrency,
+            _chunk_callback(on_chunk, len(segments), len(chunks), chunk_size, overlap),
         )
+    finally:
+        await client.close()
 
-    if not getattr(completion, "choices", None):
-        raise RuntimeError("LLM completion returned no choices")
+    if len(results) == 1:
+        return results[0]
 
-    content = completion.choices[0].message.content
+    # Stitch by position, not start time: ASR output can repeat a timestamp
+    offsets = [max(0, start - overlap) for start in range(0, len(segments), chunk_size)]
+    return _stitch_chunks(results, offsets, len(segments))
 
-    try:
-        data = json.loads(content)
-    except Exception:
-        # fallback: wrap if assistant returned array directly
-        if content.strip().startswith("["):
-            data = json.loads(content)
-        else:
-            # try to coerce into the expected object if it's a bare array
-            raise
-    # allow either direct list or object with segments
-    if isinstance(data, dict) and "segments" in data:
-        return data["segments"]
-    if isinstance(data, list):
-        return data
-    raise ValueError("Unexpected LLM response format")
+
+def _cache_key(segments: List[Dict[str, Any]], config: "Config") -> str:
+    """SHA-256 over the prompt, model, chunking and segments of an enhancement request."""
+    payload = (
+        SYSTEM_PROMPT
+        + config.llm.model
+        + f"|{config.llm.enhancer.temperature}"
+        + f"|{config.llm.enhancer.chunk_size}|{config.llm.enhancer.chunk_overlap}|"
+        + json.dumps(segments, sort_keys=True, ensure_ascii=False)
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def enhance_with_groq(
+    segments: List[Dict[str, Any]],
+    config: "Config",
+    preview_srt: Optional[str] = None,
+    force: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Enhanced transcript segments using Groq API.
+
+    Results are cached on disk under CACHE_DIR, so re-running on identical
+    segments with the same model and prompt skips the API call. Individual
+    segments are cached as well (utils.llm_cache), so only lines never seen
+    before are sent. With force, every segment is sent again and the caches
+    are refreshed with the new results; setting `llm.enhancer.use_cache` to
+    False also sends everything, without touching the per-segment cache.
+
+    With preview_srt, enhanced chunks are written to that SRT file as they
+    arrive, so subtitles can be watched before the whole transcript is done.
+    The caller is expected to overwrite it with the returned segments.
+    """
+    cache_path = os.path.join(CACHE_DIR, f"{_cache_key(segments, config)}.json")
+    if config.llm.enhancer.use_cache and not force and os.path.exists(cache_path):
+        try:
+            cached = read_json(cache_path)
+            logger.info(f"Enhancer cache hit: {cache_path}")
+            return cached["segments"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable enhancer cache entry {cache_path}: {e}")
+
+    def enhance(pending: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not preview_srt:
+            return asyncio.run(enhance_with_groq_async(pending, config))
+        with SrtStreamWriter(preview_srt) as preview:
+            return asyncio.run(enhance_with_groq_async(pending, config, on_chunk=preview.append))
+
+    if config.llm.enhancer.use_cache:
+        # Only segments whose text hasn't been enhanced before go to the LLM
+        enhanced_segments = apply_with_cache(
+            segments,
+            enhance,
+            config.llm.model,
+            "enhance",
+            variant=f"{SYSTEM_PROMPT_CACHE_KEY}|{config.llm.enhancer.temperature}",
+            refresh=force,
+        )
+    else:
+        enhanced_segments = enhance(segments)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    write_json(cache_path, {"segments": enhanced_segments})
+    return enhanced_segments
 
 
 # Backward compatibility alias
-def enhance_with_openai(segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def enhance_with_openai(
+    segments: List[Dict[str, Any]], use_cache: bool = True
+) -> List[Dict[str, Any]]:
     """Backward compatibility wrapper for enhance_with_groq."""
     from utils.config import Config
 
     config = Config()
     config.llm.model = os.environ.get("LLM_MODEL_NAME", "llama3-8b-8192")
     config.api.groq_api_key = os.environ.get("GROQ_API_KEY", "")
+    config.llm.enhancer.use_cache = use_cache
     return enhance_with_groq(segments, config)
 
 
+async def _write_outputs(
+    json_path: str,
+    srt_path: str,
+    enhanced_json: Dict[str, Any],
+    enhanced_segments: List[Dict[str, Any]],
+) -> None:
+    """Write the enhanced JSON and SRT files concurrently."""
+    await asyncio.gather(
+        write_json_async(json_path, enhanced_json),
+        write_srt_async(srt_path, enhanced_segments),
+    )
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--video-id", required=True)
@@ -153,6 +448,9 @@ def main() -> None:
         "--input-json", required=True, help="path to ASR json with segments"
     )
     parser.add_argument("--backend", default="groq", choices=["openai", "groq"])
+    parser.add_argument(
+        "--force", action="store_true", help="ignore cached results and call the LLM"
+    )
     args = parser.parse_args()
 
     work = ensure_workdirs(args.video_id)
@@ -161,7 +459,7 @@ def main() -> None:
 
     if args.backend in ["openai", "groq"]:
         enhanced_segments = enhance_with_openai(
-            segments
+            segments, use_cache=not args.force
         )  # Uses backward compatibility wrapper
     else:
         enhanced_segments = segments
@@ -169,8 +467,7 @@ def main() -> None:
     enhanced_json = {"segments": enhanced_segments}
     json_path = os.path.join(work.enhanced_dir, "enhanced.json")
     srt_path = os.path.join(work.enhanced_dir, "enhanced.srt")
-    write_json(json_path, enhanced_json)
-    write_srt(srt_path, enhanced_segments)
+    asyncio.run(_write_outputs(json_path, srt_path, enhanced_json, enhanced_segments))
     logger.info(f"Saved: {json_path}\nSaved: {srt_path}")
 
 
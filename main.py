@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import os
 import sys
+import asyncio
 import argparse
 from pathlib import Path
 import traceback
@@ -9,20 +10,69 @@ PROJECT_ROOT = Path(__file__).parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from pipeline.run import run_pipeline_with_config  # type: ignore
-from utils.config import load_config, Config  # type: ignore
+from utils.config import load_config, Config, PIPELINE_STAGES  # type: ignore
+
+
+def parse_urls(value: str) -> list:
+    """Parse --urls: a path to a file with one URL per line, or a comma-separated list."""
+    if os.path.isfile(value):
+        with open(value, "r", encoding="utf-8") as f:
+            candidates = f.read().splitlines()
+    else:
+        candidates = value.split(",")
+    return [u.strip() for u in candidates if u.strip() and not u.strip().startswith("#")]
+
+
+def run_many(config: Config, urls: list) -> bool:
+    """
+    Run the pipeline for several URLs with overlapping stages.
+
+    Prints one JSON report keyed by URL. Returns True if every URL failed.
+    """
+    from utils.io_utils import dumps_json  # type: ignore
+    from pipeline.graph import run_pipeline_graph  # type: ignore
+    from downloader.download_youtube import batch_probe  # type: ignore
+    from utils.yt_cache import parse_video_id  # type: ignore
+
+    # Fetch all titles up front and drop URLs pointing at the same video
+    batch_probe(urls)
+    seen = set()
+    unique_urls = []
+    for url in urls:
+        key = parse_video_id(url) or url
+        if key not in seen:
+            seen.add(key)
+            unique_urls.append(url)
+
+    failures = 0
+    report = {}
+    for job in asyncio.run(run_pipeline_graph(config, unique_urls)):
+        if "error" in job:
+            failures += 1
+            print(f"Error running pipeline for {job['url']}: {job['error']}")
+            report[job["url"]] = {"error": str(job["error"])}
+        else:
+            report[job["url"]] = job["result"]
+    print(dumps_json(report, indent=True))
+    return failures == len(unique_urls)
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="YouTube → Transcript → Subtitles (root entrypoint)")
     parser.add_argument("--config", "-c", help="Path to configuration file (default: config.yaml)")
     parser.add_argument("--url", help="YouTube URL (overrides config)")
+    parser.add_argument("--urls", help="Several YouTube URLs, comma-separated or a file with one URL per line")
+    parser.add_argument("--parallel", type=int, help="Number of concurrent downloads with --urls (overrides config)")
+    parser.add_argument("--parallel-asr", type=int, help="Number of videos transcribed at once with --urls (overrides config)")
     parser.add_argument("--asr-backend", choices=["local", "groq"], help="ASR backend (overrides config)")
     parser.add_argument("--whisper-model", help="Whisper model for local ASR (overrides config)")
     parser.add_argument("--llm-backend", choices=["groq"], help="LLM backend (overrides config)")
     parser.add_argument("--subtitle-mode", choices=["soft", "burn"], help="Subtitle mode (overrides config)")
     parser.add_argument("--target-lang", help="Target language for translation (overrides config)")
     parser.add_argument("--box-opacity", type=float, help="Opacity of subtitle background box (overrides config)")
+    parser.add_argument("--force", action="store_true", help="Rerun enhance and translate without cached LLM results (same as --force-stage enhance,translate)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore every cached result (ASR, separation, LLM, completed stages)")
+    parser.add_argument("--force-stage", help="Comma-separated stages to rerun: separation, asr, enhance, translate, mux")
     args = parser.parse_args()
 
     # Load configuration
@@ -51,13 +101,41 @@ def main() -> None:
         config.llm.translator.enabled = True
     if args.box_opacity is not None:
         config.subtitles.box_opacity = args.box_opacity
+    if args.parallel:
+        config.video.parallel = args.parallel
+    if args.parallel_asr:
+        config.asr.parallel = args.parallel_asr
+    if args.force_stage:
+        config.processing.force_stages = [s.strip() for s in args.force_stage.split(",") if s.strip()]
+        unknown_stages = [s for s in config.processing.force_stages if s not in PIPELINE_STAGES]
+        if unknown_stages:
+            print(f"Error: unknown stage(s) for --force-stage: {', '.join(unknown_stages)}. Choose from {', '.join(PIPELINE_STAGES)}.")
+            sys.exit(1)
+    # --force and --no-cache are shorthands for forcing stages; a forced stage skips every cache it reads
+    if args.force:
+        config.processing.force_stages += [s for s in ("enhance", "translate") if s not in config.processing.force_stages]
+    if args.no_cache:
+        config.processing.force_stages = list(PIPELINE_STAGES)
+
+    # Batch mode: process several URLs concurrently
+    if args.urls:
+        urls = parse_urls(args.urls)
+        if not urls:
+            print("Error: --urls did not contain any URL.")
+            sys.exit(1)
+        # Partial failures are reported per URL; only a batch where nothing worked fails
+        if run_many(config, urls):
+            sys.exit(1)
+        return
 
     # Validate required parameters
     if not config.video.url:
         print("Error: YouTube URL is required. Provide it via --url or in config file.")
         sys.exit(1)
 
-    # Run pipeline
+    # Run pipeline (imported here so --help and config errors don't pay for the pipeline imports)
+    from pipeline.run import run_pipeline_with_config  # type: ignore
+
     try:
         result = run_pipeline_with_config(config)
         print(result)
@@ -0,0 +1,199 @@
+"""Run the pipeline for several videos as an asyncio task graph.
+
+Each video flows through download -> media (placement, audio extraction and
+separation) -> transcribe -> llm (enhance, translate) -> mux, with an
+asyncio.Queue between consecutive stages. Every stage has its own thread
+pool, so different videos occupy different stages at the same time: while
+one transcript is with the LLM, the next video is being transcribed and a
+third one is downloading.
+"""
+
+import os
+import sys
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# ensure package path
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from utils.paths import downloads_dir
+from utils.logging_utils import get_logger
+from utils.config import Config
+from utils.aio import BackgroundWrites
+from pipeline.run import (
+    backend_module,
+    download_with_audio,
+    preload_backends,
+    stage_media,
+    stage_transcribe,
+    stage_llm,
+    stage_mux,
+)
+
+logger = get_logger(__name__)
+
+# Workers per stage. Media runs one video at a time since it competes for
+# the CPU; download and LLM stages are network bound. ASR concurrency comes
+# from asr.parallel (one at a time by default, the GPU is shared).
+STAGE_WORKERS = {"media": 1, "llm": 4, "mux": 2}
+
+
+async def _stage_worker(
+    name: str,
+    func: Callable[[Dict[str, Any]], None],
+    executor: ThreadPoolExecutor,
+    inbox: asyncio.Queue,
+    outbox: Optional[asyncio.Queue],
+    finished: asyncio.Queue,
+) -> None:
+    """Run func on each job from inbox; pass it on to outbox, or to finished when done or failed."""
+    loop = asyncio.get_running_loop()
+    while True:
+        job = await inbox.get()
+        try:
+            await loop.run_in_executor(executor, func, job)
+        except Exception as e:
+            logger.error(f"Stage {name} failed for {job['url']}: {e}")
+            job["error"] = e
+            await finished.put(job)
+            continue
+        await (outbox if outbox is not None else finished).put(job)
+
+
+def _preload_whisper(config: Config) -> None:
+    try:
+        backend_module("asr_local").preload_model(config)
+    except Exception as e:
+        # The transcribe stage reports the problem when it actually needs the model
+        logger.warning(f"Could not preload the Whisper model: {e}")
+
+
+def _preload_separator(config: Config) -> None:
+    separation = config.processing.audio.separation
+    try:
+        backend_module("separate").get_separator(
+            separation.model,
+            separation.output_format,
+            config.processing.audio.sample_rate,
+            separation.auto_select_best,
+            separation.stem_type,
+            separation.batch_size,
+        )
+    except Exception as e:
+        # The media stage logs the failure and falls back to the original audio
+        logger.warning(f"Could not preload the separation model: {e}")
+
+
+async def run_pipeline_graph(config: Config, urls: List[str]) -> List[Dict[str, Any]]:
+    """
+    Run the pipeline for all urls, overlapping the stages of different videos.
+
+    Args:
+        config: Configuration shared by all runs. Its video.url is ignored.
+        urls: YouTube URLs to process.
+
+    Returns:
+        One job per URL in completion order, each with "url" and either
+        "result" (the run_pipeline_with_config dictionary) or "error".
+    """
+    tmp_root = downloads_dir(config.video.tmp_downloads_dir)
+    # Import the stage backends here, not concurrently from several worker threads.
+    # The imports take seconds (torch, faster-whisper), so keep them off the caller's loop.
+    await asyncio.to_thread(preload_backends, config)
+
+    def download(job: Dict[str, Any]) -> None:
+        # Safe on several workers: each download opens its own YoutubeDL and
+        # metadata lookups use a per-thread instance
+        job["dl_info"], job["audio_path"] = download_with_audio(job["url"], tmp_root, config)
+
+    def media(job: Dict[str, Any]) -> None:
+        job["state"] = stage_media(
+            config, job["dl_info"], job["writes"], prefetched_audio=job["audio_path"]
+        )
+
+    def transcribe(job: Dict[str, Any]) -> None:
+        stage_transcribe(config, job["state"], job["writes"])
+
+    def llm(job: Dict[str, Any]) -> None:
+        stage_llm(config, job["state"], job["writes"])
+
+    def mux(job: Dict[str, Any]) -> None:
+        job["result"] = stage_mux(config, job["state"], job["writes"])
+
+    stages = [
+        ("download", download, config.video.parallel or 4),
+        ("media", media, STAGE_WORKERS["media"]),
+        ("transcribe", transcribe, max(config.asr.parallel, 1)),
+        ("llm", llm, STAGE_WORKERS["llm"]),
+        ("mux", mux, STAGE_WORKERS["mux"]),
+    ]
+    queues = [asyncio.Queue() for _ in stages]
+    finished: asyncio.Queue = asyncio.Queue()
+    executors = [
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        for name, _, workers in stages
+    ]
+
+    if config.asr.backend == "local":
+        # Load the Whisper model on the transcribe worker while the first videos download
+        transcribe_index = [name for name, _, _ in stages].index("transcribe")
+        executors[transcribe_index].submit(_preload_whisper, config)
+    if config.processing.audio.separation.enabled:
+        # Likewise the separation model, on the media worker that will use it
+        media_index = [name for name, _, _ in stages].index("media")
+        executors[media_index].submit(_preload_separator, config)
+
+    for url in urls:
+        queues[0].put_nowait({"url": url, "writes": BackgroundWrites()})
+
+    jobs: List[Dict[str, Any]] = []
+    try:
+        async with asyncio.TaskGroup() as group:
+            workers = []
+            for i, (name, func, count) in enumerate(stages):
+                outbox = queues[i + 1] if i + 1 < len(stages) else None
+                for _ in range(count):
+                    workers.append(
+                        group.create_task(
+                            _stage_worker(name, func, executors[i], queues[i], outbox, finished)
+                        )
+                    )
+            while len(jobs) < len(urls):
+                jobs.append(await finished.get())
+            for worker in workers:
+                worker.cancel()
+    finally:
+        # Waits for in-flight work such as the model preloads, on a helper thread
+        await asyncio.to_thread(_shutdown_executors, executors)
+    return jobs
+
+
+def _shutdown_executors(executors: List[ThreadPoolExecutor]) -> None:
+    for executor in executors:
+        executor.shutdown(wait=True)
+
+
+async def run_pipeline_async(config: Config, url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run the pipeline for one video from async code (e.g. a web server).
+
+    The stages run on the graph's worker threads, so the event loop stays
+    free while the video downloads, transcribes and muxes.
+
+    Args:
+        config: Pipeline configuration.
+        url: YouTube URL; defaults to config.video.url.
+
+    Returns:
+        The run_pipeline_with_config result dictionary. A stage failure is re-raised.
+    """
+    url = url or config.video.url
+    if not url:
+        raise ValueError("No YouTube URL given")
+    (job,) = await run_pipeline_graph(config, [url])
+    if "error" in job:
+        raise job["error"]
+    return job["result"]
@@ -1,74 +1,293 @@
 import os
 import sys
-import json
 import argparse
-import shutil
-from typing import Dict, Any
+import hashlib
+import logging
+import importlib
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 
 # ensure package path
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
-from utils.paths import ensure_workdirs
+from utils.paths import WorkDirs, downloads_dir, ensure_workdirs, pipeline_paths
 from utils.logging_utils import get_logger
-from utils.ffmpeg_utils import extract_audio
-from utils.io_utils import write_json, write_srt
+from utils.ffmpeg_utils import (
+    audio_codec,
+    extract_audio,
+    extract_audio_to_array,
+    add_subtitles_soft,
+    burn_subtitles,
+)
+from utils.io_utils import read_json, dumps_json
+from utils.aio import BackgroundWrites
+from utils.fs_utils import fast_move, same_file
+from utils.stage_cache import stage_cache_path, load_cached_transcript, load_cached_separation
+from utils.pipeline_state import PipelineState, file_fingerprint, stage_key
 from utils.config import Config, load_config
-from downloader.download_youtube import download_youtube
+from downloader.download_youtube import (
+    download_youtube,
+    download_audio_wav,
+    extract_video_id_from_url,
+    probe_existing,
+    invalidate_video_index,
+    require_youtube_url,
+)
 
 logger = get_logger(__name__)
 
+# faster-whisper expects in-memory audio as 16 kHz mono float32
+WHISPER_SAMPLE_RATE = 16000
 
-def run_pipeline_with_config(config: Config) -> Dict[str, Any]:
+# Stage implementations, imported on first use so that e.g. a Groq-only run
+# never pulls in torch. name -> (module, attribute)
+BACKENDS = {
+    "separate": ("separator.separate_audio", "separate_audio_file"),
+    "asr_local": ("transcriber.transcribe_local", "transcribe_with_whisper"),
+    "asr_groq": ("transcriber.transcribe_groq", "transcribe_with_groq"),
+    "asr_groq_stream": ("transcriber.transcribe_groq", "transcribe_video_with_groq"),
+    "enhance": ("enhancer.enhance_transcript", "enhance_with_groq"),
+    "translate": ("translator.translate_transcript", "translate_with_groq"),
+}
+
+
+def backend_module(name: str) -> Any:
+    """Import and return the module that provides a BACKENDS entry."""
+    return importlib.import_module(BACKENDS[name][0])
+
+
+@functools.lru_cache(maxsize=None)
+def load_backend(name: str) -> Any:
+    """Import a stage implementation once and return it."""
+    return getattr(backend_module(name), BACKENDS[name][1])
+
+
+def required_backends(config: Config) -> List[str]:
+    """Names of the backends a pipeline run with this config will call."""
+    names = []
+    if config.processing.audio.separation.enabled:
+        names.append("separate")
+    names.append("asr_local" if config.asr.backend == "local" else "asr_groq")
+    if config.llm.enhancer.enabled and config.llm.backend == "groq":
+        names.append("enhance")
+    if (
+        config.llm.translator.enabled
+        and config.llm.translator.target_language
+        and config.llm.backend == "groq"
+    ):
+        names.append("translate")
+    return names
+
+
+def preload_backends(config: Config) -> None:
+    """Import everything a long-running process will need up front, once."""
+    for name in required_backends(config):
+        try:
+            load_backend(name)
+        except ImportError as e:
+            # The stage itself reports this (or falls back) when it runs
+            logger.warning("Could not preload %s backend: %s", name, e)
+
+
+def uses_audio_in_memory(config: Config) -> bool:
+    """True when local ASR is the only consumer of the audio, so no audio.wav is written."""
+    return (
+        config.processing.audio.in_memory
+        and config.asr.backend == "local"
+        and not config.processing.audio.separation.enabled
+    )
+
+
+def streams_audio_to_groq(config: Config) -> bool:
     """
-    Run the complete pipeline using configuration object.
+    True when Groq ASR is the only consumer of the audio.
 
-    Args:
-        config: Configuration object containing all pipeline settings.
+    Unless the audio was already fetched during the download, it is then
+    uploaded in chunks straight from the video instead of extracted first.
+    """
+    return (
+        config.asr.groq_streaming
+        and config.asr.backend == "groq"
+        and not config.processing.audio.separation.enabled
+    )
+
+
+def audio_output_codec(config: Config) -> str:
+    """
+    Codec of the extracted audio file.
+
+    Audio that goes straight to Groq is compressed (FLAC by default) so it
+    uploads faster and long videos fit the request size limit in one piece.
+    Separation and local ASR keep plain WAV.
+    """
+    if config.asr.backend == "groq" and not config.processing.audio.separation.enabled:
+        return config.asr.groq_audio_codec
+    return "wav"
+
+
+def audio_output_path(audio_dir: str, config: Config) -> str:
+    return os.path.join(audio_dir, "audio" + audio_codec(audio_output_codec(config))[1])
+
+
+def asr_settings(config: Config) -> Tuple[str, ...]:
+    """Backend, language and model settings that determine the transcript of given audio."""
+    if config.asr.backend == "local":
+        params = (config.asr.whisper_model, repr(config.advanced.faster_whisper))
+    elif config.asr.backend == "groq":
+        params = (config.asr.groq_model,)
+    else:
+        raise ValueError(f"Unknown ASR backend: {config.asr.backend}")
+    return (config.asr.backend, config.video.input_language, *params)
+
+
+def video_asr_key(config: Config, video_path: str) -> str:
+    """Stage key for transcribing a video: the file plus every setting its audio and transcript depend on."""
+    audio = config.processing.audio
+    return stage_key(
+        file_fingerprint(video_path),
+        audio.sample_rate,
+        audio.mono,
+        audio_output_codec(config),
+        *asr_settings(config),
+    )
+
+
+def place_video(video_path: str, work: WorkDirs) -> str:
+    """Move a downloaded video into work.video_dir (unless it is already there); return its path."""
+    dst_video_path = os.path.join(work.video_dir, os.path.basename(video_path))
+    if same_file(video_path, dst_video_path):
+        # Video is already in the correct location (existing video)
+        logger.info("Using existing video at: %s", video_path)
+        return video_path
+    # Video is in tmp_downloads (same filesystem as outputs), rename it into the video directory
+    if os.path.exists(video_path):
+        fast_move(video_path, dst_video_path)
+        invalidate_video_index()
+    return dst_video_path
+
+
+def download_settings(config: Config) -> dict:
+    """Keyword arguments for download_youtube taken from config.video."""
+    return {
+        "concurrent_fragments": config.video.concurrent_fragments,
+        "external_downloader": config.video.external_downloader,
+    }
+
+
+def download_with_audio(
+    url: str, tmp_root: str, config: Config
+) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Download a video, streaming its audio into the audio file at the same time.
+
+    The audio is only prefetched for videos that aren't downloaded yet and
+    when the pipeline needs an audio file; otherwise this is download_youtube.
 
     Returns:
-        Dictionary with paths to all generated files and metadata.
+        (download info, path of the prefetched audio or None)
+    """
+    # Before extract_video_id_from_url, whose fallback would hand the URL to yt-dlp
+    require_youtube_url(url)
+    video_id = extract_video_id_from_url(url)
+    if uses_audio_in_memory(config) or probe_existing(video_id) is not None:
+        return download_youtube(url, tmp_root, **download_settings(config)), None
+
+    audio_path = audio_output_path(ensure_workdirs(video_id).audio_dir, config)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio") as executor:
+        audio_future = executor.submit(
+            download_audio_wav,
+            url,
+            audio_path,
+            config.processing.audio.sample_rate,
+            config.processing.audio.mono,
+            audio_output_codec(config),
+        )
+        dl_info = download_youtube(url, tmp_root, **download_settings(config))
+        try:
+            audio_future.result()
+        except Exception as e:
+            logger.warning("Audio prefetch failed, extracting from the video instead: %s", e)
+            return dl_info, None
+    return dl_info, audio_path
+
+
+def stage_media(
+    config: Config,
+    dl_info: Optional[Dict[str, Any]],
+    writes: BackgroundWrites,
+    prefetched_audio: Optional[str] = None,
+) -> Dict[str, Any]:
     """
-    url = config.video.url
+    Download (unless dl_info is given), place the video and prepare its audio.
 
+    Args:
+        config: Pipeline configuration.
+        dl_info: Result of an earlier download; downloads config.video.url if None.
+        writes: Background writer for stage outputs.
+        prefetched_audio: Audio file already produced alongside the download.
+
+    Returns:
+        Pipeline state consumed by the later stages.
+    """
     # 1) Download video (or use existing if already downloaded)
-    tmp_root = os.path.join(BASE_DIR, config.video.tmp_downloads_dir)
-    os.makedirs(tmp_root, exist_ok=True)
-    logger.info(f"Checking/downloading video: {url}")
-    dl_info = download_youtube(url, tmp_root)
+    if dl_info is None:
+        url = config.video.url
+        tmp_root = downloads_dir(config.video.tmp_downloads_dir)
+        logger.info("Checking/downloading video: %s", url)
+        dl_info, prefetched_audio = download_with_audio(url, tmp_root, config)
     video_id = dl_info["video_id"]
     title = dl_info.get("title")
     video_path = dl_info["video_path"]
     work = ensure_workdirs(video_id)
-
-    # Check if video is already in the correct location
-    dst_video_path = os.path.join(work.video_dir, os.path.basename(video_path))
-    if os.path.abspath(video_path) != os.path.abspath(dst_video_path):
-        # Video is in tmp_downloads, need to move it to the video directory
-        if os.path.exists(video_path):
-            shutil.move(video_path, dst_video_path)
-        video_path = dst_video_path
+    paths = pipeline_paths(work, config.asr.backend, config.llm.translator.target_language)
+    pipeline_state = PipelineState(work.root, force=tuple(config.processing.force_stages))
+
+    video_path = place_video(video_path, work)
+
+    # save metadata (the downloader caches the full record when it fetches info)
+    if not os.path.exists(paths.metadata_json):
+        writes.json(paths.metadata_json, {"video_id": video_id, "title": title})
+
+    # 2) Extract audio, unless the transcript of this video can be reused as is
+    asr_key = video_asr_key(config, video_path)
+    asr_reused = None
+    if not config.processing.audio.separation.enabled:
+        asr_reused = pipeline_state.outputs("asr", asr_key)
+    audio_array = None
+    if asr_reused is not None:
+        existing_audio = audio_output_path(work.audio_dir, config)
+        audio_path = prefetched_audio or (existing_audio if os.path.isfile(existing_audio) else None)
+        logger.info("=====Skipping audio extraction, video already transcribed=====")
+    elif prefetched_audio:
+        audio_path = prefetched_audio
+        logger.info("=====Audio streamed during download=====")
+        logger.info("OUTPUT: %s", audio_path)
+    elif uses_audio_in_memory(config):
+        # Only local ASR reads the audio, so skip the round trip through audio.wav
+        audio_path = None
+        logger.info("=====Extracting audio (in memory)=====")
+        logger.info("INPUT: %s", video_path)
+        audio_array = extract_audio_to_array(video_path, sample_rate_hz=WHISPER_SAMPLE_RATE)
+        logger.info("OUTPUT: %.1fs of audio", len(audio_array) / WHISPER_SAMPLE_RATE)
+    elif streams_audio_to_groq(config):
+        # Extraction happens during transcription, chunk by chunk
+        audio_path = None
+        logger.info("=====Audio will be streamed to Groq during transcription=====")
     else:
-        # Video is already in the correct location (existing video)
-        logger.info(f"Using existing video at: {video_path}")
-
-    # save/update metadata
-    metadata_path = os.path.join(work.root, "metadata.json")
-    if not os.path.exists(metadata_path) or title:
-        write_json(metadata_path, {"video_id": video_id, "title": title})
-
-    # 2) Extract audio
-    audio_path = os.path.join(work.audio_dir, "audio.wav")
-    logger.info("=====Extracting audio=====")
-    logger.info(f"INPUT: {video_path}")
-    logger.info(f"OUTPUT: {audio_path}")
-    extract_audio(
-        video_path,
-        audio_path,
-        sample_rate_hz=config.processing.audio.sample_rate,
-        mono=config.processing.audio.mono,
-    )
+        audio_path = audio_output_path(work.audio_dir, config)
+        logger.info("=====Extracting audio=====")
+        logger.info("INPUT: %s", video_path)
+        logger.info("OUTPUT: %s", audio_path)
+        extract_audio(
+            video_path,
+            audio_path,
+            sample_rate_hz=config.processing.audio.sample_rate,
+            mono=config.processing.audio.mono,
+            codec=audio_output_codec(config),
+        )
 
     # 2.5) Audio separation (optional)
     transcription_audio_path = audio_path  # Default to original audio
@@ -76,21 +295,40 @@ def run_pipeline_with_config(config: Config) -> Dict[str, Any]:
 
     if config.processing.audio.separation.enabled:
         logger.info("=====Separating audio (vocals from music)=====")
-        logger.info(f"INPUT: {audio_path}")
-        logger.info(f"OUTPUT DIR: {work.separated_dir}")
+        logger.info("INPUT: %s", audio_path)
+        logger.info("OUTPUT DIR: %s", work.separated_dir)
         try:
-            from separator.separate_audio import separate_audio_file
+            separate_audio_file = load_backend("separate")
 
             separation_output_dir = work.separated_dir
-            separation_results = separate_audio_file(
-                audio_path=audio_path,
-                output_dir=separation_output_dir,
-                model_name=config.processing.audio.separation.model,
-                output_format=config.processing.audio.separation.output_format,
-                sample_rate=config.processing.audio.sample_rate,
-                auto_select_best=config.processing.audio.separation.auto_select_best,
-                stem_type=config.processing.audio.separation.stem_type,
+            separation = config.processing.audio.separation
+            separation_cache_path = stage_cache_path(
+                separation_output_dir,
+                "separation",
+                audio_path,
+                separation.model,
+                separation.output_format,
+                config.processing.audio.sample_rate,
+                separation.auto_select_best,
+                separation.stem_type,
             )
+            separation_results = None
+            if "separation" not in pipeline_state.force:
+                separation_results = load_cached_separation(separation_cache_path)
+            if separation_results is not None:
+                logger.info("Separation cache hit: %s", separation_cache_path)
+            else:
+                separation_results = separate_audio_file(
+                    audio_path=audio_path,
+                    output_dir=separation_output_dir,
+                    model_name=separation.model,
+                    output_format=separation.output_format,
+                    sample_rate=config.processing.audio.sample_rate,
+                    auto_select_best=separation.auto_select_best,
+                    stem_type=separation.stem_type,
+                    batch_size=separation.batch_size,
+                )
+                writes.json(separation_cache_path, separation_results, compact=True)
 
             # Use separated vocals for transcription if configured
             if (
@@ -98,73 +336,176 @@ def run_pipeline_with_config(config: Config) -> Dict[str, Any]:
                 and "vocals" in separation_results
             ):
                 transcription_audio_path = separation_results["vocals"]
-                logger.info(
-                    f"SUCCESS: Separated vocals saved to {transcription_audio_path}"
-                )
-                logger.info(
-                    f"ASR WILL USE: {transcription_audio_path} (separated vocals)"
-                )
+                logger.info("SUCCESS: Separated vocals saved to %s", transcription_audio_path)
+                logger.info("ASR WILL USE: %s (separated vocals)", transcription_audio_path)
             else:
                 logger.info("No vocals stem found in separation results")
-                logger.info(f"ASR WILL USE: {audio_path} (original audio)")
+                logger.info("ASR WILL USE: %s (original audio)", audio_path)
 
         except Exception as e:
-            logger.error(f"Audio separation failed: {e}")
+            logger.error("Audio separation failed: %s", e)
             logger.warning("Continuing with original audio for transcription")
-            logger.info(f"ASR WILL USE: {audio_path} (original audio)")
+            logger.info("ASR WILL USE: %s (original audio)", audio_path)
     else:
         logger.info("=====Audio separation disabled=====")
-        logger.info(f"ASR WILL USE: {audio_path} (original audio)")
+        logger.info("ASR WILL USE: %s (original audio)", audio_path or "in-memory audio")
+
+    return {
+        "video_id": video_id,
+        "video_path": video_path,
+        "work": work,
+        "paths": paths,
+        "pipeline_state": pipeline_state,
+        "audio_path": audio_path,
+        "transcription_audio_path": transcription_audio_path,
+        "audio_array": audio_array,
+        "separation_results": separation_results,
+        "asr_key": asr_key,
+        "asr_reused": asr_reused,
+    }
+
+
+def stage_transcribe(
+    config: Config, state: Dict[str, Any], writes: BackgroundWrites
+) -> None:
+    """Transcribe the prepared audio, adding the ASR results to state."""
+    work = state["work"]
+    paths = state["paths"]
+    transcription_audio_path = state["transcription_audio_path"]
+    # Samples decoded in memory are only needed here; don't keep them alive afterwards
+    audio_array = state.pop("audio_array", None)
+    reused = state.pop("asr_reused", None)
+    if reused is not None:
+        logger.info("Skipping ASR, already done: %s", reused["json"])
+        state.update(
+            asr_json=read_json(reused["json"]), asr_json_path=reused["json"], asr_srt_path=reused["srt"]
+        )
+        return
+    # Groq without an audio file: the audio is extracted and uploaded piecewise from the video
+    stream_from_video = (
+        config.asr.backend == "groq" and audio_array is None and not transcription_audio_path
+    )
 
     # 3) Transcribe
-    logger.info(f"=====Transcribing audio with {config.asr.backend} backend=====")
-    logger.info(f"INPUT: {transcription_audio_path}")
-    if config.asr.backend == "local":
-        from transcriber.transcribe_local import transcribe_with_whisper
-
-        asr_json = transcribe_with_whisper(transcription_audio_path, config)
-        asr_json_path = os.path.join(work.transcripts_dir, "asr_local.json")
-        asr_srt_path = os.path.join(work.transcripts_dir, "asr_local.srt")
-        write_json(asr_json_path, asr_json)
-        write_srt(asr_srt_path, asr_json["segments"])
-        logger.info(f"OUTPUT: {asr_json_path}")
-        logger.info(f"OUTPUT: {asr_srt_path}")
-    elif config.asr.backend == "groq":
-        from transcriber.transcribe_groq import transcribe_with_groq
-
-        asr_json = transcribe_with_groq(transcription_audio_path, config)
-        asr_json_path = os.path.join(work.transcripts_dir, "asr_groq.json")
-        asr_srt_path = os.path.join(work.transcripts_dir, "asr_groq.srt")
-        write_json(asr_json_path, asr_json)
-        write_srt(asr_srt_path, asr_json["segments"])
-        logger.info(f"OUTPUT: {asr_json_path}")
-        logger.info(f"OUTPUT: {asr_srt_path}")
+    logger.info("=====Transcribing audio with %s backend=====", config.asr.backend)
+    if stream_from_video:
+        logger.info("INPUT: %s (streamed audio)", state["video_path"])
     else:
-        raise ValueError(f"Unknown ASR backend: {config.asr.backend}")
+        logger.info("INPUT: %s", transcription_audio_path or "in-memory audio")
+    settings = asr_settings(config)
+
+    if audio_array is not None:
+        asr_input = audio_array
+    elif stream_from_video:
+        # Hashing a whole video is slow; its path, size and mtime identify it well enough
+        fingerprint = file_fingerprint(state["video_path"]) + "|" + config.asr.groq_audio_codec
+        asr_input = fingerprint.encode("utf-8")
+    else:
+        asr_input = transcription_audio_path
+
+    # Skip ASR when this exact audio was already transcribed with the same settings
+    asr_cache_path = stage_cache_path(
+        work.transcripts_dir,
+        "asr",
+        asr_input,
+        *settings,
+    )
+    asr_json = None
+    if "asr" not in state["pipeline_state"].force:
+        asr_json = load_cached_transcript(asr_cache_path)
+    if asr_json is not None:
+        logger.info("ASR cache hit: %s", asr_cache_path)
+    else:
+        if config.asr.backend == "local":
+            transcribe_with_whisper = load_backend("asr_local")
+
+            # Segments land in the ASR SRT as they are decoded; the final write replaces it
+            asr_json = transcribe_with_whisper(
+                transcription_audio_path, config, audio_array=audio_array, preview_srt=paths.asr_srt
+            )
+        elif stream_from_video:
+            transcribe_video_with_groq = load_backend("asr_groq_stream")
+
+            asr_json = transcribe_video_with_groq(state["video_path"], config)
+        else:
+            transcribe_with_groq = load_backend("asr_groq")
+
+            asr_json = transcribe_with_groq(transcription_audio_path, config)
+        writes.json(asr_cache_path, asr_json, compact=True)
+
+    asr_json_path = paths.asr_json
+    asr_srt_path = paths.asr_srt
+    writes.json(asr_json_path, asr_json)
+    writes.srt(asr_srt_path, asr_json["segments"])
+    state["pipeline_state"].complete(
+        "asr", state["asr_key"], {"json": asr_json_path, "srt": asr_srt_path}, pending=True
+    )
+    logger.info("OUTPUT: %s", asr_json_path)
+    logger.info("OUTPUT: %s", asr_srt_path)
+
+    state.update(
+        asr_json=asr_json, asr_json_path=asr_json_path, asr_srt_path=asr_srt_path
+    )
+
+
+def stage_llm(config: Config, state: Dict[str, Any], writes: BackgroundWrites) -> None:
+    """Enhance and optionally translate the transcript, adding the SRT to use to state."""
+    paths = state["paths"]
+    pipeline_state = state["pipeline_state"]
+    asr_json = state["asr_json"]
+    asr_srt_path = state["asr_srt_path"]
 
     # 4) Enhance transcript
     if config.llm.enhancer.enabled:
         logger.info("=====Enhancing transcript with LLM=====")
-        logger.info(f"INPUT: ASR segments ({len(asr_json['segments'])} segments)")
-        from enhancer.enhance_transcript import enhance_with_groq
-
-        if config.llm.backend == "groq":
-            enhanced_segments = enhance_with_groq(asr_json["segments"], config)
-            logger.info(f"SUCCESS: Enhanced {len(enhanced_segments)} segments")
-        else:
-            logger.warning(
-                f"Unknown LLM backend: {config.llm.backend}, skipping enhancement"
+        logger.info("INPUT: ASR segments (%s segments)", len(asr_json["segments"]))
+        enhance_key = stage_key(
+            asr_json["segments"],
+            config.llm.backend,
+            config.llm.model,
+            repr(config.llm.enhancer),
+            backend_module("enhance").SYSTEM_PROMPT_CACHE_KEY,
+        )
+        reused = None
+        if config.llm.enhancer.use_cache:
+            reused = pipeline_state.outputs("enhance", enhance_key)
+
+        if reused is not None:
+            logger.info("Skipping enhancement, already done: %s", reused["json"])
+            enhanced_segments = read_json(reused["json"])["segments"]
+        elif config.llm.backend == "groq":
+            enhance_with_groq = load_backend("enhance")
+            # Finished chunks land in the enhanced SRT early; the final write replaces it
+            # A forced stage must not be answered from the LLM caches either
+            enhanced_segments = enhance_with_groq(
+                asr_json["segments"],
+                config,
+                preview_srt=paths.enhanced_srt,
+                force="enhance" in pipeline_state.force,
             )
+            logger.info("SUCCESS: Enhanced %s segments", len(enhanced_segments))
+        else:
+            logger.warning("Unknown LLM backend: %s, skipping enhancement", config.llm.backend)
             enhanced_segments = asr_json["segments"]
             logger.info("NEXT STEP WILL USE: ASR segments (unenhanced)")
 
-        # Save enhanced segments
-        enhanced_json_path = os.path.join(work.enhanced_dir, "enhanced.json")
-        write_json(enhanced_json_path, {"segments": enhanced_segments})
-        enhanced_srt_path = os.path.join(work.enhanced_dir, "enhanced.srt")
-        write_srt(enhanced_srt_path, enhanced_segments)
-        logger.info(f"OUTPUT: {enhanced_json_path}")
-        logger.info(f"OUTPUT: {enhanced_srt_path}")
+        if reused is not None:
+            enhanced_json_path = reused["json"]
+            enhanced_srt_path = reused["srt"]
+        elif enhanced_segments is asr_json["segments"]:
+            # Nothing changed; point at the ASR files instead of writing copies
+            enhanced_json_path = state["asr_json_path"]
+            enhanced_srt_path = asr_srt_path
+        else:
+            # Save enhanced segments
+            enhanced_json_path = paths.enhanced_json
+            enhanced_srt_path = paths.enhanced_srt
+            writes.segments(enhanced_json_path, enhanced_srt_path, enhanced_segments)
+            pipeline_state.complete(
+                "enhance", enhance_key, {"json": enhanced_json_path, "srt": enhanced_srt_path}, pending=True
+            )
+            logger.info("OUTPUT: %s", enhanced_json_path)
+            logger.info("OUTPUT: %s", enhanced_srt_path)
 
         # Use enhanced segments for next step
         segments_for_next_step = enhanced_segments
@@ -196,75 +537,141 @@ def run_pipeline_with_config(config: Config) -> Dict[str, Any]:
             "Translation is enabled but no target language is specified. Skipping translation."
         )
         input_type = "Enhanced" if config.llm.enhancer.enabled else "ASR"
-        logger.info(f"SUBTITLES WILL USE: {input_type} segments")
+        logger.info("SUBTITLES WILL USE: %s segments", input_type)
     elif not translation_enabled and target_language:
         logger.warning(
             "Target language is specified but translation is disabled. Skipping translation."
         )
         input_type = "Enhanced" if config.llm.enhancer.enabled else "ASR"
-        logger.info(f"SUBTITLES WILL USE: {input_type} segments")
+        logger.info("SUBTITLES WILL USE: %s segments", input_type)
     elif translation_enabled and target_language:
-        logger.info(f"=====Translating transcript to {target_language}=====")
+        logger.info("=====Translating transcript to %s=====", target_language)
         input_type = "Enhanced" if config.llm.enhancer.enabled else "ASR"
-        logger.info(
-            f"INPUT: {input_type} segments ({len(segments_for_next_step)} segments)"
+        logger.info("INPUT: %s segments (%s segments)", input_type, len(segments_for_next_step))
+        translate_key = stage_key(
+            segments_for_next_step,
+            config.llm.backend,
+            config.llm.model,
+            repr(config.llm.translator),
+            backend_module("translate").get_translation_system_prompt(target_language),
         )
-        from translator.translate_transcript import translate_with_groq
-
-        if config.llm.backend == "groq":
+        reused = None
+        if config.llm.translator.use_cache:
+            reused = pipeline_state.outputs("translate", translate_key)
+
+        if reused is not None:
+            logger.info("Skipping translation, already done: %s", reused["json"])
+            translated_segments = read_json(reused["json"])["segments"]
+        elif config.llm.backend == "groq":
+            translate_with_groq = load_backend("translate")
             translated_segments = translate_with_groq(
-                segments_for_next_step, target_language, config
-            )
-            logger.info(
-                f"SUCCESS: Translated {len(translated_segments)} segments to {target_language}"
+                segments_for_next_step,
+                target_language,
+                config,
+                preview_srt=paths.translated_srt,
+                force="translate" in pipeline_state.force,
             )
+            logger.info("SUCCESS: Translated %s segments to %s", len(translated_segments), target_language)
         else:
-            logger.warning(
-                f"Unknown LLM backend: {config.llm.backend}, skipping translation"
-            )
+            logger.warning("Unknown LLM backend: %s, skipping translation", config.llm.backend)
             translated_segments = segments_for_next_step
 
-        # Use language code for file naming
-        lang_code = target_language.lower().replace(" ", "_")
-        translated_json_path = os.path.join(
-            work.translated_dir, f"translated_{lang_code}.json"
-        )
-        translated_srt_path = os.path.join(
-            work.translated_dir, f"translated_{lang_code}.srt"
-        )
-        write_json(
-            translated_json_path,
-            {"segments": translated_segments, "target_language": target_language},
-        )
-        write_srt(translated_srt_path, translated_segments)
-        logger.info(f"OUTPUT: {translated_json_path}")
-        logger.info(f"OUTPUT: {translated_srt_path}")
-
-        # Use translated subtitles for final video
-        final_segments = translated_segments
-        final_srt_path = translated_srt_path
-        logger.info(f"SUBTITLES WILL USE: Translated segments ({target_language})")
+        if translated_segments is not segments_for_next_step:
+            if reused is not None:
+                translated_json_path = reused["json"]
+                translated_srt_path = reused["srt"]
+            else:
+                translated_json_path = paths.translated_json
+                translated_srt_path = paths.translated_srt
+                writes.segments(
+                    translated_json_path,
+                    translated_srt_path,
+                    translated_segments,
+                    {"target_language": target_language},
+                )
+                pipeline_state.complete(
+                    "translate",
+                    translate_key,
+                    {"json": translated_json_path, "srt": translated_srt_path},
+                    pending=True,
+                )
+                logger.info("OUTPUT: %s", translated_json_path)
+                logger.info("OUTPUT: %s", translated_srt_path)
+
+            # Use translated subtitles for final video
+            final_segments = translated_segments
+            final_srt_path = translated_srt_path
+            logger.info("SUBTITLES WILL USE: Translated segments (%s)", target_language)
     else:
         logger.info("=====Translation disabled=====")
         input_type = "Enhanced" if config.llm.enhancer.enabled else "ASR"
-        logger.info(f"SUBTITLES WILL USE: {input_type} segments")
+        logger.info("SUBTITLES WILL USE: %s segments", input_type)
+
+    state.update(
+        enhanced_json_path=enhanced_json_path,
+        enhanced_srt_path=enhanced_srt_path,
+        translated_json_path=translated_json_path,
+        translated_srt_path=translated_srt_path,
+        final_srt_path=final_srt_path,
+    )
 
-    # 6) Add subtitles
-    logger.info(f"=====Adding subtitles ({config.subtitles.mode})=====")
-    logger.info(f"INPUT VIDEO: {video_path}")
-    logger.info(f"INPUT SUBTITLES: {final_srt_path}")
-    from utils.ffmpeg_utils import add_subtitles_soft, burn_subtitles
 
+# ffmpeg does the actual work, so threads are enough to run muxes in the background
+_mux_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mux")
+
+
+def wait_for_video(result: Dict[str, Any]) -> str:
+    """Block until the result's final video exists (a no-op unless muxed in the background)."""
+    future = result.pop("final_video_future", None)
+    if future is not None:
+        future.result()
+    return result["final_video"]
+
+
+def stage_mux(
+    config: Config, state: Dict[str, Any], writes: BackgroundWrites, background: bool = False
+) -> Dict[str, Any]:
+    """
+    Add the final subtitles to the video and build the pipeline result.
+
+    With background=True the result is returned as soon as the subtitle files
+    are on disk; ffmpeg keeps running and result["final_video_future"]
+    resolves to the video path (see wait_for_video).
+    """
+    work = state["work"]
+    paths = state["paths"]
+    video_id = state["video_id"]
+    video_path = state["video_path"]
+    audio_path = state["audio_path"]
+    transcription_audio_path = state["transcription_audio_path"]
+    separation_results = state["separation_results"]
+    asr_json_path = state["asr_json_path"]
+    enhanced_json_path = state["enhanced_json_path"]
+    enhanced_srt_path = state["enhanced_srt_path"]
+    translated_json_path = state["translated_json_path"]
+    translated_srt_path = state["translated_srt_path"]
+    final_srt_path = state["final_srt_path"]
+
+    # 6) Add subtitles
+    logger.info("=====Adding subtitles (%s)=====", config.subtitles.mode)
+    logger.info("INPUT VIDEO: %s", video_path)
+    logger.info("INPUT SUBTITLES: %s", final_srt_path)
+    writes.wait()
+    pipeline_state = state["pipeline_state"]
+    pipeline_state.commit()
     if config.subtitles.mode == "soft":
-        final_video = os.path.join(work.subtitled_dir, "with_subtitles_soft.mp4")
-        add_subtitles_soft(video_path, final_srt_path, final_video)
-        logger.info(f"OUTPUT: {final_video}")
+        final_video = paths.soft_video
+        mux = functools.partial(add_subtitles_soft, video_path, final_srt_path, final_video)
     else:
-        final_video = os.path.join(work.subtitled_dir, "with_subtitles_burned.mp4")
-        burn_subtitles(
-            video_path, final_srt_path, final_video, config.subtitles.box_opacity
+        final_video = paths.burned_video
+        mux = functools.partial(
+            burn_subtitles,
+            video_path,
+            final_srt_path,
+            final_video,
+            config.subtitles.box_opacity,
+            config.subtitles.hw_encoder,
         )
-        logger.info(f"OUTPUT: {final_video}")
 
     result = {
         "video_id": video_id,
@@ -274,9 +681,29 @@ def run_pipeline_with_config(config: Config) -> Dict[str, Any]:
         "asr_json": asr_json_path,
         "enhanced_json": enhanced_json_path,
         "enhanced_srt": enhanced_srt_path,
+        "final_srt": final_srt_path,
         "final_video": final_video,
     }
 
+    with open(final_srt_path, "rb") as f:
+        srt_digest = hashlib.sha256(f.read()).hexdigest()
+    mux_key = stage_key(
+        file_fingerprint(video_path), srt_digest, config.subtitles.mode, config.subtitles.box_opacity
+    )
+
+    def run_mux() -> str:
+        mux()
+        pipeline_state.complete("mux", mux_key, {"video": final_video})
+        logger.info("OUTPUT: %s", final_video)
+        return final_video
+
+    if pipeline_state.outputs("mux", mux_key) is not None:
+        logger.info("Skipping subtitles, already added: %s", final_video)
+    elif background:
+        result["final_video_future"] = _mux_executor.submit(run_mux)
+    else:
+        run_mux()
+
     # Add separation info if separation was performed
     if config.processing.audio.separation.enabled and separation_results:
         result.update(
@@ -287,7 +714,8 @@ def run_pipeline_with_config(config: Config) -> Dict[str, Any]:
         )
 
     # Add translation info if translation was performed
-    if translation_enabled and target_language:
+    target_language = config.llm.translator.target_language
+    if config.llm.translator.enabled and target_language:
         result.update(
             {
                 "translated_json": translated_json_path,
@@ -299,6 +727,32 @@ def run_pipeline_with_config(config: Config) -> Dict[str, Any]:
     return result
 
 
+def run_pipeline_with_config(
+    config: Config, dl_info: Optional[Dict[str, Any]] = None, background_mux: bool = False
+) -> Dict[str, Any]:
+    """
+    Run the complete pipeline using configuration object.
+
+    Args:
+        config: Configuration object containing all pipeline settings.
+        dl_info: Result of an earlier download (e.g. from the graph's download stage).
+            When given, the download step is skipped.
+        background_mux: Return once the subtitles are written, while ffmpeg
+            is still producing final_video. The result then also holds
+            "final_video_future"; call wait_for_video(result) before using
+            the video file.
+
+    Returns:
+        Dictionary with paths to all generated files and metadata.
+    """
+    # Stage outputs are flushed in the background; only the mux step reads them back
+    writes = BackgroundWrites()
+    state = stage_media(config, dl_info, writes)
+    stage_transcribe(config, state, writes)
+    stage_llm(config, state, writes)
+    return stage_mux(config, state, writes, background=background_mux)
+
+
 def run_pipeline(
     url: str,
     asr_backend: str = "local",
@@ -309,207 +763,30 @@ def run_pipeline(
     box_opacity: float = 0.6,
     input_language: str = None,
 ) -> dict:
-    # 1) Download video (or use existing if already downloaded)
-    logger.info("1. Fetching video.....")
-    tmp_root = os.path.join(BASE_DIR, "tmp_downloads")
-    os.makedirs(tmp_root, exist_ok=True)
-    logger.info(f"Checking/downloading video: {url}")
-    dl_info = download_youtube(url, tmp_root)
-    video_id = dl_info["video_id"]
-    title = dl_info.get("title")
-    video_path = dl_info["video_path"]
-    work = ensure_workdirs(video_id)
-
-    # Check if video is already in the correct location
-    dst_video_path = os.path.join(work.video_dir, os.path.basename(video_path))
-    if os.path.abspath(video_path) != os.path.abspath(dst_video_path):
-        # Video is in tmp_downloads, need to move it to the video directory
-        if os.path.exists(video_path):
-            shutil.move(video_path, dst_video_path)
-        video_path = dst_video_path
-    else:
-        # Video is already in the correct location (existing video)
-        logger.info(f"Using existing video at: {video_path}")
-
-    # save/update metadata
-    metadata_path = os.path.join(work.root, "metadata.json")
-    if not os.path.exists(metadata_path) or title:
-        write_json(metadata_path, {"video_id": video_id, "title": title})
-
-    # 2) Extract audio
-    logger.info("2. Extracting audio....")
-    audio_path = os.path.join(work.audio_dir, "audio.wav")
-    extract_audio(video_path, audio_path, sample_rate_hz=16000, mono=True)
-
-    # 2.5) Audio separation (optional) - using default settings for legacy mode
-    transcription_audio_path = audio_path  # Default to original audio
-    separation_results = {}
+    """
+    Legacy entry point: run the pipeline for url without a config file.
 
-    # Check if audio separation is enabled via environment variable
-    separation_enabled = (
+    Builds a Config from the arguments and the environment (ASR_MODEL_NAME,
+    LLM_MODEL_NAME, ENABLE_AUDIO_SEPARATION; GROQ_API_KEY is read by Config
+    itself) and runs run_pipeline_with_config with it.
+    """
+    config = Config()
+    config.video.url = url
+    config.video.input_language = input_language or ""
+    config.asr.backend = asr_backend
+    config.asr.whisper_model = whisper_model
+    config.asr.groq_model = os.environ.get("ASR_MODEL_NAME", config.asr.groq_model)
+    config.llm.backend = llm_backend
+    config.llm.model = os.environ.get("LLM_MODEL_NAME", config.llm.model)
+    config.llm.enhancer.enabled = True
+    config.llm.translator.enabled = bool(target_lang)
+    config.llm.translator.target_language = target_lang or ""
+    config.subtitles.mode = subtitle_mode
+    config.subtitles.box_opacity = box_opacity
+    config.processing.audio.separation.enabled = (
         os.environ.get("ENABLE_AUDIO_SEPARATION", "false").lower() == "true"
     )
-    if separation_enabled:
-        logger.info("2.5. Separating audio (vocals from music)....")
-        try:
-            from separator.separate_audio import (
-                separate_audio_file,
-                check_audio_separator_availability,
-            )
-
-            if not check_audio_separator_availability():
-                logger.warning(
-                    "Audio separator not available. Install with: pip install audio-separator[cpu] or audio-separator[gpu]"
-                )
-                logger.warning("Continuing with original audio for transcription")
-            else:
-                # Perform audio separation with default settings
-                separation_output_dir = work.separated_dir
-                separation_results = separate_audio_file(
-                    audio_path=audio_path,
-                    output_dir=separation_output_dir,
-                    model_name="Roformer Model: BS-Roformer-Viperx-1297",
-                    output_format="WAV",
-                    sample_rate=16000,
-                )
-
-                # Use separated vocals for transcription
-                if "vocals" in separation_results:
-                    transcription_audio_path = separation_results["vocals"]
-                    logger.info(
-                        f"Using separated vocals for transcription: {transcription_audio_path}"
-                    )
-                else:
-                    logger.info("Using original audio for transcription")
-
-        except Exception as e:
-            logger.error(f"Audio separation failed: {e}")
-            logger.warning("Continuing with original audio for transcription")
-    else:
-        logger.info("Audio separation disabled, using original audio for transcription")
-
-    # 3) Transcribe
-    if asr_backend == "local":
-        from transcriber.transcribe_local import transcribe_with_whisper
-
-        asr_json = transcribe_with_whisper(
-            transcription_audio_path, whisper_model, input_language
-        )
-        asr_json_path = os.path.join(work.transcripts_dir, "asr_local.json")
-        write_json(asr_json_path, asr_json)
-        write_srt(
-            os.path.join(work.transcripts_dir, "asr_local.srt"), asr_json["segments"]
-        )
-    else:
-        from transcriber.transcribe_groq import transcribe_with_groq
-
-        # Create a minimal config for backward compatibility
-        from utils.config import Config, ASRConfig, APIConfig
-
-        temp_config = Config()
-        temp_config.asr.groq_model = os.environ.get(
-            "ASR_MODEL_NAME", "distil-whisper-large-v3-en"
-        )
-        temp_config.api.groq_api_key = os.environ.get("GROQ_API_KEY", "")
-        asr_json = transcribe_with_groq(transcription_audio_path, temp_config)
-        asr_json_path = os.path.join(work.transcripts_dir, "asr_groq.json")
-        write_json(asr_json_path, asr_json)
-        write_srt(
-            os.path.join(work.transcripts_dir, "asr_groq.srt"), asr_json["segments"]
-        )
-
-    # 4) Enhance transcript
-    logger.info("3. Enhancing transcript with LLM")
-    from enhancer.enhance_transcript import enhance_with_groq
-
-    if llm_backend == "groq":
-        # Create a minimal config for backward compatibility
-        temp_config.llm.model = os.environ.get("LLM_MODEL_NAME", "llama3-8b-8192")
-        enhanced_segments = enhance_with_groq(asr_json["segments"], temp_config)
-    else:
-        enhanced_segments = asr_json["segments"]
-    enhanced_json_path = os.path.join(work.enhanced_dir, "enhanced.json")
-    write_json(enhanced_json_path, {"segments": enhanced_segments})
-    enhanced_srt_path = os.path.join(work.enhanced_dir, "enhanced.srt")
-    write_srt(enhanced_srt_path, enhanced_segments)
-
-    # 5) Translate transcript (optional)
-    final_segments = enhanced_segments
-    final_srt_path = enhanced_srt_path
-    translated_srt_path = None
-    translated_json_path = None
-
-    if target_lang:
-        logger.info(f"4. Translating transcript to {target_lang}")
-        from translator.translate_transcript import translate_with_groq
-
-        if llm_backend == "groq":
-            translated_segments = translate_with_groq(
-                enhanced_segments, target_lang, temp_config
-            )
-        else:
-            translated_segments = enhanced_segments
-
-        # Use language code for file naming
-        lang_code = target_lang.lower().replace(" ", "_")
-        translated_json_path = os.path.join(
-            work.translated_dir, f"translated_{lang_code}.json"
-        )
-        translated_srt_path = os.path.join(
-            work.translated_dir, f"translated_{lang_code}.srt"
-        )
-        write_json(
-            translated_json_path,
-            {"segments": translated_segments, "target_language": target_lang},
-        )
-        write_srt(translated_srt_path, translated_segments)
-
-        # Use translated subtitles for final video
-        final_segments = translated_segments
-        final_srt_path = translated_srt_path
-
-    # 6) Add subtitles
-    logger.info(f"5. Adding subtitles to video ({subtitle_mode})")
-    from utils.ffmpeg_utils import add_subtitles_soft, burn_subtitles
-
-    if subtitle_mode == "soft":
-        final_video = os.path.join(work.subtitled_dir, "with_subtitles_soft.mp4")
-        add_subtitles_soft(video_path, final_srt_path, final_video)
-    else:
-        final_video = os.path.join(work.subtitled_dir, "with_subtitles_burned.mp4")
-        burn_subtitles(video_path, final_srt_path, final_video, box_opacity)
-
-    result = {
-        "video_id": video_id,
-        "video": video_path,
-        "audio": audio_path,
-        "transcription_audio": transcription_audio_path,
-        "asr_json": asr_json_path,
-        "enhanced_json": enhanced_json_path,
-        "enhanced_srt": enhanced_srt_path,
-        "final_video": final_video,
-    }
-
-    # Add separation info if separation was performed
-    if separation_enabled and separation_results:
-        result.update(
-            {
-                "separation_results": separation_results,
-                "separation_output_dir": work.separated_dir,
-            }
-        )
-
-    # Add translation info if translation was performed
-    if target_lang:
-        result.update(
-            {
-                "translated_json": translated_json_path,
-                "translated_srt": translated_srt_path,
-                "target_language": target_lang,
-            }
-        )
-
-    return result
+    return run_pipeline_with_config(config)
 
 
 def main() -> None:
@@ -552,7 +829,7 @@ def main() -> None:
         try:
             config = load_config(args.config)
         except Exception as e:
-            logger.error(f"Error loading config: {e}")
+            logger.error("Error loading config: %s", e)
             sys.exit(1)
 
         # Override with command line arguments
@@ -585,20 +862,20 @@ def main() -> None:
             logger.error("YouTube URL is required")
             sys.exit(1)
 
+        # argparse leaves unset options as None, so fall back to the defaults here
         result = run_pipeline(
             url=args.url,
-            asr_backend=getattr(args, "asr_backend", "local"),
-            whisper_model=getattr(
-                args, "whisper_model", os.environ.get("DEFAULT_WHISPER_MODEL", "base")
-            ),
-            llm_backend=getattr(args, "llm_backend", "groq"),
-            subtitle_mode=getattr(args, "subtitle_mode", "soft"),
-            target_lang=getattr(args, "target_lang"),
-            box_opacity=getattr(args, "box_opacity", 0.6),
-            input_language=getattr(args, "input_lang"),
+            asr_backend=args.asr_backend or "local",
+            whisper_model=args.whisper_model or os.environ.get("DEFAULT_WHISPER_MODEL", "base"),
+            llm_backend=args.llm_backend or "groq",
+            subtitle_mode=args.subtitle_mode or "soft",
+            target_lang=args.target_lang,
+            box_opacity=args.box_opacity if args.box_opacity is not None else 0.6,
+            input_language=args.input_lang,
         )
 
-    logger.info(json.dumps(result, indent=2))
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(dumps_json(result, indent=True))
 
 
 if __name__ == "__main__":
@@ -9,8 +9,16 @@ quality when there is background music or instrumental audio mixed with speech.
 import os
 import sys
 import json
+import asyncio
+import operator
+import functools
+import importlib.metadata
+import tempfile
+import threading
 import subprocess
-from typing import Dict, List, Optional, Tuple
+import wave
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
 # ensure package path
@@ -25,6 +33,7 @@ except ImportError:
 
 from utils.logging_utils import get_logger
 from utils.paths import ensure_workdirs
+from utils.io_utils import read_json, write_json
 from utils.check_gpu import check_gpu_availability
 
 logger = get_logger(__name__)
@@ -32,6 +41,176 @@ logger = get_logger(__name__)
 
 
 
+# Audio chunks per separation forward pass when a GPU is available
+GPU_BATCH_SIZE = 4
+
+# ONNX Runtime CUDA provider settings for MDX models: pick cuDNN convolution
+# algorithms heuristically instead of benchmarking them all on first use
+ONNX_CUDA_PROVIDER_OPTIONS = {
+    "cudnn_conv_algo_search": "HEURISTIC",
+    "do_copy_in_default_stream": True,
+}
+
+
+# On-disk copy of the model catalogue, one file per installed audio-separator version
+MODELS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "subgen", "separator")
+
+
+def _models_cache_path() -> Optional[str]:
+    """Catalogue cache file for the installed audio-separator, or None if its version is unknown."""
+    try:
+        version = importlib.metadata.version("audio-separator")
+    except importlib.metadata.PackageNotFoundError:
+        return None
+    return os.path.join(MODELS_CACHE_DIR, f"models_{version}.json")
+
+
+@functools.lru_cache(maxsize=1)
+def _supported_model_data() -> Dict[str, Any]:
+    """
+    audio-separator's model catalogue, grouped by architecture (VR, MDX, Demucs, MDXC).
+
+    The catalogue only changes when audio-separator is upgraded, so it is
+    kept on disk per package version and later runs read it from there.
+    Otherwise it comes from the library's own API; the `audio-separator -l`
+    CLI, which costs a second interpreter start and a JSON round trip, is
+    only the fallback for versions without Separator.list_supported_model_files.
+    """
+    cache_path = _models_cache_path()
+    if cache_path and os.path.exists(cache_path):
+        try:
+            return read_json(cache_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable model list cache {cache_path}: {e}")
+
+    models_data = _query_model_data()
+    if cache_path:
+        try:
+            os.makedirs(MODELS_CACHE_DIR, exist_ok=True)
+            write_json(cache_path, models_data, compact=True)
+        except (OSError, TypeError) as e:
+            logger.debug(f"Could not cache the model list at {cache_path}: {e}")
+    return models_data
+
+
+def _query_model_data() -> Dict[str, Any]:
+    try:
+        return Separator(info_only=True).list_supported_model_files()
+    except (AttributeError, TypeError) as e:
+        logger.debug(f"Separator model listing API unavailable ({e}), using the audio-separator CLI")
+
+    cmd = ["audio-separator", "-l", "--list_format=json"]
+    logger.info(f"Executing command: {' '.join(cmd)}")
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def _stem_sdr(model_info: Dict[str, Any], stem: str) -> Optional[float]:
+    """SDR a model scores on stem (case-insensitive), or None if it wasn't scored on it."""
+    for stem_type, score_data in model_info.get("scores", {}).items():
+        if stem_type.lower() == stem and isinstance(score_data, dict) and "SDR" in score_data:
+            try:
+                return float(score_data["SDR"])
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+@functools.lru_cache(maxsize=8)
+def _list_models(filter_stem: Optional[str], limit: Optional[int]) -> Tuple[Dict[str, Any], ...]:
+    """
+    Flatten the model catalogue into our model records.
+
+    Like the CLI's --list_filter, filter_stem keeps the models scored on that
+    stem, best SDR first; limit then truncates the list. Cached for the life
+    of the process, since every AudioSeparator lookup (name to filename,
+    validation, best model) needs it; failures raise and so are not cached.
+    """
+    models_data = _supported_model_data()
+
+    # The JSON structure has models organized by architecture (VR, MDX, Demucs, MDXC)
+    # Each architecture contains multiple models
+    models_dict = {}
+
+    # Flatten the nested structure
+    for arch_name, arch_models in models_data.items():
+        if isinstance(arch_models, dict):
+            for model_name, model_info in arch_models.items():
+                if isinstance(model_info, dict) and "filename" in model_info:
+                    models_dict[model_name] = model_info
+
+    if filter_stem:
+        stem = filter_stem.lower()
+        scored = [(name, info, _stem_sdr(info, stem)) for name, info in models_dict.items()]
+        scored = [entry for entry in scored if entry[2] is not None]
+        scored.sort(key=lambda entry: entry[2], reverse=True)
+        models_dict = {name: info for name, info, _ in scored}
+
+    # Transform the data to match our expected format
+    models = []
+    for model_name, model_info in models_dict.items():
+        # Extract stems from the model info
+        stems = model_info.get("stems", [])
+
+        # Extract SDR values from scores
+        scores = model_info.get("scores", {})
+        sdr_values = []
+
+        for stem_type, score_data in scores.items():
+            if isinstance(score_data, dict) and "SDR" in score_data:
+                try:
+                    sdr_values.append(float(score_data["SDR"]))
+                except (ValueError, TypeError):
+                    pass
+
+        # Use the highest SDR value as the model's SDR (compared as numbers: 10.5 beats 9.0)
+        best_sdr = max(sdr_values, default=float("-inf"))
+
+        models.append({
+            "filename": model_info.get("filename", ""),
+            "name": model_name,
+            "stems": stems,
+            "sdr": str(best_sdr) if sdr_values else "N/A",
+            "sdr_float": best_sdr,
+            "target_stem": model_info.get("target_stem", ""),
+            "download_files": model_info.get("download_files", [])
+        })
+    if limit:
+        models = models[:limit]
+
+    logger.info(f"Found {len(models)} available models")
+    return tuple(models)
+
+
+@functools.lru_cache(maxsize=1)
+def _model_index() -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """Index the full model list by lowercased name and by filename, built once."""
+    models = _list_models(None, None)
+    by_name_lower = {model["name"].lower(): model for model in models}
+    by_filename = {model["filename"]: model for model in models}
+    return by_name_lower, by_filename
+
+
+def refresh_available_models() -> None:
+    """Forget the cached model lists, e.g. after installing new models."""
+    cache_path = _models_cache_path()
+    if cache_path and os.path.exists(cache_path):
+        os.remove(cache_path)
+    _supported_model_data.cache_clear()
+    _list_models.cache_clear()
+    _model_index.cache_clear()
+
+
+@dataclass(frozen=True, slots=True)
+class ModelInfo:
+    """The separation model an AudioSeparator was asked for and the one it loaded."""
+    requested_model: str
+    actual_model: Optional[Dict[str, Any]]
+    model_filename: str
+    model_switched: bool
+    stem_type: str
+
+
 class AudioSeparator:
     """
     Audio separation class that handles separating audio into different stems.
@@ -47,7 +226,8 @@ class AudioSeparator:
                  output_format: str = "WAV",
                  sample_rate: int = 16000,
                  auto_select_best: bool = False,
-                 stem_type: str = "vocals"):
+                 stem_type: str = "vocals",
+                 batch_size: int = 0):
         """
         Initialize the AudioSeparator.
         
@@ -58,15 +238,19 @@ class AudioSeparator:
             sample_rate: Sample rate for output audio
             auto_select_best: Whether to automatically select the best model for the stem type
             stem_type: Stem type to use when auto_select_best is True (e.g., 'vocals', 'drums')
+            batch_size: Audio chunks per model forward pass (0 = 4 on GPU, 1 on CPU)
         """
       
         self.output_dir = output_dir
+        self.batch_size = batch_size or (GPU_BATCH_SIZE if check_gpu_availability() else 1)
         self.output_format = output_format
         self.sample_rate = sample_rate
         self.stem_type = stem_type
         self.requested_model_name = model_name
         self.actual_model_info = None
         self.model_switched = False
+        # Held while a caller changes output_dir and separates, for shared instances
+        self.lock = threading.Lock()
  
         # Handle model selection
         if auto_select_best:
@@ -117,16 +301,15 @@ class AudioSeparator:
         Returns:
             Model filename
         """
-        # Get available models
-        available_models = self.get_available_models()
-        
-        # Check if it's a known model name
-        for model in available_models:
-            if model_identifier.lower() == model["name"].lower():
-                return model["filename"]
-        
-        # If not found in available models, assume it's already a filename
-        return model_identifier
+        try:
+            by_name_lower, _ = _model_index()
+        except Exception as e:
+            logger.error(f"Failed to get available models: {e}")
+            by_name_lower = {}
+
+        # If not a known model name, assume it's already a filename
+        model = by_name_lower.get(model_identifier.lower())
+        return model["filename"] if model else model_identifier
 
     def _initialize_separator(self):
         """Initialize the audio separator with the specified configuration."""
@@ -143,19 +326,100 @@ class AudioSeparator:
             separator_params = {k: v for k, v in separator_params.items() if v is not None}
             
             self.separator = Separator(**separator_params)
+            self._tune_onnx_providers()
+            self._set_batch_size()
             
             # Load the model
             logger.info(f"Loading audio separation model: {self.model_filename}")
             self.separator.load_model(model_filename=self.model_filename)
             logger.info("Audio separation model loaded successfully")
+            if check_gpu_availability():
+                self._warm_up()
             
         except Exception as e:
             logger.error(f"Failed to initialize audio separator: {e}")
             raise
     
+    def _warm_up(self, seconds: float = 1.0):
+        """
+        Separate a short silent clip so the first real separation runs at full speed.
+
+        On the GPU the first inference pays for CUDA context creation, cuDNN
+        algorithm search and kernel compilation, often several seconds. The
+        clip goes through a temporary folder and its stems are discarded.
+        """
+        sample_rate = self.sample_rate or 44100
+        output_dir = self.output_dir
+        try:
+            with tempfile.TemporaryDirectory(prefix="separator_warmup_") as tmp:
+                clip_path = os.path.join(tmp, "silence.wav")
+                with wave.open(clip_path, "wb") as clip:
+                    clip.setnchannels(2)
+                    clip.setsampwidth(2)
+                    clip.setframerate(sample_rate)
+                    clip.writeframes(bytes(4 * int(sample_rate * seconds)))
+                self.set_output_dir(tmp)
+                self.separator.separate(clip_path)
+            logger.info("Audio separation model warmed up")
+        except Exception as e:
+            # Only the first separation gets slower; nothing else depends on this
+            logger.warning(f"Audio separation warm-up failed: {e}")
+        finally:
+            self.set_output_dir(output_dir)
+
+    def set_output_dir(self, output_dir: Optional[str]) -> None:
+        """Write the next separations to output_dir (None = current directory) without reloading the model."""
+        output_dir = output_dir or os.getcwd()
+        self.output_dir = output_dir
+        if self.separator is None:
+            return
+        self.separator.output_dir = output_dir
+        # The loaded model keeps its own copy of the setting
+        model_instance = getattr(self.separator, "model_instance", None)
+        if model_instance is not None:
+            model_instance.output_dir = output_dir
+
+    def _set_batch_size(self):
+        """
+        Run batch_size chunks per forward pass in every architecture that supports it.
+
+        audio-separator slides a window over the audio one chunk at a time by
+        default; batching keeps the GPU busy. The per-architecture settings
+        are copied, not modified, because the library shares them as defaults.
+        """
+        arch_params = getattr(self.separator, "arch_specific_params", None)
+        if not isinstance(arch_params, dict) or self.batch_size <= 1:
+            return
+        self.separator.arch_specific_params = {
+            arch: {**params, "batch_size": self.batch_size} if "batch_size" in params else params
+            for arch, params in arch_params.items()
+        }
+
+    def _tune_onnx_providers(self):
+        """
+        Use heuristic cuDNN algorithm search in ONNX Runtime's CUDA provider.
+
+        The default exhaustive search benchmarks every convolution on the
+        first run, which can make the first inference of an ONNX (MDX) model
+        slower than on CPU. PyTorch-based models such as the Roformers don't
+        use these providers and are unaffected.
+        """
+        providers = getattr(self.separator, "onnx_execution_provider", None)
+        if not providers or "CUDAExecutionProvider" not in providers:
+            return
+        tuned = [
+            ("CUDAExecutionProvider", ONNX_CUDA_PROVIDER_OPTIONS) if p == "CUDAExecutionProvider" else p
+            for p in providers
+        ]
+        if "CPUExecutionProvider" not in tuned:
+            tuned.append("CPUExecutionProvider")
+        self.separator.onnx_execution_provider = tuned
+
     def get_available_models(self, filter_stem: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, str]]:
         """
-        Get list of available separation models using audio-separator CLI.
+        Get list of available separation models from audio-separator.
+
+        The catalogue is read once per process (see _supported_model_data).
         
         Args:
             filter_stem: Filter models by stem type (e.g., 'vocals', 'drums')
@@ -165,69 +429,8 @@ class AudioSeparator:
             List of dictionaries containing model information
         """
         try:
-            # Build the command
-            cmd = ["audio-separator", "-l", "--list_format=json"]
-            
-            if filter_stem:
-                cmd.extend(["--list_filter", filter_stem])
-            
-            if limit:
-                cmd.extend(["--list_limit", str(limit)])
-            
-            logger.info(f"Executing command: {' '.join(cmd)}")
-            
-            # Execute the command
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            # Parse JSON output
-            models_data = json.loads(result.stdout)
-            
-            # Transform the data to match our expected format
-            models = []
-            
-            # The JSON structure has models organized by architecture (VR, MDX, Demucs, MDXC)
-            # Each architecture contains multiple models
-            models_dict = {}
-            
-            # Flatten the nested structure
-            for arch_name, arch_models in models_data.items():
-                if isinstance(arch_models, dict):
-                    for model_name, model_info in arch_models.items():
-                        if isinstance(model_info, dict) and "filename" in model_info:
-                            models_dict[model_name] = model_info
-            
-            for model_name, model_info in models_dict.items():
-                # Extract stems from the model info
-                stems = model_info.get("stems", [])
-                
-                # Extract SDR values from scores
-                scores = model_info.get("scores", {})
-                sdr_values = []
-                
-                for stem_type, score_data in scores.items():
-                    if isinstance(score_data, dict) and "SDR" in score_data:
-                        sdr_values.append(str(score_data["SDR"]))
-                
-                # Use the highest SDR value as the model's SDR
-                best_sdr = max(sdr_values) if sdr_values else "N/A"
-                
-                models.append({
-                    "filename": model_info.get("filename", ""),
-                    "name": model_name,
-                    "stems": stems,
-                    "sdr": best_sdr,
-                    "target_stem": model_info.get("target_stem", ""),
-                    "download_files": model_info.get("download_files", [])
-                })
-            
-            logger.info(f"Found {len(models)} available models")
-            return models
-            
+            # Copies, so callers can't change the cached entries
+            return [dict(model) for model in _list_models(filter_stem, limit)]
         except subprocess.CalledProcessError as e:
             logger.error(f"audio-separator command failed: {e}")
             logger.error(f"stderr: {e.stderr}")
@@ -252,14 +455,8 @@ class AudioSeparator:
         """
         models = self.get_available_models(filter_stem=stem_type, limit=limit)
         
-        # Sort by SDR value (highest first)
-        def sort_key(model):
-            try:
-                return float(model.get("sdr", "0"))
-            except (ValueError, TypeError):
-                return 0.0
-        
-        return sorted(models, key=sort_key, reverse=True)
+        # Sort by SDR value (highest first), parsed once when the list was built
+        return sorted(models, key=operator.itemgetter("sdr_float"), reverse=True)
     
     def validate_model(self, model_identifier: str) -> Tuple[bool, Optional[Dict[str, str]]]:
         """
@@ -272,14 +469,12 @@ class AudioSeparator:
             Tuple of (is_valid, model_info) where model_info is None if not found
         """
         try:
-            available_models = self.get_available_models()
-            for model in available_models:
-                # Check by name or filename
-                if (model_identifier.lower() == model["name"].lower() or 
-                    model_identifier == model["filename"]):
-                    return True, model
-            
-            return False, None
+            by_name_lower, by_filename = _model_index()
+            # Check by name or filename
+            model = by_name_lower.get(model_identifier.lower()) or by_filename.get(model_identifier)
+            if model is None:
+                return False, None
+            return True, dict(model)
             
         except Exception as e:
             logger.error(f"Failed to validate model {model_identifier}: {e}")
@@ -340,24 +535,30 @@ class AudioSeparator:
             # We need to examine the actual filenames to determine which is which
             result = {}
             if isinstance(output_files, list):
-                # Map the output files based on their actual filenames, not order
+                # Names we asked for, looked up once instead of per file
+                stem_by_name = {name.lower(): stem.lower() for stem, name in output_names.items()}
+                unclaimed = [stem.lower() for stem in output_names]
                 for file_path in output_files:
-                    filename = os.path.basename(file_path)
+                    filename = os.path.basename(file_path).lower()
                     # Ensure we return absolute paths
                     if not os.path.isabs(file_path):
                         file_path = os.path.join(self.output_dir, file_path)
-                    
-                    # Determine stem type based on filename
-                    if "vocal" in filename.lower():
-                        result["vocals"] = file_path
-                    elif "instrumental" in filename.lower():
-                        result["instrumental"] = file_path
-                    else:
-                        # Fallback: try to match with output_names
-                        for i, stem_type in enumerate(output_names.keys()):
-                            if i < len(output_files):
-                                result[stem_type.lower()] = file_path
-                                break
+
+                    # Determine stem type from the requested name, then from the filename
+                    stem_type = stem_by_name.get(os.path.splitext(filename)[0])
+                    if stem_type is None:
+                        if "vocal" in filename:
+                            stem_type = "vocals"
+                        elif "instrumental" in filename:
+                            stem_type = "instrumental"
+                        elif unclaimed:
+                            # Fallback: the first requested stem not matched yet
+                            stem_type = unclaimed[0]
+                        else:
+                            continue
+                    result[stem_type] = file_path
+                    if stem_type in unclaimed:
+                        unclaimed.remove(stem_type)
             elif isinstance(output_files, dict):
                 # If it's already a dictionary, ensure absolute paths and normalize keys
                 for k, v in output_files.items():
@@ -373,20 +574,20 @@ class AudioSeparator:
             logger.error(f"Audio separation failed: {e}")
             raise
     
-    def get_model_info(self) -> Dict[str, any]:
+    def get_model_info(self) -> "ModelInfo":
         """
         Get information about the model being used.
         
         Returns:
-            Dictionary with model information including whether it was switched
+            ModelInfo including whether the requested model was switched
         """
-        return {
-            "requested_model": self.requested_model_name,
-            "actual_model": self.actual_model_info,
-            "model_filename": self.model_filename,
-            "model_switched": self.model_switched,
-            "stem_type": self.stem_type
-        }
+        return ModelInfo(
+            requested_model=self.requested_model_name,
+            actual_model=self.actual_model_info,
+            model_filename=self.model_filename,
+            model_switched=self.model_switched,
+            stem_type=self.stem_type,
+        )
 
 
 
@@ -396,9 +597,13 @@ def separate_audio_file(audio_path: str,
                        output_format: str = "WAV",
                        sample_rate: int = 16000,
                        auto_select_best: bool = False,
-                       stem_type: str = "vocals") -> Dict[str, str]:
+                       stem_type: str = "vocals",
+                       batch_size: int = 0) -> Dict[str, str]:
     """
     Convenience function to separate a single audio file.
+
+    The model is loaded once per set of settings and reused by later calls
+    (see get_separator).
     
     Args:
         audio_path: Path to the input audio file
@@ -408,25 +613,64 @@ def separate_audio_file(audio_path: str,
         sample_rate: Sample rate for output audio
         auto_select_best: Whether to automatically select the best model for the stem type
         stem_type: Stem type to use when auto_select_best is True (e.g., 'vocals', 'drums')
+        batch_size: Audio chunks per model forward pass (0 = 4 on GPU, 1 on CPU)
         
     Returns:
         Dictionary with paths to separated audio files
     """
+    separator = get_separator(model_name, output_format, sample_rate, auto_select_best, stem_type, batch_size)
+
+    # The instance is shared, so one file at a time per loaded model
+    with separator.lock:
+        separator.set_output_dir(output_dir)
+        return separator.separate_audio(audio_path)
+
+
+async def separate_audio_file_async(audio_path: str, **kwargs) -> Dict[str, str]:
+    """separate_audio_file on a worker thread, so an event loop keeps serving e.g. uploads meanwhile."""
+    return await asyncio.to_thread(separate_audio_file, audio_path, **kwargs)
+
+
+# Loading a separation model takes seconds and hundreds of MB; never do it twice at once
+_separator_lock = threading.Lock()
+
+
+def get_separator(model_name: str = "Roformer Model: BS-Roformer-Viperx-1297",
+                  output_format: str = "WAV",
+                  sample_rate: int = 16000,
+                  auto_select_best: bool = False,
+                  stem_type: str = "vocals",
+                  batch_size: int = 0) -> AudioSeparator:
+    """
+    Return the process-wide AudioSeparator for these settings, loading it on first use.
+
+    Use set_output_dir (under the instance's lock) to direct its output.
+    """
+    with _separator_lock:
+        return _get_separator_locked(model_name, output_format, sample_rate, auto_select_best, stem_type, batch_size)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_separator_locked(model_name: str,
+                          output_format: str,
+                          sample_rate: int,
+                          auto_select_best: bool,
+                          stem_type: str,
+                          batch_size: int) -> AudioSeparator:
     separator = AudioSeparator(
-        output_dir=output_dir,
         model_name=model_name,
         output_format=output_format,
         sample_rate=sample_rate,
         auto_select_best=auto_select_best,
-        stem_type=stem_type
+        stem_type=stem_type,
+        batch_size=batch_size
     )
-    
+
     # Log model information
     model_info = separator.get_model_info()
-    if model_info["model_switched"]:
-        logger.info(f"Model switched from '{model_info['requested_model']}' to '{model_info['actual_model']['name']}'")
-    
-    return separator.separate_audio(audio_path)
+    if model_info.model_switched:
+        logger.info(f"Model switched from '{model_info.requested_model}' to '{model_info.actual_model['name']}'")
+    return separator
 
 
 def list_available_models(filter_stem: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, str]]:
@@ -440,8 +684,12 @@ def list_available_models(filter_stem: Optional[str] = None, limit: Optional[int
     Returns:
         List of dictionaries containing model information
     """
-    separator = AudioSeparator()
-    return separator.get_available_models(filter_stem=filter_stem, limit=limit)
+    # Listing needs no model, so don't construct (and load) an AudioSeparator
+    try:
+        return [dict(model) for model in _list_models(filter_stem, limit)]
+    except Exception as e:
+        logger.error(f"Failed to get available models: {e}")
+        return []
 
 
 def print_available_models(filter_stem: Optional[str] = None, limit: Optional[int] = None):
@@ -524,8 +772,8 @@ if __name__ == "__main__":
         
         # Check if model was switched
         model_info = separator.get_model_info()
-        if model_info["model_switched"]:
-            print(f"⚠️  Model switched from '{model_info['requested_model']}' to '{model_info['actual_model']['name']}'")
+        if model_info.model_switched:
+            print(f"⚠️  Model switched from '{model_info.requested_model}' to '{model_info.actual_model['name']}'")
         
         # Perform separation
         result = separator.separate_audio(args.audio_file)
@@ -0,0 +1,33 @@
+"""Chunked enhancement keeps every segment, including ones that share a start time."""
+
+import os
+import sys
+import unittest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from enhancer.enhance_transcript import _chunk_segments, _stitch_chunks
+
+
+class StitchChunksTest(unittest.TestCase):
+    def test_duplicate_start_times_survive(self) -> None:
+        # Pairs of zero-length segments at the same timestamp
+        segments = [{"start": float(i // 2), "end": float(i // 2), "text": f"t{i}"} for i in range(9)]
+        chunk_size, overlap = 4, 2
+        chunks = _chunk_segments(segments, chunk_size, overlap)
+        results = [[{**seg, "text": seg["text"].upper()} for seg in chunk] for chunk in chunks]
+        offsets = [max(0, start - overlap) for start in range(0, len(segments), chunk_size)]
+
+        stitched = _stitch_chunks(results, offsets, len(segments))
+        self.assertEqual([seg["text"] for seg in stitched], [f"T{i}" for i in range(9)])
+
+    def test_later_chunk_wins_in_the_overlap(self) -> None:
+        results = [[{"text": "a0"}, {"text": "a1"}, {"text": "a2"}], [{"text": "b1"}, {"text": "b2"}]]
+        stitched = _stitch_chunks(results, [0, 1], 3)
+        self.assertEqual([seg["text"] for seg in stitched], ["a0", "b1", "b2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""A forced LLM stage must call the model again instead of reusing a cached result."""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+from typing import Any, Dict, List
+from unittest import mock
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from enhancer import enhance_transcript
+from translator import translate_transcript
+from pipeline.run import stage_llm
+from utils import llm_cache
+from utils.aio import BackgroundWrites
+from utils.config import Config
+from utils.paths import WorkDirs, pipeline_paths
+from utils.pipeline_state import PipelineState
+
+
+class FakeCompletions:
+    """Upper-cases whatever it is sent, streaming when asked to, and counts the requests."""
+
+    def __init__(self) -> None:
+        self.calls: List[Dict[str, Any]] = []
+
+    async def create(self, **kwargs: Any) -> Any:
+        self.calls.append(kwargs)
+        sent = json.loads(kwargs["messages"][-1]["content"])
+        if all(isinstance(item, str) for item in sent):
+            content = json.dumps({"translations": [text.upper() for text in sent]})
+        else:
+            content = json.dumps({"segments": [[start, end, text.upper()] for start, end, text in sent]})
+        if not kwargs.get("stream"):
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+        async def stream():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+        return stream()
+
+
+class FakeClient:
+    def __init__(self, completions: FakeCompletions) -> None:
+        self.chat = SimpleNamespace(completions=completions)
+
+    async def close(self) -> None:
+        pass
+
+
+class ForcedLLMStageTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.completions = FakeCompletions()
+
+        def make_client(config: Config) -> FakeClient:
+            return FakeClient(self.completions)
+
+        cache = llm_cache.LLMCache(os.path.join(self.root, "llm_cache.sqlite3"))
+        for patcher in (
+            mock.patch.object(enhance_transcript, "make_async_groq_client", make_client),
+            mock.patch.object(translate_transcript, "make_async_groq_client", make_client),
+            mock.patch.object(enhance_transcript, "CACHE_DIR", os.path.join(self.root, "enhancer")),
+            mock.patch.object(llm_cache, "get_llm_cache", lambda: cache),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        names = ["video", "audio", "separated", "transcripts", "enhanced", "translated", "subtitled"]
+        dirs = {f"{name}_dir": os.path.join(self.root, name) for name in names}
+        for path in dirs.values():
+            os.makedirs(path)
+        self.work = WorkDirs(root=self.root, **dirs)
+
+        self.config = Config()
+        self.config.llm.backend = "groq"
+        self.config.llm.enhancer.enabled = True
+        self.config.llm.enhancer.use_cache = True
+        self.config.llm.translator.enabled = True
+        self.config.llm.translator.use_cache = True
+        self.config.llm.translator.target_language = "Spanish"
+
+    def run_stage(self, force: tuple = ()) -> Dict[str, Any]:
+        paths = pipeline_paths(self.work, "groq", self.config.llm.translator.target_language)
+        state = {
+            "paths": paths,
+            "pipeline_state": PipelineState(self.root, force=force),
+            "asr_json": {"segments": [{"start": 0.0, "end": 1.0, "text": "hello"}]},
+            "asr_json_path": paths.asr_json,
+            "asr_srt_path": paths.asr_srt,
+        }
+        writes = BackgroundWrites()
+        stage_llm(self.config, state, writes)
+        writes.wait()
+        return state
+
+    def test_forced_stages_call_the_llm_again(self) -> None:
+        self.run_stage()
+        self.assertEqual(len(self.completions.calls), 2)
+        # Unforced, both results come back from the caches
+        self.run_stage()
+        self.assertEqual(len(self.completions.calls), 2)
+
+        self.run_stage(force=("enhance",))
+        self.assertEqual(len(self.completions.calls), 3)
+        self.assertTrue(self.completions.calls[-1].get("stream"))
+
+        self.run_stage(force=("translate",))
+        self.assertEqual(len(self.completions.calls), 4)
+        self.assertFalse(self.completions.calls[-1].get("stream"))
+
+
+if __name__ == "__main__":
+    unittest.main()
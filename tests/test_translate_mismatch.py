@@ -0,0 +1,59 @@
+"""A chunk the translator can't line up is left untranslated and not cached."""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+from typing import Any
+from unittest import mock
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from translator import translate_transcript
+from utils import llm_cache
+from utils.config import Config
+
+
+class ShortReplies:
+    """Always answers with one line fewer than it was sent."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def create(self, **kwargs: Any) -> Any:
+        self.calls += 1
+        sent = json.loads(kwargs["messages"][-1]["content"])
+        content = json.dumps({"translations": [text.upper() for text in sent[:-1]]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class TranslateMismatchTest(unittest.TestCase):
+    def test_mismatched_chunk_is_returned_untranslated(self) -> None:
+        completions = ShortReplies()
+
+        async def close() -> None:
+            pass
+
+        client = SimpleNamespace(chat=SimpleNamespace(completions=completions), close=close)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = llm_cache.LLMCache(os.path.join(tmp, "llm_cache.sqlite3"))
+            with mock.patch.object(translate_transcript, "make_async_groq_client", lambda config: client), \
+                    mock.patch.object(llm_cache, "get_llm_cache", lambda: cache):
+                config = Config()
+                segments = [{"start": float(i), "end": i + 1.0, "text": f"line {i}"} for i in range(3)]
+
+                result = translate_transcript.translate_with_groq(segments, "Spanish", config)
+                self.assertEqual([seg["text"] for seg in result], [seg["text"] for seg in segments])
+                self.assertEqual(completions.calls, 2)
+
+                # Nothing was cached, so the next run asks again
+                translate_transcript.translate_with_groq(segments, "Spanish", config)
+                self.assertEqual(completions.calls, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,11 @@
 import os
 import sys
+import csv
+import shlex
+import asyncio
 import argparse
-from typing import Dict, Any, List
+import tempfile
+from typing import Dict, Any, List, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,31 +17,22 @@ if BASE_DIR not in sys.path:
 
 from utils.paths import ensure_workdirs
 from utils.logging_utils import get_logger
-from utils.io_utils import write_json, write_srt
 from utils.config import Config
+from utils.groq_client import get_groq_client, make_async_groq_client
+from utils.aio import BackgroundWrites, gather_limited
+from utils.ffmpeg_utils import audio_codec, extract_audio, probe_format, run_cmd
 
 logger = get_logger(__name__)
 
 
-def transcribe_with_groq(audio_path: str, config: Config) -> Dict[str, Any]:
-    from openai import OpenAI
+# Groq rejects uploads above 25 MB; stay below it with room for the multipart envelope
+GROQ_MAX_UPLOAD_BYTES = 24 * 1024 * 1024
+# Chunks of one long file transcribed at the same time
+MAX_CONCURRENT_UPLOADS = 4
 
-    # Use the config for API key and model
-    api_key = config.api.groq_api_key or os.environ.get("GROQ_API_KEY")
-    if not api_key:
-        raise ValueError("Groq API key is required. Set it in config or GROQ_API_KEY environment variable.")
-    
-    client = OpenAI(base_url="https://api.groq.com/openai/v1", api_key=api_key)
-    logger.info("language groq whisper",config.video.input_language)
-    with open(audio_path, "rb") as f:
-        # Attempt to use verbose_json to get segments when supported
-        transcript = client.audio.transcriptions.create(
-            model=config.asr.groq_model,
-            file=f,
-            response_format="verbose_json",
-            temperature=0.1,
-            language=config.video.input_language
-        )
+
+def _to_segments(transcript: Any, offset: float = 0.0) -> List[Dict[str, Any]]:
+    """Map a verbose_json transcription onto our segment schema, shifted by offset seconds."""
     segments: List[Dict[str, Any]] = []
     # Map to our schema if segments are present
     if hasattr(transcript, "segments") and transcript.segments:
@@ -45,13 +40,210 @@ def transcribe_with_groq(audio_path: str, config: Config) -> Dict[str, Any]:
             start = float(getattr(seg, "start", 0.0) or 0.0)
             end = float(getattr(seg, "end", start) or start)
             text = str(getattr(seg, "text", "")).strip()
-            segments.append({"start": start, "end": end, "text": text})
+            segments.append({"start": start + offset, "end": end + offset, "text": text})
     else:
         # Fallback to single full-text segment
         text = transcript.text.strip() if hasattr(transcript, "text") else ""
-        segments.append({"start": 0.0, "end": 0.0, "text": text})
+        segments.append({"start": offset, "end": offset, "text": text})
+    return segments
+
+
+def _split_audio(audio_path: str, out_dir: str, chunk_seconds: float) -> List[Tuple[str, float]]:
+    """
+    Cut audio into consecutive pieces of about chunk_seconds without re-encoding.
+
+    Returns:
+        (chunk path, start offset in seconds) for each piece, in order
+    """
+    ext = os.path.splitext(audio_path)[1] or ".wav"
+    list_path = os.path.join(out_dir, "chunks.csv")
+    cmd = (
+        f"ffmpeg -y -i {shlex.quote(audio_path)} -f segment -segment_time {chunk_seconds:.3f} "
+        f"-segment_list {shlex.quote(list_path)} -segment_list_type csv -c copy "
+        f"{shlex.quote(os.path.join(out_dir, 'chunk_%04d' + ext))}"
+    )
+    run_cmd(cmd)
+    chunks = []
+    with open(list_path, "r", encoding="utf-8") as f:
+        for name, start, _end in csv.reader(f):
+            chunks.append((os.path.join(out_dir, name), float(start)))
+    return chunks
+
+
+async def _transcribe_file(client: Any, path: str, config: Config, offset: float) -> List[Dict[str, Any]]:
+    with open(path, "rb") as f:
+        # Attempt to use verbose_json to get segments when supported
+        transcript = await client.audio.transcriptions.create(
+            model=config.asr.groq_model,
+            file=f,
+            response_format="verbose_json",
+            temperature=0.1,
+            language=config.video.input_language
+        )
+    return _to_segments(transcript, offset)
+
+
+async def _transcribe_chunks(audio_path: str, config: Config, chunk_seconds: float) -> List[Dict[str, Any]]:
+    client = make_async_groq_client(config)
+    try:
+        with tempfile.TemporaryDirectory(prefix="groq_asr_") as tmp_dir:
+            chunks = _split_audio(audio_path, tmp_dir, chunk_seconds)
+            logger.info(f"Uploading {len(chunks)} chunks of ~{chunk_seconds:.0f}s to Groq")
+            results = await gather_limited(
+                [_transcribe_file(client, path, config, offset) for path, offset in chunks],
+                MAX_CONCURRENT_UPLOADS,
+            )
+    finally:
+        await client.close()
+    return [seg for chunk_segments in results for seg in chunk_segments]
+
+
+# Length of the pieces uploaded while audio is still being extracted from a video
+STREAM_CHUNK_SECONDS = 300.0
+STREAM_POLL_SECONDS = 0.5
+
+
+def _read_new_chunks(list_path: str, offset: int) -> Tuple[List[Tuple[str, float]], int]:
+    """Return the segments ffmpeg has finished since byte offset of its CSV segment list."""
+    try:
+        with open(list_path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+    # Only complete lines; the last one may still be being written
+    complete = data[: data.rfind(b"\n") + 1]
+    chunks = []
+    for name, start, _end in csv.reader(complete.decode("utf-8").splitlines()):
+        chunks.append((os.path.join(os.path.dirname(list_path), name), float(start)))
+    return chunks, offset + len(complete)
+
+
+async def _stream_and_transcribe(video_path: str, config: Config, tmp_dir: str) -> List[Dict[str, Any]]:
+    audio = config.processing.audio
+    codec_args, ext = audio_codec(config.asr.groq_audio_codec)
+    # 16-bit PCM is the largest of the supported codecs, so its rate bounds the chunk size
+    pcm_bytes_per_second = audio.sample_rate * 2 * (1 if audio.mono else 2)
+    chunk_seconds = min(STREAM_CHUNK_SECONDS, GROQ_MAX_UPLOAD_BYTES / pcm_bytes_per_second)
+    list_path = os.path.join(tmp_dir, "chunks.csv")
+    cmd = ["ffmpeg", "-nostdin", "-y", "-v", "error", "-i", video_path, "-vn", *codec_args]
+    cmd += ["-ar", str(audio.sample_rate)] + (["-ac", "1"] if audio.mono else [])
+    cmd += [
+        "-f", "segment", "-segment_time", f"{chunk_seconds:.3f}", "-reset_timestamps", "1",
+        "-segment_list", list_path, "-segment_list_type", "csv",
+        os.path.join(tmp_dir, "chunk_%04d" + ext),
+    ]
+    logger.debug(f"Running: {shlex.join(cmd)}")
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+    )
+    extraction = asyncio.ensure_future(process.communicate())
+
+    client = make_async_groq_client(config)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+
+    async def upload(path: str, offset: float) -> List[Dict[str, Any]]:
+        async with semaphore:
+            return await _transcribe_file(client, path, config, offset)
+
+    uploads: List[asyncio.Task] = []
+    list_offset = 0
+    try:
+        while True:
+            done = extraction.done()
+            chunks, list_offset = _read_new_chunks(list_path, list_offset)
+            for path, offset in chunks:
+                uploads.append(asyncio.create_task(upload(path, offset)))
+            if done:
+                break
+            await asyncio.wait({extraction}, timeout=STREAM_POLL_SECONDS)
+        _, stderr = extraction.result()
+        if process.returncode != 0:
+            logger.error(stderr.decode("utf-8", errors="ignore"))
+            raise RuntimeError(f"Audio extraction failed for {video_path}")
+        logger.info(f"Extracted {len(uploads)} chunks of ~{chunk_seconds:.0f}s, waiting for Groq")
+        results = await asyncio.gather(*uploads)
+    except BaseException:
+        for task in uploads:
+            task.cancel()
+        if process.returncode is None:
+            process.kill()
+        raise
+    finally:
+        await client.close()
+    return [seg for chunk_segments in results for seg in chunk_segments]
+
+
+def transcribe_video_with_groq(video_path: str, config: Config) -> Dict[str, Any]:
+    """
+    Transcribe a video's audio with Groq without extracting it to one file first.
+
+    ffmpeg cuts the audio into chunks as it decodes, and each chunk is
+    uploaded as soon as it is complete, so transcription runs alongside the
+    extraction instead of after it.
+    """
+    logger.info(f"language groq whisper: {config.video.input_language}")
+    with tempfile.TemporaryDirectory(prefix="groq_asr_") as tmp_dir:
+        segments = asyncio.run(_stream_and_transcribe(video_path, config, tmp_dir))
+    return {"language": config.video.input_language or None, "segments": segments}
+
+
+def transcribe_with_groq(audio_path: str, config: Config) -> Dict[str, Any]:
+    """
+    Transcribe an audio file with Groq's Whisper API.
+
+    Uncompressed WAV input (e.g. separated vocals) is first encoded with
+    asr.groq_audio_codec, which uploads several times fewer bytes. Files
+    above the upload limit are re-encoded to low-bitrate Opus, which fits
+    about two hours of speech; anything still too large is split into
+    pieces that fit, which are transcribed concurrently and stitched back
+    with their time offsets.
+    """
+    logger.info(f"language groq whisper: {config.video.input_language}")
+    upload_codec = config.asr.groq_audio_codec
+    if audio_path.lower().endswith(audio_codec("wav")[1]) and upload_codec != "wav":
+        with tempfile.TemporaryDirectory(prefix="groq_upload_") as tmp_dir:
+            upload_path = os.path.join(tmp_dir, "audio" + audio_codec(upload_codec)[1])
+            extract_audio(
+                audio_path, upload_path, sample_rate_hz=config.processing.audio.sample_rate, codec=upload_codec
+            )
+            logger.info(
+                f"Encoded {audio_path} to {upload_codec} for upload: "
+                f"{os.path.getsize(audio_path) / 1e6:.1f} MB -> {os.path.getsize(upload_path) / 1e6:.1f} MB"
+            )
+            return transcribe_with_groq(upload_path, config)
+
+    size = os.path.getsize(audio_path)
+    opus_ext = audio_codec("opus")[1]
+    if size > GROQ_MAX_UPLOAD_BYTES and not audio_path.endswith(opus_ext):
+        with tempfile.TemporaryDirectory(prefix="groq_opus_") as tmp_dir:
+            opus_path = os.path.join(tmp_dir, "audio" + opus_ext)
+            logger.info(f"{audio_path} is {size / 1e6:.0f} MB, re-encoding to Opus for upload")
+            extract_audio(
+                audio_path, opus_path, sample_rate_hz=config.processing.audio.sample_rate, codec="opus"
+            )
+            logger.info(f"Opus upload is {os.path.getsize(opus_path) / 1e6:.1f} MB")
+            return transcribe_with_groq(opus_path, config)
+    if size > GROQ_MAX_UPLOAD_BYTES:
+        duration = float(probe_format(audio_path).get("duration") or 0.0)
+        if duration > 0:
+            chunk_seconds = duration * GROQ_MAX_UPLOAD_BYTES / size
+            segments = asyncio.run(_transcribe_chunks(audio_path, config, chunk_seconds))
+            return {"language": config.video.input_language or None, "segments": segments}
+        logger.warning(f"Could not determine duration of {audio_path}; uploading it whole")
+
+    client = get_groq_client(config)
+    with open(audio_path, "rb") as f:
+        # Attempt to use verbose_json to get segments when supported
+        transcript = client.audio.transcriptions.create(
+            model=config.asr.groq_model,
+            file=f,
+            response_format="verbose_json",
+            temperature=0.1,
+            language=config.video.input_language
+        )
     language = getattr(transcript, "language", None)
-    return {"language": language, "segments": segments}
+    return {"language": language, "segments": _to_segments(transcript)}
 
 
 def main() -> None:
@@ -74,8 +266,11 @@ def main() -> None:
     data = transcribe_with_groq(args.audio, config)
     json_path = os.path.join(work.transcripts_dir, "asr_groq.json")
     srt_path = os.path.join(work.transcripts_dir, "asr_groq.srt")
-    write_json(json_path, data)
-    write_srt(srt_path, data["segments"]) 
+    # JSON and SRT are written concurrently
+    writes = BackgroundWrites()
+    writes.json(json_path, data)
+    writes.srt(srt_path, data["segments"])
+    writes.wait()
     logger.info(f"Saved: {json_path}\nSaved: {srt_path}")
 
 
@@ -2,7 +2,10 @@ import os
 import sys
 import json
 import argparse
-from typing import Dict, Any, List
+import functools
+import itertools
+import threading
+from typing import Dict, Any, Iterator, List, Optional, Tuple, TYPE_CHECKING
 
 # ensure package path
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -11,37 +14,365 @@ if BASE_DIR not in sys.path:
 
 from utils.paths import ensure_workdirs
 from utils.logging_utils import get_logger
-from utils.io_utils import write_json, write_srt
+from utils.io_utils import SrtStreamWriter
+from utils.aio import BackgroundWrites
 from utils.config import Config
 
+if TYPE_CHECKING:
+    import numpy as np
+
 logger = get_logger(__name__)
 
+# "ort" decodes on CPU with an ONNX Runtime export of Whisper (see WHISPER_ONNX_DIR)
+# instead of faster-whisper's CTranslate2 model
+WHISPER_BACKEND = os.environ.get("WHISPER_BACKEND", "ctranslate2").lower()
+# Folder of an optimum ONNX export of the Whisper model, ideally optimized with
+# `optimum-cli onnxruntime optimize -O3` so attention runs as fused kernels
+WHISPER_ONNX_DIR = os.environ.get("WHISPER_ONNX_DIR", "")
+
+# Whisper models take 16 kHz mono audio
+SAMPLE_RATE = 16000
+
+
+def _resolve_device(device: str) -> str:
+    """Map "auto" to cuda or cpu using CTranslate2's own device query (no torch import)."""
+    if device != "auto":
+        return device
+    import ctranslate2
+
+    return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+
+# Loading a model takes seconds and a lot of memory; never do it twice at once
+_model_lock = threading.Lock()
+
+
+def _load_model(model_name: str, device: str, compute_type: str, num_workers: int = 1) -> Any:
+    """
+    Load a faster-whisper model once per process.
 
-def transcribe_with_whisper(audio_path: str, config:Config) -> Dict[str, Any]:
-    # Use faster-whisper on CPU for local transcription
+    num_workers is the number of CTranslate2 workers; with more than one,
+    transcriptions running in different threads (batch mode with
+    asr.parallel > 1) are decoded concurrently instead of queueing on one.
+    """
+    with _model_lock:
+        return _load_model_locked(model_name, device, compute_type, num_workers)
+
+
+@functools.lru_cache(maxsize=2)
+def _load_model_locked(model_name: str, device: str, compute_type: str, num_workers: int) -> Any:
     from faster_whisper import WhisperModel
-    model_name=config.asr.whisper_model
-    language=config.video.input_language
-    model = WhisperModel(model_name, device="auto", compute_type="float16")
 
-    segments_iter, info = model.transcribe(
-        audio_path,
+    if compute_type == "auto":
+        compute_type = "int8" if device == "cpu" else "float16"
+    elif device == "cpu" and "float16" in compute_type:
+        # CPUs have no efficient fp16 kernels; int8 is the fast CPU option
+        logger.info(f"compute_type {compute_type} is not supported on CPU, using int8")
+        compute_type = "int8"
+    # CTranslate2 uses 4 threads per worker by default; on CPU share all cores between the workers
+    cpu_threads = max((os.cpu_count() or 4) // num_workers, 1) if device == "cpu" else 0
+    logger.info(f"Loading faster-whisper {model_name} on {device} ({compute_type}, {num_workers} worker(s))")
+    return WhisperModel(
+        model_name,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=cpu_threads,
+        num_workers=num_workers,
+    )
+
+
+def _num_workers(config: Config, device: str) -> int:
+    """
+    One CTranslate2 worker per video that may be transcribed at the same time.
+
+    On CPU with advanced.faster_whisper.cpu_parallel > 1 there are at least
+    that many, one per piece of audio decoded concurrently.
+    """
+    workers = max(config.asr.parallel, 1)
+    if device == "cpu":
+        workers = max(workers, config.advanced.faster_whisper.cpu_parallel)
+    return workers
+
+
+def preload_model(config: Config) -> None:
+    """Load the configured model ahead of the first transcription, e.g. while videos download."""
+    fw = config.advanced.faster_whisper
+    device = _resolve_device(fw.device)
+    if _use_ort(device):
+        _load_ort_pipeline(WHISPER_ONNX_DIR)
+        return
+    _load_model(config.asr.whisper_model, device, fw.compute_type, _num_workers(config, device))
+
+
+@functools.lru_cache(maxsize=2)
+def _load_batched_pipeline(model_name: str, device: str, compute_type: str, num_workers: int) -> Any:
+    """Wrap the cached model in a BatchedInferencePipeline, also once per process."""
+    from faster_whisper import BatchedInferencePipeline
+
+    return BatchedInferencePipeline(model=_load_model(model_name, device, compute_type, num_workers))
+
+
+_ort_lock = threading.Lock()
+
+
+def _load_ort_pipeline(model_dir: str) -> Any:
+    """Load the ONNX Whisper export as a transformers ASR pipeline, once per process."""
+    with _ort_lock:
+        return _load_ort_pipeline_locked(model_dir)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_ort_pipeline_locked(model_dir: str) -> Any:
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForSpeechSeq2Seq
+    from transformers import AutoProcessor, pipeline
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = os.cpu_count() or 0
+    logger.info(f"Loading ONNX Whisper from {model_dir} on cpu")
+    model = ORTModelForSpeechSeq2Seq.from_pretrained(
+        model_dir, provider="CPUExecutionProvider", session_options=options
+    )
+    processor = AutoProcessor.from_pretrained(model_dir)
+    return pipeline(
+        "automatic-speech-recognition",
+        model=model,
+        tokenizer=processor.tokenizer,
+        feature_extractor=processor.feature_extractor,
+        chunk_length_s=30,
+    )
+
+
+def _use_ort(device: str) -> bool:
+    """Whether WHISPER_BACKEND=ort can be honoured; otherwise faster-whisper is used."""
+    if WHISPER_BACKEND != "ort":
+        return False
+    if device != "cpu":
+        logger.info("WHISPER_BACKEND=ort only runs on CPU; using faster-whisper on the GPU")
+        return False
+    if not WHISPER_ONNX_DIR:
+        logger.warning("WHISPER_BACKEND=ort needs WHISPER_ONNX_DIR; using faster-whisper")
+        return False
+    try:
+        import onnxruntime  # noqa: F401
+        import optimum.onnxruntime  # noqa: F401
+    except ImportError:
+        logger.warning("WHISPER_BACKEND=ort needs optimum[onnxruntime]; using faster-whisper")
+        return False
+    return True
+
+
+def transcribe_with_whisper_ort(
+    audio_path: Optional[str],
+    config: Config,
+    audio_array: Optional["np.ndarray"] = None,
+    model_dir: Optional[str] = None,
+) -> Tuple[Iterator[Dict[str, Any]], Any]:
+    """
+    Transcribe audio on CPU with an ONNX Runtime export of Whisper.
+
+    Same contract as transcribe_with_whisper_stream. The sessions run with
+    all of ORT's graph optimizations; model_dir defaults to WHISPER_ONNX_DIR.
+    """
+    from types import SimpleNamespace
+
+    if audio_array is None:
+        from utils.ffmpeg_utils import extract_audio_to_array
+
+        audio_array = extract_audio_to_array(audio_path, SAMPLE_RATE)
+    asr = _load_ort_pipeline(model_dir or WHISPER_ONNX_DIR)
+    language = config.video.input_language or None
+    generate_kwargs: Dict[str, Any] = {"task": "transcribe", "num_beams": config.advanced.faster_whisper.beam_size}
+    if language:
+        generate_kwargs["language"] = language
+
+    result = asr(
+        {"raw": audio_array, "sampling_rate": SAMPLE_RATE},
+        return_timestamps=True,
+        generate_kwargs=generate_kwargs,
+    )
+    segments = (
+        {
+            "start": float(chunk["timestamp"][0] or 0.0),
+            "end": float(chunk["timestamp"][1] or chunk["timestamp"][0] or 0.0),
+            "text": (chunk["text"] or "").strip(),
+        }
+        for chunk in result.get("chunks", [])
+    )
+    return segments, SimpleNamespace(language=language)
+
+
+def _split_at_silences(audio: "np.ndarray", parts: int, min_silence_duration_ms: int) -> List[Tuple[int, int]]:
+    """
+    Cut audio into up to `parts` contiguous (start, end) sample ranges with about equal speech.
+
+    Speech regions come from faster-whisper's Silero VAD; every cut falls in
+    the middle of a silence, so no word is split between two pieces.
+    """
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    regions = get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=min_silence_duration_ms))
+    total_speech = sum(region["end"] - region["start"] for region in regions)
+    if parts <= 1 or len(regions) < 2 or total_speech <= 0:
+        return [(0, len(audio))]
+
+    target = total_speech / parts
+    cuts: List[int] = []
+    speech = 0
+    for region, following in zip(regions, regions[1:]):
+        speech += region["end"] - region["start"]
+        if speech >= target * (len(cuts) + 1) and len(cuts) < parts - 1:
+            cuts.append((region["end"] + following["start"]) // 2)
+    bounds = [0, *cuts, len(audio)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def transcribe_parallel(
+    audio_path: Optional[str],
+    config: Config,
+    num_procs: int,
+    audio_array: Optional["np.ndarray"] = None,
+) -> Tuple[Iterator[Dict[str, Any]], Any]:
+    """
+    Transcribe long audio on CPU as num_procs pieces decoded at the same time.
+
+    The audio is cut at silences into pieces with about equal speech, which
+    are transcribed concurrently by one shared model with a CTranslate2
+    worker per piece (the cores are split between the workers, see
+    _load_model). Segment times are shifted back to the whole recording.
+    Same contract as transcribe_with_whisper_stream; segments arrive in
+    order as the pieces finish.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    fw = config.advanced.faster_whisper
+    if audio_array is None:
+        from utils.ffmpeg_utils import extract_audio_to_array
+
+        audio_array = extract_audio_to_array(audio_path, SAMPLE_RATE)
+    pieces = _split_at_silences(audio_array, num_procs, fw.vad_parameters.min_silence_duration_ms)
+    model = _load_model(config.asr.whisper_model, "cpu", fw.compute_type, _num_workers(config, "cpu"))
+    options = dict(
+        language=config.video.input_language or None,
+        beam_size=fw.beam_size,
+        vad_filter=fw.vad_filter,
+        vad_parameters=dict(min_silence_duration_ms=fw.vad_parameters.min_silence_duration_ms),
+        word_timestamps=fw.word_timestamps,
+    )
+    logger.info(f"Decoding {len(pieces)} piece(s) of audio in parallel on CPU")
+
+    def transcribe_piece(bounds: Tuple[int, int]) -> Tuple[List[Any], Any]:
+        segments_iter, info = model.transcribe(audio_array[bounds[0]:bounds[1]], **options)
+        return list(segments_iter), info
+
+    executor = ThreadPoolExecutor(max_workers=len(pieces), thread_name_prefix="whisper")
+    results = executor.map(transcribe_piece, pieces)
+    # The first piece also supplies the language info, as a single transcription would
+    first_segments, info = next(results)
+
+    def segments() -> Iterator[Dict[str, Any]]:
+        try:
+            piece_results = itertools.chain([(first_segments, info)], results)
+            for (start, _), (piece_segments, _) in zip(pieces, piece_results):
+                offset = start / SAMPLE_RATE
+                for seg in piece_segments:
+                    seg_start = float(seg.start or 0.0)
+                    yield {
+                        "start": seg_start + offset,
+                        "end": float(seg.end or seg_start) + offset,
+                        "text": (seg.text or "").strip(),
+                    }
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return segments(), info
+
+
+def transcribe_with_whisper_stream(
+    audio_path: Optional[str], config: Config, audio_array: Optional["np.ndarray"] = None
+) -> Tuple[Iterator[Dict[str, Any]], Any]:
+    """
+    Start transcribing audio with faster-whisper (CTranslate2).
+
+    Model and decoding options come from `advanced.faster_whisper`. With a
+    batch_size above 1, VAD-split chunks are decoded in batches through
+    faster-whisper's BatchedInferencePipeline; on CPU, cpu_parallel > 1
+    decodes that many pieces of the audio at once instead (transcribe_parallel).
+
+    Args:
+        audio_path: Path of the audio file; ignored when audio_array is given
+        config: Configuration (model, language, faster-whisper options)
+        audio_array: 16 kHz mono float32 samples, e.g. from extract_audio_to_array
+
+    Returns:
+        (segments, info): segments yields {"start", "end", "text"} dicts and
+        decodes the audio as it is consumed; info is faster-whisper's
+        TranscriptionInfo (detected language etc.)
+    """
+    fw = config.advanced.faster_whisper
+    model_name = config.asr.whisper_model
+    language = config.video.input_language or None
+    device = _resolve_device(fw.device)
+    if _use_ort(device):
+        return transcribe_with_whisper_ort(audio_path, config, audio_array)
+    if device == "cpu" and fw.cpu_parallel > 1:
+        return transcribe_parallel(audio_path, config, fw.cpu_parallel, audio_array)
+
+    options = dict(
         language=language,
-        beam_size=5,
-        vad_filter=True,
-        vad_parameters=dict(min_silence_duration_ms=500),
-        word_timestamps=False,
+        beam_size=fw.beam_size,
+        vad_filter=fw.vad_filter,
+        vad_parameters=dict(min_silence_duration_ms=fw.vad_parameters.min_silence_duration_ms),
+        word_timestamps=fw.word_timestamps,
+    )
+    audio = audio_array if audio_array is not None else audio_path
+    batch_size = fw.batch_size
+    if batch_size > 1 and not fw.vad_filter:
+        # The batched pipeline gets its chunks from VAD; without it there is nothing to batch
+        logger.warning("batch_size > 1 needs vad_filter; decoding sequentially")
+        batch_size = 1
+    if batch_size > 1:
+        pipeline = _load_batched_pipeline(model_name, device, fw.compute_type, _num_workers(config, device))
+        logger.info(f"Batched decoding of VAD chunks (batch_size={batch_size})")
+        segments_iter, info = pipeline.transcribe(audio, batch_size=batch_size, **options)
+    else:
+        model = _load_model(model_name, device, fw.compute_type, _num_workers(config, device))
+        segments_iter, info = model.transcribe(audio, **options)
+
+    segments = (
+        {
+            "start": float(seg.start or 0.0),
+            "end": float(seg.end or (seg.start or 0.0)),
+            "text": (seg.text or "").strip(),
+        }
+        for seg in segments_iter
     )
+    return segments, info
 
-    segments: List[Dict[str, Any]] = []
-    for seg in segments_iter:
-        segments.append(
-            {
-                "start": float(seg.start or 0.0),
-                "end": float(seg.end or (seg.start or 0.0)),
-                "text": (seg.text or "").strip(),
-            }
-        )
+
+def transcribe_with_whisper(
+    audio_path: Optional[str],
+    config: Config,
+    audio_array: Optional["np.ndarray"] = None,
+    preview_srt: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Transcribe audio with faster-whisper; see transcribe_with_whisper_stream.
+
+    With preview_srt, each segment is appended to that SRT file as soon as
+    it is decoded, so long recordings can be followed while they are
+    transcribed. The caller is expected to overwrite it with the result.
+    """
+    segments_iter, info = transcribe_with_whisper_stream(audio_path, config, audio_array)
+    if preview_srt:
+        segments: List[Dict[str, Any]] = []
+        with SrtStreamWriter(preview_srt) as preview:
+            for seg in segments_iter:
+                segments.append(seg)
+                preview.append([seg])
+    else:
+        segments = list(segments_iter)
 
     language = getattr(info, "language", None)
     return {"language": language, "segments": segments}
@@ -60,12 +391,15 @@ def main() -> None:
     from utils.config import load_config
     config = load_config()
 
-    data = transcribe_with_whisper(args.audio, config)
-
     json_path = os.path.join(work.transcripts_dir, "asr_local.json")
     srt_path = os.path.join(work.transcripts_dir, "asr_local.srt")
-    write_json(json_path, data)
-    write_srt(srt_path, data["segments"]) 
+    data = transcribe_with_whisper(args.audio, config, preview_srt=srt_path)
+
+    # JSON and SRT are written concurrently
+    writes = BackgroundWrites()
+    writes.json(json_path, data)
+    writes.srt(srt_path, data["segments"])
+    writes.wait()
     logger.info(f"Saved: {json_path}\nSaved: {srt_path}")
 
 
@@ -1,8 +1,9 @@
 import os
 import sys
-import json
+import asyncio
 import argparse
-from typing import Dict, Any, List, TYPE_CHECKING
+import functools
+from typing import Dict, Any, Callable, List, Optional, TYPE_CHECKING
 
 from utils.config import Config
 from dotenv import load_dotenv
@@ -16,48 +17,50 @@ if BASE_DIR not in sys.path:
 
 from utils.paths import ensure_workdirs
 from utils.logging_utils import get_logger
-from utils.io_utils import read_json, write_json, write_srt
+from utils.io_utils import SrtStreamWriter, dumps_json, loads_json, read_json
+from utils.groq_client import make_async_groq_client
+from utils.aio import BackgroundWrites, gather_limited
+from utils.llm_cache import apply_with_cache
 
 logger = get_logger(__name__)
 
+@functools.lru_cache(maxsize=32)
 def get_translation_system_prompt(target_lang: str) -> str:
     """Generate system prompt for translation"""
     return (
-        f"You will receive a JSON array of subtitle segments with fields: start, end, text. "
-        f"Translate the text content to {target_lang} while preserving the exact timing boundaries. "
-        f"Keep the same number of segments and maintain natural flow for subtitles. "
-        f"Return a JSON object with a single key 'segments' mapping to the translated array. "
+        f"You will receive a JSON array of subtitle lines, in order. "
+        f"Translate each line to {target_lang}, keeping the meaning of each line within that line "
+        f"and a natural flow for subtitles. "
+        f"Return a JSON object with a single key 'translations' mapping to an array with exactly "
+        f"one translated string per input line, in the same order. "
         f"Do not include any prose, explanation, or markdown—return JSON only.\n\n"
         f"Example input:\n"
-        f"[\n"
-        f"  {{\"start\": 0.0, \"end\": 1.2, \"text\": \"Hello everybody, welcome to the show.\"}},\n"
-        f"  {{\"start\": 1.2, \"end\": 2.6, \"text\": \"I'm your host.\"}}\n"
-        f"]\n\n"
+        f"[\"Hello everybody, welcome to the show.\", \"I'm your host.\"]\n\n"
         f"Example output (for Spanish):\n"
-        f"{{\n"
-        f"  \"segments\": [\n"
-        f"    {{\"start\": 0.0, \"end\": 1.2, \"text\": \"Hola a todos, bienvenidos al programa.\"}},\n"
-        f"    {{\"start\": 1.2, \"end\": 2.6, \"text\": \"Soy su anfitrión.\"}}\n"
-        f"  ]\n"
-        f"}}"
+        f"{{\"translations\": [\"Hola a todos, bienvenidos al programa.\", \"Soy su anfitrión.\"]}}"
     )
 
 
-def translate_with_groq(segments: List[Dict[str, Any]], target_lang: str, config: Config) -> List[Dict[str, Any]]:
-    """Translate segments using Groq API."""
-    from openai import OpenAI
-    
-    # Use the config for API key and model
-    api_key = config.api.groq_api_key or os.environ.get("GROQ_API_KEY")
-    if not api_key:
-        raise ValueError("Groq API key is required. Set it in config or GROQ_API_KEY environment variable.")
+def _parse_translations(content: str) -> List[str]:
+    """Extract the list of translated lines from an LLM JSON response."""
+    data = loads_json(content)
+    # allow either direct list or object with translations (or segments)
+    if isinstance(data, dict):
+        data = data.get("translations", data.get("segments"))
+    if not isinstance(data, list):
+        raise ValueError("Unexpected LLM response format")
+    return [str(item.get("text", "")) if isinstance(item, dict) else str(item) for item in data]
+
 
-    client = OpenAI(base_url="https://api.groq.com/openai/v1", api_key=api_key)
+async def _request_translations(
+    client: Any, chunk: List[Dict[str, Any]], target_lang: str, config: Config
+) -> List[str]:
+    """Send the chunk's texts in a single chat completion and return the translated lines."""
     system_prompt = get_translation_system_prompt(target_lang)
     
     messages = [
         {"role": "system", "content": system_prompt},
-        {"role": "user", "content": json.dumps(segments, ensure_ascii=False)},
+        {"role": "user", "content": dumps_json([str(seg.get("text", "")) for seg in chunk])},
     ]
 
     request_kwargs = {
@@ -67,37 +70,112 @@ def translate_with_groq(segments: List[Dict[str, Any]], target_lang: str, config
     }
 
     try:
-        completion = client.chat.completions.create(
+        completion = await client.chat.completions.create(
             **request_kwargs,
             response_format={"type": "json_object"},
         )
     except Exception as e:
         logger.warning(f"JSON mode failed, retrying without response_format: {e}")
-        completion = client.chat.completions.create(
+        completion = await client.chat.completions.create(
             **request_kwargs,
         )
 
     if not getattr(completion, "choices", None):
         raise RuntimeError("LLM completion returned no choices")
 
-    content = completion.choices[0].message.content
-   
+    return _parse_translations(completion.choices[0].message.content)
+
+
+async def _translate_chunk(
+    client: Any, chunk: List[Dict[str, Any]], target_lang: str, config: Config
+) -> List[Dict[str, Any]]:
+    """
+    Translate one chunk of segments with a single chat completion.
+
+    Only the texts are sent; timings are re-attached from the input, so the
+    model neither reads nor regenerates them. A reply with the wrong number
+    of lines can't be lined up with the segments and is requested once more;
+    if that fails too, the chunk's segments are returned untranslated (the
+    same objects, so utils.llm_cache doesn't cache them) rather than failing
+    the whole video.
+    """
+    for attempt in range(2):
+        translations = await _request_translations(client, chunk, target_lang, config)
+        if len(translations) == len(chunk):
+            return [{**seg, "text": text} for seg, text in zip(chunk, translations)]
+        logger.warning(f"LLM returned {len(translations)} translations for {len(chunk)} segments")
+    logger.warning(f"Leaving {len(chunk)} segments untranslated after repeated count mismatches")
+    return list(chunk)
+
+
+async def translate_with_groq_async(
+    segments: List[Dict[str, Any]],
+    target_lang: str,
+    config: Config,
+    on_chunk: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Translate segments using Groq API, sending chunks concurrently.
+
+    Segments are split into chunks of `llm.translator.chunk_size`, with at
+    most `llm.max_concurrency` requests in flight. Translated chunks are
+    concatenated in their original order; on_chunk, if given, receives each
+    one in that order as soon as it and the chunks before it are done.
+    """
+    chunk_size = config.llm.translator.chunk_size
+    if chunk_size <= 0 or len(segments) <= chunk_size:
+        chunks = [segments]
+    else:
+        chunks = [segments[i : i + chunk_size] for i in range(0, len(segments), chunk_size)]
+        logger.info(f"Translating {len(segments)} segments in {len(chunks)} chunks")
+
+    client = make_async_groq_client(config)
     try:
-        data = json.loads(content)
-    except Exception:
-        # fallback: wrap if assistant returned array directly
-        if content.strip().startswith("["):
-            data = json.loads(content)
-        else:
-            # try to coerce into the expected object if it's a bare array
-            raise
-    
-    # allow either direct list or object with segments
-    if isinstance(data, dict) and "segments" in data:
-        return data["segments"]
-    if isinstance(data, list):
-        return data
-    raise ValueError("Unexpected LLM response format")
+        results = await gather_limited(
+            [_translate_chunk(client, chunk, target_lang, config) for chunk in chunks],
+            config.llm.max_concurrency,
+            on_chunk,
+        )
+    finally:
+        await client.close()
+    return [seg for chunk_result in results for seg in chunk_result]
+
+
+def translate_with_groq(
+    segments: List[Dict[str, Any]],
+    target_lang: str,
+    config: Config,
+    preview_srt: Optional[str] = None,
+    force: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Translate segments using Groq API.
+
+    Translations are cached per segment (utils.llm_cache). With force, every
+    segment is translated again and the cache is refreshed with the results;
+    setting `llm.translator.use_cache` to False also translates everything,
+    without touching the cache.
+    With preview_srt, translated chunks are written to that SRT file as they
+    arrive; the caller overwrites it with the returned segments.
+    """
+    def translate(pending: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not preview_srt:
+            return asyncio.run(translate_with_groq_async(pending, target_lang, config))
+        with SrtStreamWriter(preview_srt) as preview:
+            return asyncio.run(
+                translate_with_groq_async(pending, target_lang, config, on_chunk=preview.append)
+            )
+
+    if not config.llm.translator.use_cache:
+        return translate(segments)
+    return apply_with_cache(
+        segments,
+        translate,
+        config.llm.model,
+        "translate",
+        variant=f"{target_lang}|{config.llm.translator.temperature}",
+        refresh=force,
+    )
 
 
 # Backward compatibility alias
@@ -142,8 +220,11 @@ def main() -> None:
     json_path = os.path.join(translated_dir, f"translated_{lang_code}.json")
     srt_path = os.path.join(translated_dir, f"translated_{lang_code}.srt")
     
-    write_json(json_path, translated_json)
-    write_srt(srt_path, translated_segments)
+    # JSON and SRT are written concurrently
+    writes = BackgroundWrites()
+    writes.json(json_path, translated_json)
+    writes.srt(srt_path, translated_segments)
+    writes.wait()
     logger.info(f"Saved: {json_path}\nSaved: {srt_path}")
 
 
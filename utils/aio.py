@@ -0,0 +1,100 @@
+"""Asynchronous wrappers around the blocking writers in utils.io_utils.
+
+Writes run on a small shared thread pool so several output files can be
+flushed concurrently, e.g. ``await asyncio.gather(write_json_async(...),
+write_srt_async(...))``.
+"""
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from .io_utils import write_json, write_segments, write_srt
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="io")
+
+
+async def _run_in_executor(func, *args) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, func, *args)
+
+
+async def write_json_async(path: str, data: Any) -> None:
+    await _run_in_executor(write_json, path, data)
+
+
+async def write_srt_async(path: str, segments: List[Dict[str, Any]]) -> None:
+    await _run_in_executor(write_srt, path, segments)
+
+
+async def gather_limited(
+    awaitables: Iterable[Awaitable[Any]],
+    limit: int,
+    on_result: Optional[Callable[[Any], None]] = None,
+) -> List[Any]:
+    """
+    asyncio.gather with at most `limit` awaitables running at once (0 = no limit).
+
+    If on_result is given it is called with each result in input order, as
+    soon as that result and all earlier ones are available.
+    """
+    awaitables = list(awaitables)
+    if limit > 0 and len(awaitables) > limit:
+        semaphore = asyncio.Semaphore(limit)
+
+        async def bounded(awaitable: Awaitable[Any]) -> Any:
+            async with semaphore:
+                return await awaitable
+
+        awaitables = [bounded(a) for a in awaitables]
+    if on_result is None:
+        return await asyncio.gather(*awaitables)
+
+    tasks = [asyncio.ensure_future(a) for a in awaitables]
+    results = []
+    try:
+        for task in tasks:
+            results.append(await task)
+            on_result(results[-1])
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return results
+
+
+class BackgroundWrites:
+    """
+    Output files written on the I/O pool while the caller carries on.
+
+    For synchronous code such as the pipeline: ``submit`` queues a write and
+    returns immediately; ``wait`` blocks until everything queued so far is on
+    disk and re-raises the first failure.
+    """
+
+    def __init__(self) -> None:
+        self._pending: List[Future] = []
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> None:
+        self._pending.append(_executor.submit(func, *args))
+
+    def json(self, path: str, data: Any, compact: bool = False) -> None:
+        self.submit(write_json, path, data, compact)
+
+    def srt(self, path: str, segments: List[Dict[str, Any]]) -> None:
+        self.submit(write_srt, path, segments)
+
+    def segments(
+        self,
+        json_path: str,
+        srt_path: str,
+        segments: List[Dict[str, Any]],
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.submit(write_segments, json_path, srt_path, segments, extra)
+
+    def wait(self) -> None:
+        pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
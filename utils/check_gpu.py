@@ -1,12 +1,18 @@
+import functools
+
 from utils.logging_utils import get_logger
 
 logger = get_logger(__name__)
 
 
+@functools.lru_cache(maxsize=1)
 def check_gpu_availability() -> bool:
     """
     Check if GPU is available using both PyTorch and ONNX Runtime.
 
+    The answer can't change while the process runs, so the probe (which
+    imports torch and initializes CUDA) happens only on the first call.
+
     Returns:
         True if GPU is available, False otherwise
     """
@@ -2,7 +2,11 @@
 
 import os
 import sys
-from typing import Dict, Any, Optional, Union
+import copy
+import typing
+import functools
+import dataclasses
+from typing import Dict, Any, List, Optional, Union
 from dataclasses import dataclass, field
 from pathlib import Path
 import yaml
@@ -12,12 +16,22 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+# libyaml's C parser when PyYAML was built with it; same safe subset as yaml.safe_load
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Stages that processing.force_stages (--force-stage) can rerun despite earlier results
+PIPELINE_STAGES = ("separation", "asr", "enhance", "translate", "mux")
+
+
 @dataclass
 class VideoConfig:
     """Video processing configuration."""
     url: str = ""
     tmp_downloads_dir: str = "tmp_downloads"
     input_language: str = ""
+    parallel: int = 4  # concurrent downloads in batch mode
+    concurrent_fragments: int = 8  # DASH/HLS fragments each download fetches at once
+    external_downloader: str = ""  # e.g. "aria2c"; empty uses yt-dlp's own downloader
 
 
 @dataclass
@@ -26,6 +40,9 @@ class ASRConfig:
     backend: str = "local"  # "local" or "groq"
     whisper_model: str = "base"
     groq_model: str = "distil-whisper-large-v3-en"
+    groq_audio_codec: str = "flac"  # Audio uploaded to Groq: "flac", "opus" or "wav"
+    parallel: int = 1  # Videos transcribed at once in batch mode (1 per GPU for local ASR)
+    groq_streaming: bool = True  # Upload audio chunks while extracting them from the video (when no audio was prefetched)
 
 
 @dataclass
@@ -33,6 +50,9 @@ class EnhancerConfig:
     """Enhancer configuration."""
     enabled: bool = True
     temperature: float = 0.0
+    chunk_size: int = 40  # Segments per LLM request (0 = whole transcript)
+    chunk_overlap: int = 2  # Context segments shared between chunks
+    use_cache: bool = True  # Reuse cached results for identical input
 
 
 @dataclass
@@ -41,6 +61,8 @@ class TranslatorConfig:
     enabled: bool = False
     target_language: str = ""
     temperature: float = 0.1
+    chunk_size: int = 40  # Segments per LLM request (0 = whole transcript)
+    use_cache: bool = True  # Reuse cached translations of identical segments
 
 
 @dataclass
@@ -48,6 +70,7 @@ class LLMConfig:
     """LLM (Large Language Model) configuration."""
     backend: str = "groq"
     model: str = "llama3-8b-8192"
+    max_concurrency: int = 8  # Concurrent LLM requests per transcript
     enhancer: EnhancerConfig = field(default_factory=EnhancerConfig)
     translator: TranslatorConfig = field(default_factory=TranslatorConfig)
 
@@ -57,6 +80,7 @@ class SubtitleConfig:
     """Subtitle generation configuration."""
     mode: str = "soft"  # "soft" or "burn"
     box_opacity: float = 0.6
+    hw_encoder: str = "auto"  # Encoder for burning: "auto", "nvenc", "qsv", "vaapi", "videotoolbox" or "cpu"
 
 
 @dataclass
@@ -73,6 +97,7 @@ class AudioSeparationConfig:
     auto_select_best: bool = False
     stem_type: str = "vocals"
     output_format: str = "WAV"
+    batch_size: int = 0  # Chunks per model forward pass (0 = 4 on GPU, 1 on CPU)
 
 
 @dataclass
@@ -80,6 +105,7 @@ class AudioConfig:
     """Audio extraction configuration."""
     sample_rate: int = 16000
     mono: bool = True
+    in_memory: bool = True  # Decode straight to memory for local ASR instead of writing audio.wav
     separation: AudioSeparationConfig = field(default_factory=AudioSeparationConfig)
 
 
@@ -102,6 +128,7 @@ class ProcessingConfig:
     """Processing configuration."""
     audio: AudioConfig = field(default_factory=AudioConfig)
     output: OutputConfig = field(default_factory=OutputConfig)
+    force_stages: List[str] = field(default_factory=list)  # Stages to rerun despite earlier results
 
 
 @dataclass
@@ -114,8 +141,10 @@ class VADParameters:
 class FasterWhisperConfig:
     """Faster-whisper configuration."""
     device: str = "auto"
-    compute_type: str = "float16"
+    compute_type: str = "auto"  # float16 on GPU, int8 on CPU
     beam_size: int = 5
+    batch_size: int = 16  # >1 decodes VAD chunks in batches (BatchedInferencePipeline)
+    cpu_parallel: int = 0  # >1 decodes that many pieces of the audio at once on CPU
     vad_filter: bool = True
     vad_parameters: VADParameters = field(default_factory=VADParameters)
     word_timestamps: bool = False
@@ -155,11 +184,21 @@ class Config:
         # Validate ASR backend
         if self.asr.backend not in ["local", "groq"]:
             raise ValueError(f"Invalid ASR backend: {self.asr.backend}. Must be 'local' or 'groq'")
+        if self.asr.groq_audio_codec not in ["flac", "opus", "wav"]:
+            raise ValueError(f"Invalid Groq audio codec: {self.asr.groq_audio_codec}. Must be 'flac', 'opus' or 'wav'")
+        
+        # Validate forced stages
+        unknown_stages = [stage for stage in self.processing.force_stages if stage not in PIPELINE_STAGES]
+        if unknown_stages:
+            raise ValueError(f"Unknown pipeline stages to force: {', '.join(unknown_stages)}. Must be among {', '.join(PIPELINE_STAGES)}")
         
         # Validate subtitle mode
         if self.subtitles.mode not in ["soft", "burn"]:
             raise ValueError(f"Invalid subtitle mode: {self.subtitles.mode}. Must be 'soft' or 'burn'")
         
+        if self.subtitles.hw_encoder not in ["auto", "nvenc", "qsv", "vaapi", "videotoolbox", "cpu"]:
+            raise ValueError(f"Invalid subtitle hw_encoder: {self.subtitles.hw_encoder}. Must be 'auto', 'nvenc', 'qsv', 'vaapi', 'videotoolbox' or 'cpu'")
+        
         # Validate box opacity
         if not (0.0 <= self.subtitles.box_opacity <= 1.0):
             raise ValueError(f"Box opacity must be between 0.0 and 1.0, got: {self.subtitles.box_opacity}")
@@ -168,13 +207,24 @@ class Config:
         # Users must set both enabled=True and provide a target_language for translation to occur
 
 
+@functools.lru_cache(maxsize=None)
+def _field_types(cls) -> Dict[str, Any]:
+    """Field name -> type of a config dataclass, looked up once per class."""
+    return {f.name: f.type for f in dataclasses.fields(cls)}
+
+
 def _nested_dict_to_dataclass(cls, data: Dict[str, Any]) -> Any:
-    """Convert nested dictionary to dataclass instance."""
+    """
+    Convert nested dictionary to dataclass instance.
+
+    Recurses into every field whose type is itself a dataclass, so whole
+    sections (llm.enhancer, processing.audio.separation, ...) convert in one
+    call. Unknown keys are ignored and list fields left empty (null) become [].
+    """
     if not data:
         return cls()
     
-    # Get the field types for this dataclass
-    field_types = {f.name: f.type for f in cls.__dataclass_fields__.values()}
+    field_types = _field_types(cls)
     kwargs = {}
     
     for key, value in data.items():
@@ -182,8 +232,10 @@ def _nested_dict_to_dataclass(cls, data: Dict[str, Any]) -> Any:
             field_type = field_types[key]
             
             # Handle nested dataclasses
-            if hasattr(field_type, '__dataclass_fields__'):
+            if dataclasses.is_dataclass(field_type):
                 kwargs[key] = _nested_dict_to_dataclass(field_type, value)
+            elif typing.get_origin(field_type) is list:
+                kwargs[key] = list(value or [])
             else:
                 kwargs[key] = value
     
@@ -212,60 +264,27 @@ def load_config(config_path: Optional[Union[str, Path]] = None) -> Config:
     else:
         config_path = Path(config_path)
     
-    if not config_path.exists():
+    try:
+        mtime_ns = os.stat(config_path).st_mtime_ns
+    except FileNotFoundError:
         raise FileNotFoundError(f"Config file not found: {config_path}")
     
+    # Callers mutate the returned config (CLI overrides), so hand out a copy
+    # Resolved, so relative and absolute spellings of one file share the cache entry
+    return copy.deepcopy(_load_config_cached(str(config_path.resolve()), mtime_ns))
+
+
+@functools.lru_cache(maxsize=8)
+def _load_config_cached(config_path: str, mtime_ns: int) -> Config:
+    """Parse a config file; cached per (path, mtime) so unchanged files are parsed once."""
     try:
         with open(config_path, 'r', encoding='utf-8') as f:
-            config_data = yaml.safe_load(f) or {}
+            config_data = yaml.load(f, Loader=_YAML_LOADER) or {}
     except yaml.YAMLError as e:
         raise yaml.YAMLError(f"Invalid YAML in config file {config_path}: {e}")
     
     # Convert nested dictionaries to appropriate dataclass instances
-    config_kwargs = {}
-    for section_name, section_data in config_data.items():
-        if section_name == "video":
-            config_kwargs[section_name] = _nested_dict_to_dataclass(VideoConfig, section_data)
-        elif section_name == "asr":
-            config_kwargs[section_name] = _nested_dict_to_dataclass(ASRConfig, section_data)
-        elif section_name == "llm":
-            # Handle nested LLM config
-            llm_kwargs = {k: v for k, v in section_data.items() if k not in ["enhancer", "translator"]}
-            if "enhancer" in section_data:
-                llm_kwargs["enhancer"] = _nested_dict_to_dataclass(EnhancerConfig, section_data["enhancer"])
-            if "translator" in section_data:
-                llm_kwargs["translator"] = _nested_dict_to_dataclass(TranslatorConfig, section_data["translator"])
-            config_kwargs[section_name] = LLMConfig(**llm_kwargs)
-        elif section_name == "subtitles":
-            config_kwargs[section_name] = _nested_dict_to_dataclass(SubtitleConfig, section_data)
-        elif section_name == "api":
-            config_kwargs[section_name] = _nested_dict_to_dataclass(APIConfig, section_data)
-        elif section_name == "processing":
-            # Handle nested processing config
-            processing_kwargs = {}
-            if "audio" in section_data:
-                # Handle nested audio config with separation
-                audio_kwargs = {k: v for k, v in section_data["audio"].items() if k != "separation"}
-                if "separation" in section_data["audio"]:
-                    audio_kwargs["separation"] = _nested_dict_to_dataclass(AudioSeparationConfig, section_data["audio"]["separation"])
-                processing_kwargs["audio"] = AudioConfig(**audio_kwargs)
-            if "output" in section_data:
-                processing_kwargs["output"] = _nested_dict_to_dataclass(OutputConfig, section_data["output"])
-            config_kwargs[section_name] = ProcessingConfig(**processing_kwargs)
-        elif section_name == "advanced":
-            # Handle nested advanced config
-            advanced_kwargs = {}
-            if "faster_whisper" in section_data:
-                fw_data = section_data["faster_whisper"]
-                fw_kwargs = {k: v for k, v in fw_data.items() if k != "vad_parameters"}
-                if "vad_parameters" in fw_data:
-                    fw_kwargs["vad_parameters"] = _nested_dict_to_dataclass(VADParameters, fw_data["vad_parameters"])
-                advanced_kwargs["faster_whisper"] = FasterWhisperConfig(**fw_kwargs)
-            if "retry" in section_data:
-                advanced_kwargs["retry"] = _nested_dict_to_dataclass(RetryConfig, section_data["retry"])
-            config_kwargs[section_name] = AdvancedConfig(**advanced_kwargs)
-    
-    return Config(**config_kwargs)
+    return _nested_dict_to_dataclass(Config, config_data)
 
 
 def save_config(config: Config, config_path: Union[str, Path]) -> None:
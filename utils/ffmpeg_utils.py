@@ -1,56 +1,305 @@
+import io
 import os
+import re
+import json
+import logging
+import collections
 import shlex
+import tempfile
+import functools
 import subprocess
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
 from .logging_utils import get_logger
 
+if TYPE_CHECKING:
+    import numpy as np
+
 logger = get_logger(__name__)
 
 
+# Lines of a failed command's output repeated in the error log
+ERROR_TAIL_LINES = 50
+
+
 def run_cmd(command: str) -> None:
+    """
+    Run a command, streaming its output to the debug log line by line.
+
+    ffmpeg's output (progress lines included) is never held in memory as a
+    whole; only the last ERROR_TAIL_LINES lines are kept, for the error log
+    if the command fails.
+    """
     logger.debug(f"Running: {command}")
-    process = subprocess.run(shlex.split(command), stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    args = shlex.split(command)
+    if args and args[0] == "ffmpeg" and "-hide_banner" not in args:
+        args.insert(1, "-hide_banner")
+    tail = collections.deque(maxlen=ERROR_TAIL_LINES)
+    stream_to_log = logger.isEnabledFor(logging.DEBUG)
+    # Text mode splits ffmpeg's carriage-return progress updates into lines too
+    with subprocess.Popen(
+        args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="ignore"
+    ) as process:
+        for line in process.stdout:
+            line = line.rstrip()
+            if line:
+                if stream_to_log:
+                    logger.debug(line)
+                tail.append(line)
     if process.returncode != 0:
-        output = process.stdout.decode("utf-8", errors="ignore")
-        logger.error(output)
+        logger.error("\n".join(tail))
         raise RuntimeError(f"Command failed: {command}")
 
 
+# ffmpeg encoder arguments and file extension for each audio output codec.
+# FLAC is lossless at roughly half the size of 16-bit PCM; Opus at 24 kbps
+# is a fraction of that and still fine for speech recognition.
+AUDIO_CODECS = {
+    "wav": (["-c:a", "pcm_s16le"], ".wav"),
+    "flac": (["-c:a", "flac", "-compression_level", "5"], ".flac"),
+    "opus": (["-c:a", "libopus", "-b:a", "24k", "-application", "voip"], ".ogg"),
+}
+
+
+def audio_codec(codec: str) -> Tuple[List[str], str]:
+    """Return (ffmpeg encoder args, file extension) for "wav", "flac" or "opus"."""
+    if codec not in AUDIO_CODECS:
+        raise ValueError(f"Unsupported audio codec: {codec} (expected one of {', '.join(AUDIO_CODECS)})")
+    return AUDIO_CODECS[codec]
+
+
 def extract_audio(
     input_video_path: str,
     output_audio_path: str,
     sample_rate_hz: int = 16000,
     mono: bool = True,
+    codec: str = "wav",
 ) -> str:
+    codec_args, _ = audio_codec(codec)
     channels_arg = "-ac 1" if mono else ""
     cmd = (
-        f"ffmpeg -y -i {shlex.quote(input_video_path)} -vn -acodec pcm_s16le "
+        f"ffmpeg -y -i {shlex.quote(input_video_path)} -vn {shlex.join(codec_args)} "
         f"-ar {sample_rate_hz} {channels_arg} {shlex.quote(output_audio_path)}"
     )
     run_cmd(cmd)
     return output_audio_path
 
 
+def _expected_samples(input_video_path: str, sample_rate_hz: int) -> int:
+    """Sample count implied by the container duration (plus a second of slack), or 0 if unknown."""
+    try:
+        duration = float(probe_format(input_video_path).get("duration") or 0.0)
+    except (OSError, RuntimeError, ValueError):
+        return 0
+    return int((duration + 1.0) * sample_rate_hz) if duration > 0 else 0
+
+
+def extract_audio_to_array(input_video_path: str, sample_rate_hz: int = 16000) -> "np.ndarray":
+    """
+    Decode the audio track straight into memory as mono float32 samples.
+
+    Avoids writing and re-reading a WAV file when the samples are only
+    needed by in-process ASR (faster-whisper accepts the array directly).
+    ffmpeg's output is read into one buffer sized from the probed duration,
+    so the samples are not copied again when the array is built.
+    """
+    import numpy as np
+
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error", "-i", input_video_path,
+        "-vn", "-f", "f32le", "-acodec", "pcm_f32le",
+        "-ar", str(sample_rate_hz), "-ac", "1", "pipe:1",
+    ]
+    logger.debug(f"Running: {' '.join(shlex.quote(c) for c in cmd)}")
+    buffer = bytearray(4 * (_expected_samples(input_video_path, sample_rate_hz) or 60 * sample_rate_hz))
+    filled = 0
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+        with process.stdout:
+            while True:
+                if filled == len(buffer):
+                    buffer.extend(bytes(len(buffer) // 2))
+                count = process.stdout.readinto(memoryview(buffer)[filled:])
+                if not count:
+                    break
+                filled += count
+        if process.wait() != 0:
+            stderr.seek(0)
+            logger.error(stderr.read().decode("utf-8", errors="ignore"))
+            raise RuntimeError(f"Command failed: {' '.join(cmd)}")
+    del buffer[filled - filled % 4:]
+    return np.frombuffer(buffer, dtype=np.float32)
+
+
+# Codecs that can be stream-copied into an MP4 container
+MP4_VIDEO_CODECS = {"h264", "hevc", "av1", "mpeg4", "vp9"}
+MP4_AUDIO_CODECS = {"aac", "mp3", "ac3", "eac3", "alac", "opus", "flac"}
+
+
+@functools.lru_cache(maxsize=32)
+def _probe_cached(path: str, mtime_ns: int) -> Dict[str, Any]:
+    process = subprocess.run(
+        ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_streams", "-show_format", path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"ffprobe failed for {path}")
+    return json.loads(process.stdout or b"{}")
+
+
+def probe_streams(path: str) -> List[Dict[str, Any]]:
+    """Return ffprobe's stream list for a media file (cached until the file changes)."""
+    return _probe_cached(path, os.stat(path).st_mtime_ns).get("streams", [])
+
+
+def probe_format(path: str) -> Dict[str, Any]:
+    """Return ffprobe's container info (duration, size, bit_rate, ...) for a media file."""
+    return _probe_cached(path, os.stat(path).st_mtime_ns).get("format", {})
+
+
+def _codecs(streams: List[Dict[str, Any]], codec_type: str) -> List[str]:
+    return [s.get("codec_name", "") for s in streams if s.get("codec_type") == codec_type]
+
+
+def _audio_codec_args(input_video: str) -> str:
+    """Copy the audio when MP4 can hold it as is, otherwise transcode only the audio to AAC."""
+    try:
+        audio = _codecs(probe_streams(input_video), "audio")
+    except (OSError, RuntimeError, ValueError) as e:
+        logger.debug(f"Could not probe {input_video}, copying audio: {e}")
+        return "-c:a copy"
+    if all(codec in MP4_AUDIO_CODECS for codec in audio):
+        return "-c:a copy"
+    logger.info(f"Audio codec {audio} can't be copied into MP4, transcoding audio to AAC")
+    return "-c:a aac -b:a 192k"
+
+
 def add_subtitles_soft(input_video: str, srt_file: str, output_path: str, language: str = "eng") -> str:
+    """
+    Mux an SRT into the video as a soft subtitle track, without re-encoding.
+
+    Video is always stream-copied when ffprobe reports an MP4-compatible
+    codec; audio is copied too unless MP4 can't hold it.
+    """
+    video_args = "-c:v copy"
+    try:
+        video = _codecs(probe_streams(input_video), "video")
+        if video and not all(codec in MP4_VIDEO_CODECS for codec in video):
+            logger.info(f"Video codec {video} can't be copied into MP4, re-encoding to H.264")
+            video_args = "-c:v libx264 -preset veryfast -crf 20"
+    except (OSError, RuntimeError, ValueError) as e:
+        logger.debug(f"Could not probe {input_video}, copying video: {e}")
     # mp4 soft subs require mov_text codec
     cmd = (
         f"ffmpeg -y -i {shlex.quote(input_video)} -i {shlex.quote(srt_file)} "
-        f"-c copy -c:s mov_text -metadata:s:s:0 language={shlex.quote(language)} "
+        f"-map 0:v -map 0:a? -map 1:0 {video_args} {_audio_codec_args(input_video)} "
+        f"-c:s mov_text -metadata:s:s:0 language={shlex.quote(language)} "
         f"{shlex.quote(output_path)}"
     )
     run_cmd(cmd)
     return output_path
 
 
-def burn_subtitles(input_video: str, srt_file: str, output_path: str, box_opacity: float = 0.6) -> str:
+# Hardware H.264 encoders in order of preference, with settings close to
+# libx264's default quality (CRF 23)
+HW_H264_ENCODERS = [
+    # (encoder, input args, filters appended after the subtitles, encoder args)
+    ("h264_nvenc", "-hwaccel cuda", "", "-preset p5 -tune hq -cq 23"),
+    ("h264_qsv", "", "", "-preset medium -global_quality 23"),
+    ("h264_vaapi", "-vaapi_device /dev/dri/renderD128", ",format=nv12,hwupload", "-qp 23"),
+    ("h264_videotoolbox", "", "", "-q:v 60"),
+]
+
+# Short names accepted by subtitles.hw_encoder
+HW_ENCODER_NAMES = {"nvenc": "h264_nvenc", "qsv": "h264_qsv", "vaapi": "h264_vaapi", "videotoolbox": "h264_videotoolbox"}
+
+# Hardware encoders that failed at runtime (listed by ffmpeg but no device)
+_failed_encoders = set()
+
+
+@functools.lru_cache(maxsize=1)
+def available_encoders() -> frozenset:
+    """Names of the encoders this ffmpeg build was compiled with (queried once)."""
+    try:
+        process = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+    except OSError:
+        return frozenset()
+    names = set()
+    for line in process.stdout.decode("utf-8", errors="ignore").splitlines():
+        parts = line.split()
+        # Encoder lines look like " V....D h264_nvenc   NVIDIA NVENC H.264 encoder"
+        if len(parts) >= 2 and len(parts[0]) == 6 and parts[1] != "=" and parts[0] != "------":
+            names.add(parts[1])
+    return frozenset(names)
+
+
+def _burn_encoder_args(hw_encoder: str = "auto") -> List[Tuple[str, str, str, str]]:
+    """
+    (name, input args, extra filters, video args) to try for a burn, ending with libx264.
+
+    hw_encoder is "auto" (every hardware encoder ffmpeg has), one of
+    HW_ENCODER_NAMES, or "cpu" for libx264 only.
+    """
+    encoders = available_encoders()
+    wanted = HW_ENCODER_NAMES.get(hw_encoder)
+    candidates = [
+        (name, input_args, filters, f"-c:v {name} {args}")
+        for name, input_args, filters, args in HW_H264_ENCODERS
+        if hw_encoder != "cpu"
+        and wanted in (None, name)
+        and name in encoders
+        and name not in _failed_encoders
+        # VAAPI needs a render node; without one it can only fail
+        and (name != "h264_vaapi" or os.path.exists("/dev/dri/renderD128"))
+    ]
+    candidates.append(("libx264", "", "", "-c:v libx264 -preset medium -crf 23"))
+    return candidates
+
+
+# One SRT cue: index line, "start --> end" line, then its non-empty text lines
+_SRT_CUE_RE = re.compile(r"^\s*\d+[ \t]*\n[ \t]*(\S+) --> (\S+)[^\n]*\n((?:[^\n]*\S[^\n]*(?:\n|$))*)", re.MULTILINE)
+_ANGLE_BRACKETS = str.maketrans("", "", "<>")
+
+
+def _srt_to_ass_events(srt_content: str, alpha_hex: str) -> str:
+    """Turn SRT cues into ASS Dialogue lines with the background box alpha, in one pass."""
+    from utils.timecode import srt_time_to_ass_time
+
+    # {\1a&H00&} sets text and {\3a&H00&} outline fully opaque; {\4a&H[alpha]&} the background box
+    box_tags = f"{{\\1a&H00&\\3a&H00&\\4a&H{alpha_hex}&}}"
+    events = io.StringIO()
+    for match in _SRT_CUE_RE.finditer(srt_content.replace("\r\n", "\n")):
+        start_time, end_time, text = match.groups()
+        if not text:
+            continue
+        # Join all text lines with ASS line break, dropping HTML-like tags' brackets
+        text = text.rstrip("\n").translate(_ANGLE_BRACKETS).replace("\n", "\\N")
+        events.write(
+            f"Dialogue: 0,{srt_time_to_ass_time(start_time)},{srt_time_to_ass_time(end_time)},"
+            f"Default,,0,0,0,,{box_tags}{text}\n"
+        )
+    return events.getvalue()
+
+
+def burn_subtitles(
+    input_video: str, srt_file: str, output_path: str, box_opacity: float = 0.6, hw_encoder: str = "auto"
+) -> str:
     """
     Burn subtitles into video with a semi-transparent background overlay.
+
+    Burning re-encodes the whole video, so a hardware H.264 encoder (NVENC
+    with CUDA decoding, Quick Sync, VAAPI, VideoToolbox) is used when ffmpeg
+    has one that works, with libx264 as the fallback. Prefer soft subtitles
+    when they suffice.
     
     Args:
         input_video: Path to input video file
         srt_file: Path to SRT subtitle file
         output_path: Path for output video file
         box_opacity: Opacity of the background box (0.0 to 1.0, default 0.6)
+        hw_encoder: "auto", "nvenc", "qsv", "vaapi", "videotoolbox" or "cpu" (libx264 only)
     
     Returns:
         Path to the output video file
@@ -86,49 +335,26 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
 """)
         
         # Convert SRT content to ASS format
-        from utils.timecode import srt_time_to_ass_time
-        
-        lines = srt_content.strip().split('\n\n')
-        for block in lines:
-            if not block.strip():
-                continue
-            
-            parts = block.split('\n')
-            if len(parts) >= 3:
-                # Skip subtitle number
-                time_line = parts[1]
-                text_lines = parts[2:]
-                
-                # Parse time codes
-                if ' --> ' in time_line:
-                    start_time, end_time = time_line.split(' --> ')
-                    
-                    # Convert SRT time format to ASS time format
-                    start_ass = srt_time_to_ass_time(start_time)
-                    end_ass = srt_time_to_ass_time(end_time)
-                    
-                    # Join all text lines with ASS line break
-                    text = '\\N'.join(text_lines)
-                    # Clean up any HTML-like tags
-                    text = text.replace('<', '').replace('>', '')
-                    
-                    # Add background box using ASS tags
-                    # {\1a&H00&} sets background to fully opaque
-                    # {\3a&H00&} sets outline to fully opaque
-                    # {\4a&H[alpha]&} sets shadow/background alpha
-                    text_with_bg = f"{{\\1a&H00&\\3a&H00&\\4a&H{alpha_hex}&}}{text}"
-                    
-                    # Write ASS dialogue line
-                    temp_ass.write(f"Dialogue: 0,{start_ass},{end_ass},Default,,0,0,0,,{text_with_bg}\n")
+        temp_ass.write(_srt_to_ass_events(srt_content, alpha_hex))
     
     try:
         # Use the ASS file with subtitles filter
-        vf = f"ass={shlex.quote(temp_ass_path)}"
-        cmd = (
-            f"ffmpeg -y -i {shlex.quote(input_video)} -vf {vf} -c:a copy {shlex.quote(output_path)}"
-        )
-        run_cmd(cmd)
-        return output_path
+        vf = f"ass={temp_ass_path}"
+        candidates = _burn_encoder_args(hw_encoder)
+        for index, (encoder, input_args, filters, video_args) in enumerate(candidates):
+            cmd = (
+                f"ffmpeg -y {input_args} -i {shlex.quote(input_video)} -vf {shlex.quote(vf + filters)} "
+                f"{video_args} {_audio_codec_args(input_video)} {shlex.quote(output_path)}"
+            )
+            try:
+                run_cmd(cmd)
+                return output_path
+            except RuntimeError:
+                if index == len(candidates) - 1:
+                    raise
+                # e.g. NVENC compiled in but no NVIDIA GPU; don't try it again this run
+                logger.warning(f"{encoder} failed, falling back to {candidates[index + 1][0]}")
+                _failed_encoders.add(encoder)
     finally:
         # Clean up temporary file
         if path_os.path.exists(temp_ass_path):
@@ -0,0 +1,33 @@
+import os
+import shutil
+
+
+def fast_move(src: str, dst: str) -> str:
+    """
+    Move a file, avoiding a byte copy whenever the filesystem allows it.
+
+    Tries an atomic rename first, then a hard link; only when both fail
+    (e.g. src and dst on different devices) is the file copied, which
+    shutil.copyfile does in-kernel via sendfile on Linux.
+    """
+    try:
+        os.replace(src, dst)
+        return dst
+    except OSError:
+        pass
+    try:
+        if os.path.exists(dst):
+            os.unlink(dst)
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+    os.unlink(src)
+    return dst
+
+
+def same_file(a: str, b: str) -> bool:
+    """True if both paths exist and refer to the same file (symlinks and hard links included)."""
+    try:
+        return os.path.samefile(a, b)
+    except FileNotFoundError:
+        return False
@@ -0,0 +1,91 @@
+"""Shared Groq (OpenAI-compatible) clients with pooled keep-alive connections."""
+
+import os
+import functools
+from typing import Any
+
+from utils.config import Config
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+# One pool per client; enough for the enhancer's concurrent chunk requests
+MAX_CONNECTIONS = 16
+
+
+def groq_api_key(config: Config) -> str:
+    """Return the Groq API key from config or GROQ_API_KEY, raising if neither is set."""
+    api_key = config.api.groq_api_key or os.environ.get("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("Groq API key is required. Set it in config or GROQ_API_KEY environment variable.")
+    return api_key
+
+
+@functools.lru_cache(maxsize=1)
+def _http2_available() -> bool:
+    """httpx only speaks HTTP/2 when the optional h2 package is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _http_client_kwargs() -> dict:
+    import httpx
+
+    return {
+        "limits": httpx.Limits(
+            max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS
+        ),
+        "http2": _http2_available(),
+    }
+
+
+def _max_retries(config: Config) -> int:
+    """
+    Retries after the first attempt, from advanced.retry.max_attempts.
+
+    The SDK retries rate limits (429), 5xx responses and connection errors
+    with exponential backoff and honours Retry-After, which is what lets many
+    concurrent chunk requests ride out Groq's rate limits.
+    """
+    return max(config.advanced.retry.max_attempts - 1, 0)
+
+
+@functools.lru_cache(maxsize=4)
+def _sync_client(api_key: str, max_retries: int) -> Any:
+    from openai import OpenAI, DefaultHttpxClient
+
+    return OpenAI(
+        base_url=GROQ_BASE_URL,
+        api_key=api_key,
+        max_retries=max_retries,
+        http_client=DefaultHttpxClient(**_http_client_kwargs()),
+    )
+
+
+def get_groq_client(config: Config) -> Any:
+    """
+    Get the process-wide OpenAI client for Groq.
+
+    The client is reused across calls so the TLS connection to Groq stays
+    open between the transcription, enhancement and translation steps.
+    """
+    return _sync_client(groq_api_key(config), _max_retries(config))
+
+
+def make_async_groq_client(config: Config) -> Any:
+    """
+    Create an AsyncOpenAI client for Groq with a pooled HTTP client.
+
+    Async clients are bound to the event loop they are used on, so unlike
+    get_groq_client this returns a new client; close it when done.
+    """
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    return AsyncOpenAI(
+        base_url=GROQ_BASE_URL,
+        api_key=groq_api_key(config),
+        max_retries=_max_retries(config),
+        http_client=DefaultAsyncHttpxClient(**_http_client_kwargs()),
+    )
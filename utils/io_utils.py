@@ -1,18 +1,91 @@
+import os
 import json
-from typing import Any, Dict, List
-from .timecode import seconds_to_srt_time
+import mmap
+from typing import Any, Dict, List, Optional
+from .srt_fast import encode_srt
 
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to the stdlib encoder
+    orjson = None
 
-def write_json(path: str, data: Any) -> None:
+# Files at least this large are parsed straight from a read-only memory map
+MMAP_THRESHOLD = 1 << 20
+
+
+def dumps_json(data: Any, indent: bool = False) -> str:
+    """Serialize to a JSON string, keeping non-ASCII text unescaped.
+
+    Compact by default; with indent=True the output is indented by two spaces
+    for logging.
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS if indent else 0
+        try:
+            return orjson.dumps(data, option=option).decode("utf-8")
+        except TypeError:
+            pass  # e.g. non-str keys or huge ints; the stdlib handles those
+    return json.dumps(data, ensure_ascii=False, indent=2 if indent else None)
+
+
+def loads_json(content: Any) -> Any:
+    """Parse JSON from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def write_json(path: str, data: Any, compact: bool = False) -> None:
+    """
+    Write data as UTF-8 JSON, indented by two spaces unless compact.
+
+    Compact output suits files only the pipeline reads back, such as stage
+    caches. NumPy scalars and arrays, and dicts with non-string keys, are
+    serialized natively by orjson.
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+        if not compact:
+            option |= orjson.OPT_INDENT_2
+        try:
+            encoded = orjson.dumps(data, option=option)
+        except TypeError:
+            encoded = None
+        if encoded is not None:
+            write_bytes(path, encoded)
+            return
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+        if compact:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        else:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
 
 
 def read_json(path: str) -> Any:
+    if orjson is not None:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+                return orjson.loads(f.read())
+            # Large ASR/enhancer outputs: let orjson read the page cache directly
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    return orjson.loads(view)
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
+def write_bytes(path: str, data: bytes) -> None:
+    """Write data with raw os.write calls, bypassing Python's buffered file layer."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
 def write_text(path: str, text: str) -> None:
     with open(path, "w", encoding="utf-8") as f:
         f.write(text)
@@ -24,13 +97,47 @@ def read_text(path: str) -> str:
 
 
 def write_srt(path: str, segments: List[Dict[str, Any]]) -> None:
-    lines: List[str] = []
-    for idx, seg in enumerate(segments, start=1):
-        start = float(seg.get("start", 0))
-        end = float(seg.get("end", start))
-        text = str(seg.get("text", "")).strip()
-        lines.append(str(idx))
-        lines.append(f"{seconds_to_srt_time(start)} --> {seconds_to_srt_time(end)}")
-        lines.append(text)
-        lines.append("")
-    write_text(path, "\n".join(lines)) 
\ No newline at end of file
+    write_bytes(path, encode_srt(segments))
+
+
+class SrtStreamWriter:
+    """
+    Write SRT cues to a file batch by batch, numbering them continuously.
+
+    After all appends the file is identical to write_srt with the batches
+    concatenated. Each batch is flushed right away, so the file can be
+    previewed while later batches are still being produced.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "wb")
+        self._count = 0
+
+    def append(self, segments: List[Dict[str, Any]]) -> None:
+        if not segments:
+            return
+        if self._count:
+            self._file.write(b"\n")
+        self._file.write(encode_srt(segments, first_index=self._count + 1))
+        self._file.flush()
+        self._count += len(segments)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "SrtStreamWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def write_segments(
+    json_path: str,
+    srt_path: str,
+    segments: List[Dict[str, Any]],
+    extra: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Write a stage's segments as JSON ({"segments": ..., **extra}) and as SRT."""
+    write_json(json_path, {"segments": segments, **(extra or {})})
+    write_srt(srt_path, segments)
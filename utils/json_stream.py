@@ -0,0 +1,65 @@
+"""Incremental parsing of JSON arrays arriving in pieces (e.g. streamed LLM output)."""
+
+from typing import Any, List, Optional
+
+from .io_utils import loads_json
+
+
+class SegmentStreamParser:
+    """
+    Pull complete elements out of the first JSON array in a growing text stream.
+
+    Works for both a bare array (``[{...}, ...]``) and an object wrapping the
+    array (``{"segments": [{...}, ...]}``); elements may be objects or nested
+    arrays such as ``[start, end, text]`` rows. Each call to ``feed`` returns
+    the array elements that were completed by the new text.
+    """
+
+    def __init__(self) -> None:
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._array_depth: Optional[int] = None
+        self._object_start: Optional[int] = None
+        self._in_string = False
+        self._escaped = False
+        self._position = 0
+
+    def feed(self, text: str) -> List[Any]:
+        completed: List[Any] = []
+        for char in text:
+            self._buffer.append(char)
+            self._position += 1
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+                if char == "[" and self._array_depth is None:
+                    self._array_depth = self._depth
+                elif (
+                    self._array_depth is not None
+                    and self._depth == self._array_depth + 1
+                ):
+                    self._object_start = self._position - 1
+            elif char in "]}":
+                if (
+                    self._object_start is not None
+                    and self._array_depth is not None
+                    and self._depth == self._array_depth + 1
+                ):
+                    raw = "".join(self._buffer[self._object_start : self._position])
+                    self._object_start = None
+                    try:
+                        completed.append(loads_json(raw))
+                    except ValueError:
+                        pass
+                self._depth -= 1
+        return completed
@@ -0,0 +1,130 @@
+"""Per-segment cache of LLM results (enhanced or translated text).
+
+Entries live in a small SQLite database under ``~/.cache/subgen`` and are
+keyed on ``sha1(model|task|variant|text)``, so identical lines are only sent
+to the LLM once, across reruns and across videos.
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+import functools
+from typing import Any, Callable, Dict, Iterable, List
+
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "subgen", "llm_cache.sqlite3")
+
+
+def segment_key(model: str, task: str, variant: str, text: str) -> str:
+    """Cache key for one segment's text; variant covers task parameters such as the target language."""
+    return hashlib.sha1(f"{model}|{task}|{variant}|{text}".encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Thread-safe key -> text store backed by SQLite."""
+
+    def __init__(self, path: str = CACHE_PATH) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL only syncs at checkpoints; a crash can lose recent entries, never corrupt the file
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, str] = {}
+        with self._lock:
+            # Stay under SQLite's default limit on bound parameters
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM llm_cache WHERE key IN ({placeholders})", batch
+                )
+                found.update(rows)
+        return found
+
+    def set_many(self, items: Dict[str, str]) -> None:
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO llm_cache (key, value) VALUES (?, ?)", items.items()
+            )
+            self._conn.commit()
+
+
+@functools.lru_cache(maxsize=1)
+def get_llm_cache() -> LLMCache:
+    """Process-wide cache instance."""
+    return LLMCache()
+
+
+def apply_with_cache(
+    segments: List[Dict[str, Any]],
+    transform: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+    model: str,
+    task: str,
+    variant: str = "",
+    refresh: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Run an LLM transform only on the segments whose text is not cached yet.
+
+    Args:
+        segments: Input segments
+        transform: Function returning one output segment per input segment, in order;
+            an input segment returned as is (the same object) is used but not cached
+        model: LLM model name, part of the cache key
+        task: e.g. "enhance" or "translate"
+        variant: Further key material, e.g. the prompt version or target language
+        refresh: Ignore cached entries and transform every segment, caching the new results
+
+    Returns:
+        Output segments in input order, with cached segments taking only their text from the cache.
+    """
+    cache = get_llm_cache()
+    keys = [segment_key(model, task, variant, str(seg.get("text", ""))) for seg in segments]
+    cached = {} if refresh else cache.get_many(keys)
+    # Repeated lines ("yeah", recurring intros) are sent once; their copies reuse the result
+    first_uncached: Dict[str, Dict[str, Any]] = {}
+    for seg, key in zip(segments, keys):
+        if key not in cached:
+            first_uncached.setdefault(key, seg)
+    pending = list(first_uncached.values())
+    if cached or len(pending) < len(segments):
+        logger.info(
+            f"LLM cache ({task}): {len(segments) - len(pending)}/{len(segments)} segments cached or repeated"
+        )
+
+    results = transform(pending) if pending else []
+    if len(results) != len(pending):
+        # Can't line results up with the inputs; use them as they are and cache nothing
+        logger.warning(f"LLM {task} returned {len(results)} segments for {len(pending)}; not caching")
+        merged = [{**seg, "text": cached[key]} for seg, key in zip(segments, keys) if key in cached]
+        merged.extend(results)
+        return sorted(merged, key=lambda seg: float(seg.get("start", 0)))
+
+    fresh_texts = {key: str(result.get("text", "")) for key, result in zip(first_uncached, results)}
+    # A transform hands back the input segment itself for lines it could not process; don't cache those
+    new_entries = {
+        key: fresh_texts[key]
+        for (key, seg), result in zip(first_uncached.items(), results)
+        if result is not seg
+    }
+    fresh = {id(seg): result for seg, result in zip(pending, results)}
+    merged = []
+    for seg, key in zip(segments, keys):
+        if id(seg) in fresh:
+            merged.append(fresh[id(seg)])
+        else:
+            merged.append({**seg, "text": cached.get(key, fresh_texts.get(key, ""))})
+    cache.set_many(new_entries)
+    return merged
@@ -1,19 +1,135 @@
+import atexit
+import io
 import logging
+import logging.handlers
+import os
+import queue
 import sys
-from typing import Optional
+import threading
+from typing import Any, Dict, Optional
 
 
-def get_logger(name: Optional[str] = None) -> logging.Logger:
-    logger = logging.getLogger(name if name else __name__)
-    if logger.handlers:
-        return logger
-    logger.setLevel(logging.DEBUG)
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter(
+# Loggers only enqueue records; one background listener formats them and writes to stdout,
+# so a slow terminal or pipe never stalls the threads doing the work
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+# Size of the stdout buffer the listener writes into
+LOG_BUFFER_BYTES = 64 * 1024
+
+
+def _buffered_stdout():
+    """A 64 KB buffered text stream on stdout's file descriptor, or sys.stdout if it has none."""
+    try:
+        fd = sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        return sys.stdout
+    # closefd=False: closing or collecting this stream must not close the real stdout
+    return io.open(
+        fd, "w", buffering=LOG_BUFFER_BYTES, encoding=sys.stdout.encoding,
+        errors="backslashreplace", closefd=False,
+    )
+
+
+class _BatchingStreamHandler(logging.StreamHandler):
+    """StreamHandler that leaves flushing to the listener instead of flushing every record."""
+
+    def flush(self) -> None:
+        pass
+
+    def flush_stream(self) -> None:
+        super().flush()
+
+
+class _FlushWhenIdleListener(logging.handlers.QueueListener):
+    """Flushes the handlers only once the queue is empty, so a burst of records becomes one write."""
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush_stream()
+        return super().dequeue(block)
+
+    def stop(self) -> None:
+        super().stop()
+        for handler in self.handlers:
+            handler.flush_stream()
+
+
+class _SecondCachedFormatter(logging.Formatter):
+    """Formatter that runs localtime/strftime once per second of log time instead of once per record."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._cached_second = -1
+        self._cached_time = ""
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        # Only the listener thread formats records, so the cache needs no lock
+        second = int(record.created)
+        if second != self._cached_second:
+            self._cached_time = super().formatTime(record, datefmt)
+            self._cached_second = second
+        return self._cached_time
+
+
+_stream_handler = _BatchingStreamHandler(_buffered_stdout())
+_stream_handler.setFormatter(
+    _SecondCachedFormatter(
         fmt="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    logger.propagate = False
-    return logger 
\ No newline at end of file
+)
+_listener = _FlushWhenIdleListener(_log_queue, _stream_handler, respect_handler_level=True)
+_listener.start()
+# stop() drains and flushes the queue, so messages logged right before exit are still printed
+atexit.register(_listener.stop)
+
+
+def _log_level() -> int:
+    """Level from $LOG_LEVEL (a name like DEBUG or a number), INFO by default."""
+    value = os.environ.get("LOG_LEVEL", "INFO").strip()
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.upper())
+    return level if isinstance(level, int) else logging.INFO
+
+
+# Records below this level are dropped in the calling thread, before reaching the queue.
+# Hot loops should still guard expensive messages with logger.isEnabledFor(logging.DEBUG).
+LOG_LEVEL = _log_level()
+
+# Level the root logger passes on for other libraries (httpx, faster_whisper, ...), which is
+# what they printed before the root handler existed
+THIRD_PARTY_LOG_LEVEL = logging.WARNING
+
+_configure_lock = threading.Lock()
+_configured = False
+
+
+def configure_logging() -> None:
+    """Attach the one queue handler to the root logger; our loggers reach it by propagation."""
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        root = logging.getLogger()
+        root.addHandler(logging.handlers.QueueHandler(_log_queue))
+        root.setLevel(THIRD_PARTY_LOG_LEVEL)
+        _configured = True
+
+
+# Configured loggers by name; repeat lookups skip the logging module's global lock
+_loggers: Dict[str, logging.Logger] = {}
+
+
+def get_logger(name: Optional[str] = None) -> logging.Logger:
+    name = name if name else __name__
+    cached = _loggers.get(name)
+    if cached is not None:
+        return cached
+    configure_logging()
+    logger = logging.getLogger(name)
+    logger.setLevel(LOG_LEVEL)
+    # Above CRITICAL nothing would pass; disabled loggers return before checking any level
+    logger.disabled = LOG_LEVEL > logging.CRITICAL
+    _loggers[name] = logger
+    return logger
@@ -1,18 +1,47 @@
 import os
+import re
+import threading
+import functools
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 from dotenv import load_dotenv
 
-load_dotenv()
 
+@functools.lru_cache(maxsize=1)
+def get_outputs_root() -> str:
+    """
+    Absolute path of the outputs folder: $OUTPUTS_ROOT, or outputs/ next to the package.
 
-DEFAULT_OUTPUTS_ROOT = os.environ.get("OUTPUTS_ROOT") or os.path.join(
-    os.path.dirname(__file__), "..", "outputs"
-)
-DEFAULT_OUTPUTS_ROOT = os.path.abspath(DEFAULT_OUTPUTS_ROOT)
+    Resolved on first use instead of at import, so scripts that never touch
+    the outputs folder don't read .env for it.
+    """
+    if os.environ.get("OUTPUTS_ROOT") is None:
+        load_dotenv()
+    root = os.environ.get("OUTPUTS_ROOT") or os.path.join(os.path.dirname(__file__), "..", "outputs")
+    return os.path.abspath(root)
 
 
-@dataclass
+def __getattr__(name: str) -> str:
+    # DEFAULT_OUTPUTS_ROOT used to be computed at import; keep it readable for old callers
+    if name == "DEFAULT_OUTPUTS_ROOT":
+        return get_outputs_root()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def downloads_dir(name: str = "tmp_downloads") -> str:
+    """
+    Create and return the folder videos are downloaded into before being placed.
+
+    It lives under the outputs root rather than the project folder, so moving
+    a finished download into outputs/<video_id>/video/ is a rename on the same
+    filesystem instead of a copy of the whole file.
+    """
+    path = os.path.join(get_outputs_root(), name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@dataclass(frozen=True, slots=True)
 class WorkDirs:
     root: str
     video_dir: str
@@ -24,8 +53,27 @@ class WorkDirs:
     subtitled_dir: str
 
 
+# Work folders already created by this process, by video id
+_workdirs_cache: Dict[str, WorkDirs] = {}
+_workdirs_lock = threading.Lock()
+
+
 def ensure_workdirs(video_id: str) -> WorkDirs:
-    root = os.path.join(DEFAULT_OUTPUTS_ROOT, video_id)
+    """
+    Create (once per process) and return the output folders of a video.
+
+    Pipeline stages call this repeatedly for the same video; after the first
+    call the folders are known to exist and no filesystem calls are made.
+    """
+    with _workdirs_lock:
+        work = _workdirs_cache.get(video_id)
+        if work is None:
+            work = _workdirs_cache[video_id] = _make_workdirs(video_id)
+    return work
+
+
+def _make_workdirs(video_id: str) -> WorkDirs:
+    root = os.path.join(get_outputs_root(), video_id)
     video_dir = os.path.join(root, "video")
     audio_dir = os.path.join(root, "audio")
     separated_dir = os.path.join(root, "separated")
@@ -34,8 +82,13 @@ def ensure_workdirs(video_id: str) -> WorkDirs:
     translated_dir = os.path.join(root, "translated")
     subtitled_dir = os.path.join(root, "subtitled")
 
-    for path in [root, video_dir, audio_dir, separated_dir, transcripts_dir, enhanced_dir, translated_dir, subtitled_dir]:
-        os.makedirs(path, exist_ok=True)
+    # Walk the parents once for root; the subfolders are single mkdirs below it
+    os.makedirs(root, exist_ok=True)
+    for path in [video_dir, audio_dir, separated_dir, transcripts_dir, enhanced_dir, translated_dir, subtitled_dir]:
+        try:
+            os.mkdir(path)
+        except FileExistsError:
+            pass
 
     return WorkDirs(
         root=root,
@@ -49,9 +102,52 @@ def ensure_workdirs(video_id: str) -> WorkDirs:
     )
 
 
+@dataclass(frozen=True, slots=True)
+class PipelinePaths:
+    """Output files of one pipeline run, computed once per video."""
+    metadata_json: str
+    asr_json: str
+    asr_srt: str
+    enhanced_json: str
+    enhanced_srt: str
+    translated_json: Optional[str]
+    translated_srt: Optional[str]
+    soft_video: str
+    burned_video: str
+
+
+def pipeline_paths(work: WorkDirs, asr_backend: str, target_language: Optional[str] = None) -> PipelinePaths:
+    translated_json = translated_srt = None
+    if target_language:
+        # Use language code for file naming
+        lang_code = target_language.lower().replace(" ", "_")
+        translated_json = os.path.join(work.translated_dir, f"translated_{lang_code}.json")
+        translated_srt = os.path.join(work.translated_dir, f"translated_{lang_code}.srt")
+    return PipelinePaths(
+        metadata_json=os.path.join(work.root, "metadata.json"),
+        asr_json=os.path.join(work.transcripts_dir, f"asr_{asr_backend}.json"),
+        asr_srt=os.path.join(work.transcripts_dir, f"asr_{asr_backend}.srt"),
+        enhanced_json=os.path.join(work.enhanced_dir, "enhanced.json"),
+        enhanced_srt=os.path.join(work.enhanced_dir, "enhanced.srt"),
+        translated_json=translated_json,
+        translated_srt=translated_srt,
+        soft_video=os.path.join(work.subtitled_dir, "with_subtitles_soft.mp4"),
+        burned_video=os.path.join(work.subtitled_dir, "with_subtitles_burned.mp4"),
+    )
+
+
+# \w is exactly str.isalnum() plus "_", so this keeps the same characters as the old per-char filter
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^\w .\-]")
+
+
+# The same filter over ASCII, as a delete table for bytes.translate
+_UNSAFE_ASCII_BYTES = bytes(b for b in range(128) if _UNSAFE_FILENAME_CHARS.match(chr(b)))
+
+
 def safe_filename(name: str) -> str:
-    keepchars = (" ", ".", "_", "-")
-    return "".join(c for c in name if c.isalnum() or c in keepchars).rstrip()
+    if name.isascii():
+        return name.encode("ascii").translate(None, _UNSAFE_ASCII_BYTES).decode("ascii").rstrip()
+    return _UNSAFE_FILENAME_CHARS.sub("", name).rstrip()
 
 
 def split_ext(path: str) -> Tuple[str, str]:
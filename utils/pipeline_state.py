@@ -0,0 +1,83 @@
+"""Per-video record of completed pipeline stages (``pipeline_state.json``).
+
+Each stage is stored with a key over everything it consumed (the previous
+stage's output, model and settings) and the files it produced. A rerun
+whose key matches, and whose files are all still there, reuses the outputs
+instead of doing the work again. Because a key includes the upstream
+content, changing an earlier stage invalidates everything after it.
+"""
+
+import os
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .io_utils import dumps_json, read_json, write_json
+
+STATE_FILE = "pipeline_state.json"
+
+
+def stage_key(*parts: Any) -> str:
+    """SHA-256 over the given parts; lists and dicts (e.g. segments) are hashed as JSON."""
+    hasher = hashlib.sha256()
+    for part in parts:
+        text = part if isinstance(part, str) else dumps_json(part)
+        hasher.update(text.encode("utf-8") + b"\0")
+    return hasher.hexdigest()
+
+
+def file_fingerprint(path: str) -> str:
+    """Cheap identity of a large file (path, size, mtime) for use in a stage key."""
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+
+
+class PipelineState:
+    """Completed stages of one video, loaded from and saved to its work directory."""
+
+    def __init__(self, root: str, force: Tuple[str, ...] = ()) -> None:
+        self.path = os.path.join(root, STATE_FILE)
+        self.force = frozenset(force)
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, Dict[str, Any]]] = []
+        try:
+            data = read_json(self.path)
+        except (OSError, ValueError):
+            data = {}
+        self._stages: Dict[str, Dict[str, Any]] = data if isinstance(data, dict) else {}
+
+    def outputs(self, stage: str, key: str) -> Optional[Dict[str, str]]:
+        """Outputs of an earlier run of stage with the same key, or None if it must run."""
+        if stage in self.force:
+            return None
+        entry = self._stages.get(stage)
+        if not isinstance(entry, dict) or entry.get("key") != key:
+            return None
+        outputs = entry.get("outputs") or {}
+        if not all(isinstance(p, str) and os.path.isfile(p) for p in outputs.values()):
+            return None
+        return outputs
+
+    def complete(self, stage: str, key: str, outputs: Dict[str, str], pending: bool = False) -> None:
+        """
+        Record that stage finished with key and outputs.
+
+        With pending=True the entry is held back until commit(), for stages
+        whose files are still being written in the background.
+        """
+        entry = {"key": key, "outputs": outputs}
+        with self._lock:
+            if pending:
+                self._pending.append((stage, entry))
+                return
+            self._stages[stage] = entry
+            write_json(self.path, self._stages)
+
+    def commit(self) -> None:
+        """Save the pending entries; call once their output files are on disk."""
+        with self._lock:
+            if not self._pending:
+                return
+            self._stages.update(self._pending)
+            self._pending.clear()
+            write_json(self.path, self._stages)
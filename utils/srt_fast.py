@@ -0,0 +1,90 @@
+"""SRT serialization using precomputed digit tables and a single bytes join."""
+
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # the table-driven path below needs nothing else
+    np = None
+
+# Transcripts at least this long get their timestamps formatted by NumPy
+VECTORIZE_THRESHOLD = 1000
+
+_TIMING_TEMPLATE = b"00:00:00,000 --> 00:00:00,000"
+_TIMING_WIDTH = len(_TIMING_TEMPLATE)
+# (offset, digits) of the hours, minutes, seconds and milliseconds fields
+_FIELDS = ((0, 2), (3, 2), (6, 2), (9, 3))
+
+_TWO_DIGITS = [b"%02d" % i for i in range(100)]
+_THREE_DIGITS = [b"%03d" % i for i in range(1000)]
+
+
+def to_ms(seconds: float) -> int:
+    """Round seconds half up to whole milliseconds, clamping negatives to zero."""
+    return int(seconds * 1000.0 + 0.5) if seconds > 0 else 0
+
+
+def fmt(ms: int) -> bytes:
+    """Format a non-negative millisecond count as HH:MM:SS,mmm."""
+    secs, millis = divmod(ms, 1000)
+    mins, secs = divmod(secs, 60)
+    hours, mins = divmod(mins, 60)
+    hh = _TWO_DIGITS[hours] if hours < 100 else b"%d" % hours
+    return hh + b":" + _TWO_DIGITS[mins] + b":" + _TWO_DIGITS[secs] + b"," + _THREE_DIGITS[millis]
+
+
+def _timing_lines(starts: List[float], ends: List[float]) -> Optional[bytes]:
+    """
+    Format all "start --> end" lines at once into one fixed-width buffer.
+
+    Digits are computed for every segment with NumPy integer arithmetic and
+    written column by column into a uint8 matrix. Returns None if a time
+    doesn't fit the two-digit hours field.
+    """
+    both = np.stack(
+        [np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64)], axis=1
+    )
+    ms = np.where(both > 0, np.floor(both * 1000.0 + 0.5), 0).astype(np.int64)
+    hours, rest = np.divmod(ms, 3600000)
+    if hours.size and hours.max() >= 100:
+        return None
+    mins, rest = np.divmod(rest, 60000)
+    secs, millis = np.divmod(rest, 1000)
+
+    out = np.empty((len(starts), _TIMING_WIDTH), dtype=np.uint8)
+    out[:] = np.frombuffer(_TIMING_TEMPLATE, dtype=np.uint8)
+    for column, base in ((0, 0), (1, 17)):
+        for values, (offset, width) in zip((hours, mins, secs, millis), _FIELDS):
+            remaining = values[:, column].copy()
+            for position in range(base + offset + width - 1, base + offset - 1, -1):
+                out[:, position] = 48 + remaining % 10
+                remaining //= 10
+    return out.tobytes()
+
+
+def encode_srt(segments: List[Dict[str, Any]], first_index: int = 1) -> bytes:
+    """
+    Render segments as UTF-8 SRT content, numbering cues from first_index.
+
+    Produces the same output as formatting each cue with seconds_to_srt_time,
+    without building the intermediate per-line strings. Long transcripts have
+    their timestamps formatted in bulk with NumPy when it is installed.
+    """
+    starts = [float(seg.get("start", 0)) for seg in segments]
+    ends = [float(seg.get("end", start)) for seg, start in zip(segments, starts)]
+    texts = [str(seg.get("text", "")).strip().encode("utf-8") for seg in segments]
+
+    timings = None
+    if np is not None and len(segments) >= VECTORIZE_THRESHOLD:
+        timings = _timing_lines(starts, ends)
+
+    cues: List[bytes] = []
+    if timings is not None:
+        width = _TIMING_WIDTH
+        for idx, text in enumerate(texts):
+            offset = idx * width
+            cues.append(b"%d\n%s\n%s\n" % (idx + first_index, timings[offset : offset + width], text))
+    else:
+        for idx, (start, end, text) in enumerate(zip(starts, ends, texts), start=first_index):
+            cues.append(b"%d\n%s --> %s\n%s\n" % (idx, fmt(to_ms(start)), fmt(to_ms(end)), text))
+    return b"\n".join(cues)
@@ -0,0 +1,58 @@
+"""Content-addressed caches for expensive per-video stages (ASR, audio separation).
+
+A stage result is stored next to the stage outputs as ``.<stage>_<key>.json``
+where the key is a SHA-256 over the input audio bytes and the parameters
+that affect the result. Re-running on the same audio with the same settings
+loads the file instead of recomputing.
+"""
+
+import os
+import hashlib
+from typing import Any, Dict, Optional
+
+from .io_utils import read_json
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def stage_cache_path(directory: str, stage: str, audio: Any, *params: Any) -> str:
+    """
+    Return the cache file for a stage run on the given audio with the given parameters.
+
+    audio is either a file path, hashed in 1 MB chunks so large WAV files are
+    never loaded whole, or an in-memory sample buffer such as a NumPy array.
+    """
+    hasher = hashlib.sha256()
+    if isinstance(audio, str):
+        with open(audio, "rb") as f:
+            for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                hasher.update(block)
+    else:
+        hasher.update(memoryview(audio).cast("B"))
+    for param in params:
+        hasher.update(b"\0" + str(param).encode("utf-8"))
+    return os.path.join(directory, f".{stage}_{hasher.hexdigest()}.json")
+
+
+def load_cached_transcript(path: str) -> Optional[Dict[str, Any]]:
+    """Load a cached ASR result, or None if missing, unreadable or without segments."""
+    try:
+        data = read_json(path)
+    except (OSError, ValueError):
+        return None
+    if isinstance(data, dict) and isinstance(data.get("segments"), list) and data["segments"]:
+        return data
+    return None
+
+
+def load_cached_separation(path: str) -> Optional[Dict[str, str]]:
+    """Load cached separation results, or None unless every stem file still exists."""
+    try:
+        data = read_json(path)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or not data:
+        return None
+    if not all(isinstance(p, str) and os.path.isfile(p) for p in data.values()):
+        return None
+    return data
@@ -1,17 +1,41 @@
-from typing import Tuple
+from typing import List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # seconds_to_srt_times falls back to the scalar formatter
+    np = None
+
+from .srt_fast import VECTORIZE_THRESHOLD
+
+# Zero-padded fields by value; indexing these beats a format spec per field
+_TWO_DIGITS = [f"{i:02d}" for i in range(100)]
+_THREE_DIGITS = [f"{i:03d}" for i in range(1000)]
 
 
 def seconds_to_srt_time(seconds: float) -> str:
-    if seconds < 0:
-        seconds = 0
-    total_milliseconds = int(round(seconds * 1000))
-    hours = total_milliseconds // 3600000
-    remainder = total_milliseconds % 3600000
-    minutes = remainder // 60000
-    remainder = remainder % 60000
-    secs = remainder // 1000
-    millis = remainder % 1000
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+    # Round half up to whole milliseconds; negative times clamp to zero
+    total_milliseconds = int(seconds * 1000.0 + 0.5) if seconds > 0 else 0
+    hours, remainder = divmod(total_milliseconds, 3600000)
+    minutes, remainder = divmod(remainder, 60000)
+    secs, millis = divmod(remainder, 1000)
+    hh = _TWO_DIGITS[hours] if hours < 100 else str(hours)
+    return f"{hh}:{_TWO_DIGITS[minutes]}:{_TWO_DIGITS[secs]},{_THREE_DIGITS[millis]}"
+
+
+def seconds_to_srt_times(seconds: Sequence[float]) -> List[str]:
+    """Format many timestamps at once; same output as seconds_to_srt_time on each."""
+    if np is None or len(seconds) < VECTORIZE_THRESHOLD:
+        return [seconds_to_srt_time(value) for value in seconds]
+    values = np.asarray(seconds, dtype=np.float64)
+    total_milliseconds = np.where(values > 0, np.floor(values * 1000.0 + 0.5), 0).astype(np.int64)
+    hours, remainder = np.divmod(total_milliseconds, 3600000)
+    minutes, remainder = np.divmod(remainder, 60000)
+    secs, millis = np.divmod(remainder, 1000)
+    two, three = _TWO_DIGITS, _THREE_DIGITS
+    return [
+        f"{two[h] if h < 100 else h}:{two[m]}:{two[s]},{three[ms]}"
+        for h, m, s, ms in zip(hours.tolist(), minutes.tolist(), secs.tolist(), millis.tolist())
+    ]
 
 
 def srt_time_to_seconds(time_str: str) -> float:
@@ -25,6 +49,11 @@ def srt_time_to_ass_time(srt_time: str) -> str:
     """Convert SRT time format (HH:MM:SS,mmm) to ASS time format (H:MM:SS.cc)"""
     # Remove any whitespace
     srt_time = srt_time.strip()
+
+    # Zero-padded HH:MM:SS,mmm (what encode_srt writes) only needs re-slicing
+    if len(srt_time) == 12 and srt_time[2] == ":" and srt_time[5] == ":" and srt_time[8] == ",":
+        hours = srt_time[1] if srt_time[0] == "0" else srt_time[0:2]
+        return f"{hours}:{srt_time[3:8]}.{srt_time[9:11]}"
     
     # Parse SRT format: HH:MM:SS,mmm
     hh, mm, rest = srt_time.split(":", 2)
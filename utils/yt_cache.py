@@ -0,0 +1,61 @@
+"""Local cache for YouTube video metadata.
+
+Resolving a video ID or title through yt-dlp costs a full ``extract_info``
+round-trip. The helpers here let the downloader answer those questions from
+the URL itself and from ``outputs/<video_id>/metadata.json`` instead.
+"""
+
+import os
+import re
+import json
+import functools
+from typing import Any, Dict, Optional
+
+from utils.paths import get_outputs_root
+
+_VIDEO_ID_RE = re.compile(r"(?:v=|youtu\.be/|/shorts/|/embed/|/live/)([A-Za-z0-9_-]{11})")
+_YOUTUBE_URL_RE = re.compile(
+    r"^https?://(?:[A-Za-z0-9-]+\.)?(?:youtube\.com|youtube-nocookie\.com|youtu\.be)/", re.IGNORECASE
+)
+
+# Keys of the yt-dlp info dict that are worth persisting
+METADATA_KEYS = ("id", "title", "duration", "webpage_url", "uploader")
+
+
+@functools.lru_cache(maxsize=None)
+def parse_video_id(url: str) -> Optional[str]:
+    """Extract the 11-character video ID from a YouTube URL, or None if absent."""
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
+
+
+def is_youtube_url(url: str) -> bool:
+    """Cheap syntactic check that url points at a YouTube host."""
+    return bool(_YOUTUBE_URL_RE.match(url.strip()))
+
+
+def metadata_path(video_id: str) -> str:
+    """Path of the cached metadata file for a video."""
+    return os.path.join(get_outputs_root(), video_id, "metadata.json")
+
+
+def load_metadata(video_id: str) -> Optional[Dict[str, Any]]:
+    """Load cached metadata for a video, or None if missing or unreadable."""
+    try:
+        with open(metadata_path(video_id), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def save_metadata(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Persist the whitelisted subset of a yt-dlp info dict and return it."""
+    metadata = {key: info.get(key) for key in METADATA_KEYS}
+    # Keep the "video_id" key used by the rest of the pipeline
+    metadata["video_id"] = metadata["id"]
+    path = metadata_path(metadata["id"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2, default=str)
+    return metadata